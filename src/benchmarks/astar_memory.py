@@ -0,0 +1,54 @@
+# benchmarks/astar_memory.py
+"""
+Peak memory and wall time of astar_torus for each search-state layout.
+
+Run from src/:
+    python -m benchmarks.astar_memory
+"""
+
+import time
+import tracemalloc
+
+import numpy as np
+
+from planner.astar_planner import astar_torus
+
+
+def measure(grid, start, goal, state):
+    # Time without tracing first, tracemalloc slows allocation-heavy code
+    t0 = time.perf_counter()
+    path = astar_torus(grid, start, goal, state=state)
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    astar_torus(grid, start, goal, state=state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return path, elapsed, peak
+
+
+def scenes():
+    rng = np.random.default_rng(0)
+    for M, dims, density in [(360, 2, 0.2), (60, 3, 0.2), (20, 4, 0.1)]:
+        grid = (rng.random((M,) * dims) < density).astype(np.uint8)
+        start = (0,) * dims
+        goal = (M // 2,) * dims
+        # Short query: most of the grid is never visited
+        near = (3,) * dims
+        yield f"{dims}D M={M} long", grid, start, goal
+        yield f"{dims}D M={M} short", grid, start, near
+
+
+def main():
+    print(f"{'scene':<20} {'state':<7} {'cells':>10} {'path':>5} {'time s':>8} {'peak MiB':>9}")
+    for name, grid, start, goal in scenes():
+        for state in ("dense", "sparse"):
+            path, elapsed, peak = measure(grid, start, goal, state)
+            print(
+                f"{name:<20} {state:<7} {grid.size:>10} {len(path):>5} "
+                f"{elapsed:>8.3f} {peak / 2**20:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmark suite for grid generation, heuristics, search, roadmaps,
+multi-resolution planning, sampling-based planning, route smoothing and
+kinematics.
+
+Every case runs in a fresh process so that peak RSS belongs to that case
+alone. Results are written as JSON and can be compared with a baseline.
+
+Run from src/:
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --baseline baseline.json
+    python -m benchmarks.run_benchmarks --quick --filter search
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+from examples import get_all_examples
+from planner.astar_planner import (
+    astar_torus,
+    bidirectional_astar_torus,
+    calc_heuristic_map,
+    iter_astar_torus,
+    jps_torus,
+)
+from planner.collision import get_occupancy_grid
+from planner.multires import plan_multires
+from planner.path_smoothing import smooth_route
+from planner.sampling_planner import SAMPLING_METHODS, MotionChecker, plan_sampling
+from planner.nlink_arm import NLinkArm
+from planner.roadmap import CSpaceRoadmap
+
+EXAMPLES_FILE = Path(__file__).resolve().parents[1] / "examples.yml"
+
+# setup(**params) builds the inputs (not timed), run(inputs) is timed and
+# returns a dict of extra metrics
+Case = namedtuple("Case", ["name", "group", "params", "setup", "run"])
+
+
+def random_obstacles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-2.5, 2.5, size=(n, 2))
+    radii = rng.uniform(0.1, 0.4, size=(n, 1))
+    return np.hstack([centers, radii]).tolist()
+
+
+def setup_grid(links, obstacles, M, method="prefix"):
+    arm = NLinkArm([2.0 / links] * links, [0] * links)
+    return arm, random_obstacles(obstacles), M, method
+
+
+def run_grid(inputs):
+    arm, obstacles, M, method = inputs
+    grid = get_occupancy_grid(arm, obstacles, M, method=method)
+    return {"cells": int(grid.size), "occupied": int(grid.sum())}
+
+
+def setup_heuristic(dims, M):
+    return np.zeros((M,) * dims, dtype=np.uint8), (M // 3,) * dims
+
+
+def run_heuristic(inputs):
+    grid, goal = inputs
+    calc_heuristic_map(grid, goal)
+    return {"cells": int(grid.size)}
+
+
+def example_scene(example, M):
+    ex = get_all_examples(EXAMPLES_FILE)[example]
+    n = len(ex["link_lengths"])
+    arm = NLinkArm(ex["link_lengths"], [0] * n)
+    arm.joint_limits = ex["joint_limits"]
+    start = tuple(int(round(s * M / 100)) % M for s in ex["start"])
+    goal = tuple(int(round(g * M / 100)) % M for g in ex["goal"])
+    return arm, ex["obstacles"], start, goal
+
+
+def setup_search(example, M):
+    arm, obstacles, start, goal = example_scene(example, M)
+    return get_occupancy_grid(arm, obstacles, M), start, goal
+
+
+def run_search(inputs):
+    grid, start, goal = inputs
+    for expanded, route, _ in iter_astar_torus(grid, start, goal, report_every=None):
+        pass
+    return {"expanded": expanded, "route_length": len(route)}
+
+
+def run_search_bidirectional(inputs):
+    grid, start, goal = inputs
+    stats = {}
+    route = bidirectional_astar_torus(grid, start, goal, stats=stats)
+    return {"expanded": stats["expanded"], "route_length": len(route)}
+
+
+def run_search_jps(inputs):
+    grid, start, goal = inputs
+    stats = {}
+    route = jps_torus(grid, start, goal, stats=stats)
+    return {
+        "expanded": stats["expanded"],
+        "scanned": stats["scanned"],
+        "route_length": len(route),
+    }
+
+
+def setup_roadmap(example, M, landmarks, queries):
+    grid, _, goal = setup_search(example, M)
+    roadmap = CSpaceRoadmap(grid, landmarks=landmarks)
+    rng = np.random.default_rng(0)
+    starts = [tuple(int(c) for c in rng.integers(0, M, grid.ndim)) for _ in range(queries)]
+    goals = [tuple(int(c) for c in rng.integers(0, M, grid.ndim)) for _ in range(queries)]
+    return grid, roadmap, list(zip(starts, goals)), [(s, goal) for s in starts]
+
+
+def run_roadmap_build(inputs):
+    grid, roadmap, _, _ = inputs
+    built = CSpaceRoadmap(grid, landmarks=len(roadmap.landmarks))
+    return {"components": built.n_components}
+
+
+def run_roadmap_queries(inputs):
+    # Random pairs, then one goal shared by all starts (one distance field)
+    _, roadmap, pairs, one_goal = inputs
+    roadmap.clear_fields()
+    routes = roadmap.query_many(pairs) + roadmap.query_many(one_goal)
+    return {"queries": len(routes), "reachable": sum(1 for r in routes if r)}
+
+
+def setup_multires(example, M, levels):
+    arm, obstacles, start, goal = example_scene(example, M)
+    return arm, obstacles, start, goal, M, levels
+
+
+def run_multires(inputs):
+    arm, obstacles, start, goal, M, levels = inputs
+    stats = {}
+    route = plan_multires(arm, obstacles, start, goal, M=M, levels=levels, stats=stats)
+    return {"cells_evaluated": sum(stats["cells"]), "route_length": len(route)}
+
+
+def run_full_resolution(inputs):
+    # Reference for run_multires: full grid and plain A* at the same M
+    arm, obstacles, start, goal, M, _ = inputs
+    grid = get_occupancy_grid(arm, obstacles, M)
+    route = astar_torus(grid, start, goal)
+    return {"cells_evaluated": int(grid.size), "route_length": len(route)}
+
+
+SAMPLING_OBSTACLES = [[1.2, 0.6, 0.3], [-0.9, 1.1, 0.35], [0.4, -1.3, 0.3], [-1.4, -0.5, 0.25]]
+
+
+def setup_sampling(links, method, M=100):
+    arm = NLinkArm([2.0 / links] * links, [0] * links)
+    checker = MotionChecker(arm.link_lengths, None, SAMPLING_OBSTACLES)
+    rng = np.random.default_rng(0)
+    while True:
+        start, goal = rng.integers(0, M, size=(2, links))
+        if checker.configs_free(2 * np.pi * np.array([start, goal]) / M - np.pi).all():
+            break
+    return arm, tuple(start.tolist()), tuple(goal.tolist()), M, method
+
+
+def run_sampling(inputs):
+    arm, start, goal, M, method = inputs
+    stats = {}
+    route = plan_sampling(
+        arm, SAMPLING_OBSTACLES, start, goal, M, method=method, seed=0, stats=stats
+    )
+    return {"checked": stats["checked"], "route_length": len(route)}
+
+
+def setup_smoothing(example, M):
+    arm, obstacles, start, goal = example_scene(example, M)
+    route = astar_torus(get_occupancy_grid(arm, obstacles, M), start, goal)
+    return arm, obstacles, route, M
+
+
+def run_smoothing(inputs):
+    arm, obstacles, route, M = inputs
+    stats = {}
+    smooth_route(arm, obstacles, route, M, stats=stats)
+    return {"checked": stats["checked"], "waypoints": stats["waypoints"][1]}
+
+
+def setup_kinematics(links, configurations):
+    rng = np.random.default_rng(0)
+    arm = NLinkArm([1.0] * links, [0] * links)
+    return arm, rng.uniform(-np.pi, np.pi, size=(configurations, links))
+
+
+def run_kinematics(inputs):
+    arm, configurations = inputs
+    for angles in configurations:
+        arm.update_joints(angles)
+    return {"configurations": len(configurations)}
+
+
+def run_kinematics_batch(inputs):
+    arm, configurations = inputs
+    arm.batch_points(configurations)
+    return {"configurations": len(configurations)}
+
+
+def build_cases(quick=False):
+    cases = []
+    grid_params = [(2, 1, 100), (2, 10, 100), (2, 100, 100), (3, 3, 30)]
+    if not quick:
+        grid_params += [(2, 3, 200), (3, 3, 60), (3, 30, 60), (4, 3, 20)]
+    for links, obstacles, M in grid_params:
+        cases.append(
+            Case(
+                f"grid/links={links}/obstacles={obstacles}/M={M}",
+                "grid",
+                {"links": links, "obstacles": obstacles, "M": M},
+                setup_grid,
+                run_grid,
+            )
+        )
+        if links > 2:
+            # Reference: every cell tested on its own
+            cases.append(
+                Case(
+                    f"grid/flat/links={links}/obstacles={obstacles}/M={M}",
+                    "grid",
+                    {"links": links, "obstacles": obstacles, "M": M, "method": "flat"},
+                    setup_grid,
+                    run_grid,
+                )
+            )
+
+    for dims, M in [(2, 100), (2, 360), (3, 100)] if not quick else [(2, 100)]:
+        cases.append(
+            Case(
+                f"heuristic/dims={dims}/M={M}",
+                "heuristic",
+                {"dims": dims, "M": M},
+                setup_heuristic,
+                run_heuristic,
+            )
+        )
+
+    examples = get_all_examples(EXAMPLES_FILE)
+    for example in list(examples)[:2] if quick else examples:
+        n = len(examples[example]["link_lengths"])
+        for M in [100] if n == 2 else [40]:
+            cases.append(
+                Case(
+                    f"search/{example}/M={M}",
+                    "search",
+                    {"example": example, "M": M},
+                    setup_search,
+                    run_search,
+                )
+            )
+            cases.append(
+                Case(
+                    f"search/bidirectional/{example}/M={M}",
+                    "search",
+                    {"example": example, "M": M},
+                    setup_search,
+                    run_search_bidirectional,
+                )
+            )
+            cases.append(
+                Case(
+                    f"search/jps/{example}/M={M}",
+                    "search",
+                    {"example": example, "M": M},
+                    setup_search,
+                    run_search_jps,
+                )
+            )
+
+    for example in list(examples)[:1] if quick else list(examples)[:1] + list(examples)[-1:]:
+        n = len(examples[example]["link_lengths"])
+        params = {"example": example, "M": 100 if n == 2 else 40, "landmarks": 8,
+                  "queries": 50 if quick else 200}
+        for label, run in [("build", run_roadmap_build), ("queries", run_roadmap_queries)]:
+            cases.append(
+                Case(
+                    f"roadmap/{label}/{example}/M={params['M']}",
+                    "roadmap",
+                    params,
+                    setup_roadmap,
+                    run,
+                )
+            )
+
+    for i, example in enumerate(list(examples)[:1] if quick else examples):
+        n = len(examples[example]["link_lengths"])
+        params = {"example": example, "M": 720, "levels": 3} if n == 2 else \
+            {"example": example, "M": 96, "levels": 2}
+        runs = [("multires", run_multires)]
+        if not quick and i in (0, len(examples) - 1):
+            runs.append(("multires/full-resolution", run_full_resolution))
+        for label, run in runs:
+            cases.append(
+                Case(
+                    f"{label}/{example}/M={params['M']}",
+                    "multires",
+                    params,
+                    setup_multires,
+                    run,
+                )
+            )
+
+    for links in [7] if quick else [3, 5, 7]:
+        for method in SAMPLING_METHODS:
+            cases.append(
+                Case(
+                    f"sampling/{method}/links={links}",
+                    "sampling",
+                    {"links": links, "method": method},
+                    setup_sampling,
+                    run_sampling,
+                )
+            )
+
+    for example in list(examples)[:1] if quick else list(examples)[:1] + list(examples)[-1:]:
+        n = len(examples[example]["link_lengths"])
+        params = {"example": example, "M": 100 if n == 2 else 40}
+        cases.append(
+            Case(
+                f"smoothing/{example}/M={params['M']}",
+                "smoothing",
+                params,
+                setup_smoothing,
+                run_smoothing,
+            )
+        )
+
+    for links in [2, 7] if quick else [2, 4, 7]:
+        cases.append(
+            Case(
+                f"kinematics/links={links}",
+                "kinematics",
+                {"links": links, "configurations": 2000},
+                setup_kinematics,
+                run_kinematics,
+            )
+        )
+        cases.append(
+            Case(
+                f"kinematics/batch/links={links}",
+                "kinematics",
+                {"links": links, "configurations": 2000},
+                setup_kinematics,
+                run_kinematics_batch,
+            )
+        )
+    return cases
+
+
+def measure(case, repeat):
+    """
+    Best-of-repeat wall time, peak traced allocation and peak RSS of a case.
+    """
+    inputs = case.setup(**case.params)
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        metrics = case.run(inputs)
+        times.append(time.perf_counter() - t0)
+
+    # Separate traced run, tracemalloc slows allocation-heavy code
+    tracemalloc.start()
+    case.run(inputs)
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": case.name,
+        "group": case.group,
+        "params": case.params,
+        "time_s": min(times),
+        "peak_alloc_mb": peak_alloc / 2**20,
+        "peak_rss_mb": _peak_rss_mb(),
+        **metrics,
+    }
+
+
+def _peak_rss_mb():
+    """
+    Peak resident set size of this process in MB, None where the resource
+    module is not available (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss //= 1024
+    return rss / 1024
+
+
+def _measure_by_name(name, quick, repeat):
+    # Entry point of the per-case worker process
+    case = next(c for c in build_cases(quick) if c.name == name)
+    return measure(case, repeat)
+
+
+def run_cases(cases, quick, repeat, isolate=True):
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for case in cases:
+        if isolate:
+            with ctx.Pool(1) as pool:
+                result = pool.apply(_measure_by_name, (case.name, quick, repeat))
+        else:
+            result = measure(case, repeat)
+        results.append(result)
+        print(
+            f"{result['name']:<60} {result['time_s']:>9.4f} s "
+            f"{result['peak_rss_mb'] or float('nan'):>8.1f} MB RSS",
+            flush=True,
+        )
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare results with a baseline results document.
+
+    Returns:
+        List of (name, baseline_time, time, ratio) for cases that are more
+        than tolerance slower than the baseline, or whose expansion count grew
+    """
+    previous = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(result["name"])
+        if old is None:
+            continue
+        ratio = result["time_s"] / old["time_s"] if old["time_s"] > 0 else 1.0
+        more_work = result.get("expanded", 0) > old.get("expanded", 0)
+        if ratio > 1 + tolerance or more_work:
+            regressions.append((result["name"], old["time_s"], result["time_s"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="compare with this results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative slowdown against the baseline")
+    parser.add_argument("--filter", default="", help="only run cases containing this text")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="small parameter set")
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="run in this process (peak RSS is then cumulative)")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in build_cases(args.quick) if args.filter in c.name]
+    results = run_cases(cases, args.quick, args.repeat, isolate=not args.no_isolate)
+
+    document = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        for name, old, new, ratio in regressions:
+            print(f"REGRESSION {name}: {old:.4f} s -> {new:.4f} s ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+# cli.py
+"""
+Headless batch planner for scene files in the examples.yml format.
+
+Plans every selected scene (in parallel processes with --workers) and
+writes routes and timings as JSON or CSV. Never imports PyQt5 or
+matplotlib, so it runs on machines without a display.
+
+Run from src/:
+    python cli.py --output routes.json
+    python cli.py my_scenes.yml --scene "Example 1" -M 200 --output routes.csv
+    python cli.py --planner jps --workers 4 --repeat 10
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from examples import get_all_examples
+from planner.astar_planner import astar_torus, bidirectional_astar_torus, jps_torus
+from planner.collision import get_occupancy_grid
+from planner.cspace_cache import CSpaceCache
+from planner.lazy_cspace import plan_lazy
+from planner.multires import plan_multires
+from planner.nlink_arm import NLinkArm
+from planner.sampling_planner import SAMPLING_METHODS, plan_sampling
+
+DEFAULT_SCENES = Path(__file__).resolve().parent / "examples.yml"
+
+# Scene files give start and goal as cells of a grid of this resolution
+SCENE_M = 100
+
+GRID_SEARCHES = {
+    "astar": astar_torus,
+    "bidirectional": bidirectional_astar_torus,
+    "jps": jps_torus,
+}
+PLANNERS = tuple(GRID_SEARCHES) + ("lazy", "multires") + SAMPLING_METHODS
+
+CSV_FIELDS = [
+    "scene", "planner", "M", "reachable", "route_length", "expanded",
+    "grid_s", "search_s", "total_s", "error", "route",
+]
+
+
+def scene_nodes(scene, M):
+    """
+    Start and goal cells of a scene at resolution M.
+    """
+    def scale(node):
+        return tuple(int(round(c * M / SCENE_M)) % M for c in node)
+
+    return scale(scene["start"]), scale(scene["goal"])
+
+
+def multires_levels(M, max_levels=3):
+    # Deepest pyramid (up to max_levels) whose block size divides M
+    levels = 0
+    while levels < max_levels and M % 2 ** (levels + 1) == 0:
+        levels += 1
+    return levels
+
+
+def plan_scene(name, scene, M=SCENE_M, planner="astar", cache_dir=None):
+    """
+    Plan one scene and return a result dict with the route and timings.
+    """
+    t0 = time.perf_counter()
+    n = len(scene["link_lengths"])
+    arm = NLinkArm(scene["link_lengths"], [0] * n)
+    arm.joint_limits = scene["joint_limits"]
+    obstacles = scene["obstacles"]
+    start, goal = scene_nodes(scene, M)
+    stats = {}
+
+    grid_time = 0.0
+    if planner in GRID_SEARCHES:
+        if cache_dir is not None:
+            grid = CSpaceCache(cache_dir).get_or_build(arm, obstacles, M)
+        else:
+            grid = get_occupancy_grid(arm, obstacles, M)
+        grid_time = time.perf_counter() - t0
+        route = GRID_SEARCHES[planner](grid, start, goal, stats=stats)
+    elif planner == "lazy":
+        route, _ = plan_lazy(arm, obstacles, start, goal, M)
+    elif planner == "multires":
+        route = plan_multires(
+            arm, obstacles, start, goal, M=M, levels=multires_levels(M), stats=stats
+        )
+    elif planner in SAMPLING_METHODS:
+        route = plan_sampling(arm, obstacles, start, goal, M, method=planner, seed=0)
+    else:
+        raise ValueError(f"Unknown planner {planner!r}, expected one of {PLANNERS}.")
+    total = time.perf_counter() - t0
+
+    return {
+        "scene": name,
+        "planner": planner,
+        "M": M,
+        "reachable": bool(route),
+        "route_length": len(route),
+        "expanded": stats.get("expanded"),
+        "grid_s": grid_time,
+        "search_s": total - grid_time,
+        "total_s": total,
+        "error": None,
+        "route": [list(node) for node in route],
+    }
+
+
+def _run_job(job):
+    # Worker entry point: errors are reported in the result, not raised,
+    # so that one bad scene does not stop the batch
+    name, scene, M, planner, cache_dir = job
+    try:
+        return plan_scene(name, scene, M, planner, cache_dir)
+    except Exception as error:
+        return {"scene": name, "planner": planner, "M": M, "reachable": False,
+                "route_length": 0, "expanded": None, "grid_s": 0.0,
+                "search_s": 0.0, "total_s": 0.0, "error": repr(error), "route": []}
+
+
+def run_jobs(jobs, workers=1):
+    """
+    Run (name, scene, M, planner, cache_dir) jobs, in a process pool if
+    workers > 1. Results are returned in job order.
+    """
+    if workers > 1 and len(jobs) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(_run_job, jobs))
+        except (OSError, NotImplementedError):
+            pass  # No multiprocessing support here, run in this process
+    return [_run_job(job) for job in jobs]
+
+
+def write_results(results, path, fmt=None):
+    """
+    Write results as JSON (with a meta header) or CSV (one row per result,
+    route as a JSON string). fmt defaults to the file suffix.
+    """
+    path = Path(path)
+    fmt = fmt or ("csv" if path.suffix.lower() == ".csv" else "json")
+    if fmt == "csv":
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for result in results:
+                writer.writerow({**result, "route": json.dumps(result["route"])})
+    else:
+        document = {
+            "meta": {
+                "numpy": np.__version__,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }
+        path.write_text(json.dumps(document, indent=2))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scene_files", nargs="*", type=Path, default=[DEFAULT_SCENES],
+                        help="scene files in the examples.yml format (default: examples.yml)")
+    parser.add_argument("--scene", action="append", default=[],
+                        help="only plan this scene (repeatable)")
+    parser.add_argument("-M", "--resolution", type=int, default=SCENE_M,
+                        help="grid cells per joint")
+    parser.add_argument("--planner", choices=PLANNERS, default="astar")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="planning processes (0 = one per CPU)")
+    parser.add_argument("--repeat", type=int, default=1, help="plan every scene this often")
+    parser.add_argument("--cache-dir", type=Path,
+                        help="reuse occupancy grids from this C-space cache directory")
+    parser.add_argument("--output", type=Path, help="write results to this .json or .csv file")
+    parser.add_argument("--format", choices=("json", "csv"),
+                        help="output format (default: from the --output suffix)")
+    args = parser.parse_args(argv)
+
+    scenes = {}
+    for path in args.scene_files:
+        scenes.update(get_all_examples(path))
+    unknown = [name for name in args.scene if name not in scenes]
+    if unknown:
+        parser.error(f"unknown scene(s): {', '.join(unknown)}")
+    names = args.scene or list(scenes)
+
+    jobs = [
+        (name, scenes[name], args.resolution, args.planner, args.cache_dir)
+        for _ in range(args.repeat)
+        for name in names
+    ]
+    workers = args.workers or os.cpu_count() or 1
+
+    t0 = time.perf_counter()
+    results = run_jobs(jobs, workers)
+    wall = time.perf_counter() - t0
+
+    for result in results:
+        status = result["error"] or f"{result['route_length']} steps"
+        print(f"{result['scene']:<50} {result['total_s']:>9.4f} s  {status}", flush=True)
+    print(f"{len(results)} plans in {wall:.3f} s with {workers} worker(s)")
+
+    if args.output:
+        write_results(results, args.output, args.format)
+    return 1 if any(result["error"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,15 +7,17 @@ import numpy as np
 from math import pi
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QVBoxLayout,
-    QWidget, QComboBox, QMessageBox
+    QWidget, QComboBox, QMessageBox, QLabel
 )
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
 from examples import get_all_examples
 from planner.nlink_arm import NLinkArm
-from planner.collision import get_occupancy_grid
-from planner.astar_planner import astar_torus
+from planner.cspace_cache import CSpaceCache, default_cache_dir, scene_key
+from planner.path_smoothing import smooth_route
+from planner.sampling_planner import wrap_angles
+from planner.streaming import plan_stream
 from ui.trajectory_plot import TrajectoryPlotWindow
 
 
@@ -25,6 +27,7 @@ class ArmPlannerGUI(QMainWindow):
         self.setWindowTitle("2D Robotic Arm Path Planning Demo")
         self.setGeometry(100, 100, 900, 700)
         self.M = 100
+        self.cspace_cache = CSpaceCache(default_cache_dir())
         self.examples = get_all_examples()
         self.current_example_name = list(self.examples.keys())[0]
         self.init_ui()
@@ -47,6 +50,16 @@ class ArmPlannerGUI(QMainWindow):
         self.run_button.clicked.connect(self.run_example)
         layout.addWidget(self.run_button)
 
+        # Cancel button, active while planning
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_planning)
+        layout.addWidget(self.cancel_button)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+        self.cancel_requested = False
+
         container = QWidget()
         container.setLayout(layout)
         self.setCentralWidget(container)
@@ -79,6 +92,42 @@ class ArmPlannerGUI(QMainWindow):
         arm.draw(self.ax, obstacles=ex["obstacles"], goal_angles=ex["goal"])
         self.canvas.draw()
 
+    def cancel_planning(self):
+        self.cancel_requested = True
+
+    def plan_with_progress(self, arm, ex):
+        """
+        Plan while showing progress, returns the route or None if cancelled
+        """
+        key = scene_key(ex["link_lengths"], ex.get("joint_limits"), ex["obstacles"], self.M)
+        grid = self.cspace_cache.get(key)
+
+        self.cancel_requested = False
+        self.cancel_button.setEnabled(True)
+        self.run_button.setEnabled(False)
+        try:
+            for event in plan_stream(
+                arm, ex["obstacles"], ex["start"], ex["goal"], self.M,
+                grid=grid, chunk_size=4096,
+            ):
+                if event.kind == "grid":
+                    percent = 100 * event.done // event.total
+                    self.status_label.setText(f"Building C-space: {percent}%")
+                elif event.kind == "search":
+                    self.status_label.setText(f"Searching: {event.done} nodes expanded")
+                QApplication.processEvents()
+                if self.cancel_requested:
+                    self.status_label.setText("Planning cancelled")
+                    return None
+        finally:
+            self.cancel_button.setEnabled(False)
+            self.run_button.setEnabled(True)
+
+        if grid is None:
+            self.cspace_cache.put(key, event.grid)
+        self.status_label.setText(f"Route found: {len(event.route)} steps")
+        return event.route
+
     def run_example(self):
         """
         Execute path planning: show trajectory plot window first, then play animation
@@ -100,30 +149,36 @@ class ArmPlannerGUI(QMainWindow):
             joint_limits=ex.get("joint_limits")
         )
 
-        grid = get_occupancy_grid(arm, ex["obstacles"], self.M)
-        route = astar_torus(grid, tuple(ex["start"]), tuple(ex["goal"]))
+        route = self.plan_with_progress(arm, ex)
+        if route is None:
+            return
 
         if not route:
             QMessageBox.warning(self, "End-effector trajectory", "Path inaccessible")
             return
 
-        # Calculate end-effector trajectory in advance
-        ee_x, ee_y = [], []
-        for node in route:
-            theta1 = 2 * pi * node[0] / self.M - pi
-            theta2 = 2 * pi * node[1] / self.M - pi
-            arm.update_joints([theta1, theta2])
-            arm.update_points()
-            ee = arm.end_effector
-            ee_x.append(ee[0])
-            ee_y.append(ee[1])
-
-        # Play animation
+        # Far fewer waypoints than the grid route, timed for the animation
+        trajectory = smooth_route(
+            arm, ex["obstacles"], route, self.M, max_velocity=2.0, max_acceleration=4.0
+        )
+        self.status_label.setText(
+            f"Route found: {len(route)} steps, {len(trajectory)} waypoints"
+        )
+
+        # Calculate end-effector trajectory in advance, all poses at once
+        _, frames = trajectory.sample(0.02)
+        poses = arm.batch_points(frames)
+        ee_x = poses[:, -1, 0].tolist()
+        ee_y = poses[:, -1, 1].tolist()
+
+        # Play animation in real time, frames are dropped if drawing is slow
         self.ax.clear()
-        for node in route:
-            theta1 = 2 * pi * node[0] / self.M - pi
-            theta2 = 2 * pi * node[1] / self.M - pi
-            arm.update_joints([theta1, theta2])
+        started = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < trajectory.duration:
+            elapsed = min(time.perf_counter() - started, trajectory.duration)
+            angles = wrap_angles(trajectory.positions([elapsed])[0])
+            arm.update_joints(list(angles))
             arm.draw(self.ax, ex["obstacles"], ee_x, ee_y)
             self.canvas.draw()
             QApplication.processEvents()
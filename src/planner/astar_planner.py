@@ -1,71 +1,713 @@
+import heapq
+from array import array
+
 import numpy as np
 
 
-def astar_torus(grid, start_node, goal_node):
-    dims = len(grid.shape)
-    M = grid.shape[0]
+# Grids up to this many cells keep the search state in dense arrays
+# (about 5 bytes per cell); larger grids use dicts of visited nodes only.
+DENSE_STATE_LIMIT = 1 << 24
+
+_UNREACHED = int(np.iinfo(np.int32).max)
+_NO_PARENT = 255
+
+
+def astar_torus(
+    grid,
+    start_node,
+    goal_node,
+    heuristic="manhattan",
+    weight=1.0,
+    state="auto",
+    stats=None,
+    edge_validator=None,
+):
+    """
+    A* search on a toroidal grid where every axis wraps around.
+
+    Moves change one coordinate by +-1 at unit cost. A neighbor can be
+    entered if it is free or if it is the goal. The open set is a binary
+    heap keyed by (f, flat index), so among equal f values the node with
+    the smallest C-order index is expanded first. Stale heap entries are
+    skipped on pop (lazy deletion).
+
+    The heuristic ("manhattan", "weighted" or "zero", see calc_heuristic_map)
+    is evaluated per node when it is first reached instead of for the
+    whole grid up front. A callable h(flat_index) can be passed instead,
+    e.g. the landmark heuristic of a CSpaceRoadmap.
+
+    grid is a dense array or any object with a shape and an
+    is_occupied(flat_index) method, such as a packed CSpaceGrid.
+
+    state selects how g-costs, parents and the closed set are stored:
+    "dense" uses int32 costs, uint8 direction codes and a closed bitmap over
+    the whole grid, "sparse" uses dicts holding only visited nodes, "auto"
+    picks dense up to DENSE_STATE_LIMIT cells.
+
+    If a dict is passed as stats, stats["expanded"] is set to the number of
+    expanded nodes.
+
+    edge_validator (e.g. an EdgeValidator) also checks the motion between
+    two free cells: a move is only taken if
+    edge_validator.is_valid(index, neighbor, direction) is true. Moves out
+    of an occupied start or into an occupied goal are not checked.
+
+    Returns:
+        List of node tuples from start to goal, [] if the goal is unreachable
+    """
+    for expanded, path, _ in iter_astar_torus(
+        grid, start_node, goal_node, heuristic, weight, state, report_every=None,
+        edge_validator=edge_validator,
+    ):
+        pass
+    if stats is not None:
+        stats["expanded"] = expanded
+    return path
+
+
+def iter_astar_torus(
+    grid,
+    start_node,
+    goal_node,
+    heuristic="manhattan",
+    weight=1.0,
+    state="auto",
+    report_every=1000,
+    edge_validator=None,
+):
+    """
+    Incremental version of astar_torus.
 
-    parent_map = np.empty(grid.shape, dtype=object)
-    heuristic_map = calc_heuristic_map(grid, goal_node)
+    Yields (expanded, path, finished). Every report_every node expansions it
+    yields finished=False with the route to the expanded node that is
+    closest to the goal by heuristic. The last item has finished=True and
+    the route astar_torus would return. report_every=None only yields the
+    final result. Stop iterating to cancel the search.
+    """
+    shape = grid.shape
+    is_occupied = _occupancy_lookup(grid)
+    size = int(np.prod(shape))
+    heuristic_fn = heuristic_function(shape, goal_node, heuristic, weight)
 
-    explored_heuristic_map = np.full(grid.shape, np.inf)
-    distance_map = np.full(grid.shape, np.inf)
+    start = int(np.ravel_multi_index(start_node, shape))
+    goal = int(np.ravel_multi_index(goal_node, shape))
+    strides = _flat_strides(shape)
 
-    explored_heuristic_map[start_node] = heuristic_map[start_node]
-    distance_map[start_node] = 0
+    distance_map, parent_map, closed = _search_state(size, state)
+    distance_map[start] = 0
+    open_heap = [(heuristic_fn(start), start, 0)]
+    if edge_validator is not None:
+        edge_valid = edge_validator.is_valid
+        unchecked = {n for n in (start, goal) if is_occupied(n)}
 
-    while True:
-        current_node = np.unravel_index(np.argmin(explored_heuristic_map), grid.shape)
-        if current_node == goal_node or np.isinf(explored_heuristic_map[current_node]):
+    def route_to(node):
+        # Each direction code is the move into the node; its opposite
+        # (code ^ 1) leads back to the parent
+        path = [node]
+        while path[-1] != start:
+            direction = parent_map[path[-1]]
+            path.append(_flat_neighbors(path[-1], shape, strides)[direction ^ 1])
+        path.reverse()
+        return [tuple(int(i) for i in np.unravel_index(n, shape)) for n in path]
+
+    expanded = 0
+    best_node, best_h = start, np.inf
+    while open_heap:
+        f, current, dist = heapq.heappop(open_heap)
+        if dist != distance_map[current] or current in closed:
+            continue  # Stale entry, node was improved or already expanded
+        if current == goal:
             break
 
-        explored_heuristic_map[current_node] = np.inf
-        neighbors = find_neighbors_nd(current_node, M, dims)
+        closed.add(current)
+        expanded += 1
+        new_dist = dist + 1
+        if f - dist < best_h:
+            best_node, best_h = current, f - dist
+        if report_every and expanded % report_every == 0:
+            yield expanded, route_to(best_node), False
 
-        for neighbor in neighbors:
-            if grid[neighbor] == 0 or neighbor == goal_node:
-                new_dist = distance_map[current_node] + 1
+        neighbors = _flat_neighbors(current, shape, strides)
+        for direction, neighbor in enumerate(neighbors):
+            if not is_occupied(neighbor) or neighbor == goal:
                 if new_dist < distance_map[neighbor]:
+                    if (
+                        edge_validator is not None
+                        and current not in unchecked
+                        and neighbor not in unchecked
+                        and not edge_valid(current, neighbor, direction)
+                    ):
+                        continue
                     distance_map[neighbor] = new_dist
-                    explored_heuristic_map[neighbor] = (
-                        new_dist + heuristic_map[neighbor]
+                    parent_map[neighbor] = direction
+                    closed.discard(neighbor)  # Reopen if already expanded
+                    heapq.heappush(
+                        open_heap,
+                        (new_dist + heuristic_fn(neighbor), neighbor, new_dist),
                     )
-                    parent_map[neighbor] = current_node
 
-    if parent_map[goal_node] is None:
+    if parent_map[goal] == _NO_PARENT:
+        yield expanded, [], True
+    else:
+        yield expanded, route_to(goal), True
+
+
+def bidirectional_astar_torus(grid, start_node, goal_node, state="auto", stats=None):
+    """
+    Bidirectional A* on the same toroidal grid model as astar_torus.
+
+    A forward search from the start (toroidal Manhattan distance to the
+    goal) and a backward search from the goal (distance to the start) take
+    turns so that both expand about as many nodes. Open nodes are keyed by
+    f = g + h, ties going to the larger g. The search stops once the lower
+    bound max(f_forward, f_backward, g_forward + g_backward + 1) of the
+    open lists (smallest f and g on each side) reaches the best meeting
+    cost found, and nodes whose f reaches it are not added at all (the
+    termination rule of MM/NBS). The route has the same (optimal) length
+    as astar_torus, though equal-length alternatives may be chosen
+    differently.
+
+    If a dict is passed as stats, it receives "expanded" (total) and
+    "expanded_forward" / "expanded_backward".
+
+    Returns:
+        List of node tuples from start to goal, [] if the goal is unreachable
+    """
+    shape = grid.shape
+    is_occupied = _occupancy_lookup(grid)
+    size = int(np.prod(shape))
+
+    start = int(np.ravel_multi_index(start_node, shape))
+    goal = int(np.ravel_multi_index(goal_node, shape))
+    strides = _flat_strides(shape)
+
+    # start == goal gives [] like astar_torus, which never records a parent
+    if start == goal:
+        if stats is not None:
+            stats.update(expanded=0, expanded_forward=0, expanded_backward=0)
         return []
 
-    path = [goal_node]
-    while path[0] != start_node:
-        path.insert(0, parent_map[path[0]])
-    return path
+    # Per direction: g-costs, parent direction codes, closed set, open heap
+    # keyed by (f, -g), a heap of the open g-costs, the heuristic, and the
+    # node that is never expanded (the other side's root). A forward move
+    # u -> v needs v free or v == goal. The backward search expands v (the
+    # goal or a free cell) and may add any predecessor u that is free or
+    # the start.
+    sides = []
+    for root, target in ((start, goal), (goal, start)):
+        distance_map, parent_map, closed = _search_state(size, state)
+        distance_map[root] = 0
+        h = heuristic_function(shape, np.unravel_index(target, shape))
+        heap, g_heap = [(h(root), 0, root)], [(0, root)]
+        sides.append((distance_map, parent_map, closed, heap, g_heap, h, target))
+
+    def settle(side):
+        # Drop stale entries from the tops of both heaps of a side
+        distance_map, _, closed, heap, g_heap = side[:5]
+        while heap and (-heap[0][1] != distance_map[heap[0][2]] or heap[0][2] in closed):
+            heapq.heappop(heap)
+        while g_heap and (g_heap[0][0] != distance_map[g_heap[0][1]] or g_heap[0][1] in closed):
+            heapq.heappop(g_heap)
+        return bool(heap)
+
+    best, meet = np.inf, None
+    expanded = [0, 0]
+    while settle(sides[0]) and settle(sides[1]):
+        forward, backward = sides
+        bound = max(forward[3][0][0], backward[3][0][0], forward[4][0][0] + backward[4][0][0] + 1)
+        if bound >= best:
+            break
+
+        side = 0 if expanded[0] <= expanded[1] else 1
+        distance_map, parent_map, closed, heap, g_heap, h, target = sides[side]
+        other_distance = sides[1 - side][0]
 
+        _, dist, current = heapq.heappop(heap)
+        dist = -dist
+        closed.add(current)
+        if current == target:
+            continue  # The other side's root is a path end, not a waypoint
+        expanded[side] += 1
+        new_dist = dist + 1
+
+        neighbors = _flat_neighbors(current, shape, strides)
+        for direction, neighbor in enumerate(neighbors):
+            if is_occupied(neighbor) and neighbor != target:
+                continue
+            if new_dist >= distance_map[neighbor]:
+                continue
+            f = new_dist + h(neighbor)
+            if f >= best:
+                continue  # Cannot lead to a shorter route
+            distance_map[neighbor] = new_dist
+            parent_map[neighbor] = direction
+            closed.discard(neighbor)
+            heapq.heappush(heap, (f, -new_dist, neighbor))
+            heapq.heappush(g_heap, (new_dist, neighbor))
+
+            other = other_distance[neighbor]
+            if other != _UNREACHED and new_dist + other < best:
+                best, meet = new_dist + other, neighbor
+
+    if stats is not None:
+        stats["expanded_forward"], stats["expanded_backward"] = expanded
+        stats["expanded"] = sum(expanded)
+
+    if meet is None:
+        return []
+
+    def chain(parent_map, node, root):
+        nodes = [node]
+        while nodes[-1] != root:
+            direction = parent_map[nodes[-1]]
+            nodes.append(_flat_neighbors(nodes[-1], shape, strides)[direction ^ 1])
+        return nodes
+
+    path = chain(sides[0][1], meet, start)[::-1] + chain(sides[1][1], meet, goal)[1:]
+    return [tuple(int(i) for i in np.unravel_index(n, shape)) for n in path]
+
+
+def jps_torus(grid, start_node, goal_node, state="auto", stats=None):
+    """
+    Jump Point Search on the same toroidal grid model as astar_torus.
+
+    With unit move costs, many shortest paths differ only in the order of
+    their moves. This search only follows paths that move along axis a and
+    then turn to later axes (b > a), turning back to an earlier axis only
+    where a blocked cell beside the previous step forces it (the pruning
+    of find_neighbors_nd with a parent). Straight runs are followed
+    without queueing their cells, and only the cells where a path may
+    turn (jump points) enter the open set. Runs wrap around every axis.
+
+    Whether a cell is a jump point depends on the jumps along later axes.
+    For a dense array grid all jumps are computed up front with numpy
+    (_jump_tables, a few passes over the grid per direction), which makes
+    the search faster than astar_torus on 2-link grids, but costs more
+    than plain A* expands on 3-link grids with a good heuristic. Other
+    grid objects are scanned cell by cell in Python, with the scans along
+    later axes memoized; that covers a large part of the grid.
+
+    Routes have the same (optimal) length as astar_torus, though
+    equal-length alternatives may be chosen differently. If a dict is
+    passed as stats, stats["expanded"] is set to the number of expanded
+    jump points and stats["scanned"] to the number of cells stepped over
+    (by the followed jumps only, for dense grids).
+
+    Returns:
+        List of node tuples from start to goal, [] if the goal is unreachable
+    """
+    shape = grid.shape
+    is_occupied = _occupancy_lookup(grid)
+    size = int(np.prod(shape))
+    heuristic_fn = heuristic_function(shape, goal_node)
+
+    start = int(np.ravel_multi_index(start_node, shape))
+    goal = int(np.ravel_multi_index(goal_node, shape))
+    strides = _flat_strides(shape)
+    dims = len(shape)
+    # Moving along an axis of size 1 stays in place
+    axes = [axis for axis in range(dims) if shape[axis] > 1]
+
+    def step(index, direction):
+        stride, length = strides[direction >> 1], shape[direction >> 1]
+        coord = (index // stride) % length
+        if direction & 1:
+            return index + stride if coord < length - 1 else index - (length - 1) * stride
+        return index - stride if coord > 0 else index + (length - 1) * stride
+
+    def enterable(index):
+        return index == goal or not is_occupied(index)
+
+    def successors(index, previous, direction):
+        # Pruned move directions out of index, entered from previous
+        def blocked_beside(turn):
+            return not enterable(step(previous, turn))
+
+        turns = _pruned_directions(direction, dims, blocked_beside)
+        return [turn for turn in turns if turn >> 1 in axes]
+
+    def run_length(origin, index, direction):
+        stride, length = strides[direction >> 1], shape[direction >> 1]
+        delta = (index // stride) % length - (origin // stride) % length
+        return (delta if direction & 1 else -delta) % length
+
+    jumps = {}
+    scanned = 0
+    tables = None
+    if isinstance(grid, np.ndarray) and start != goal:
+        # Dense grids: all jumps at once from per-direction numpy tables
+        enterable_cells = np.asarray(grid).reshape(shape) == 0
+        enterable_cells.flat[goal] = True
+        tables = _jump_tables(enterable_cells, goal, axes)
+
+        def table_jump(index, direction):
+            nonlocal scanned
+            length = int(tables[direction][index])
+            if not length:
+                return None
+            scanned += length
+            stride, extent = strides[direction >> 1], shape[direction >> 1]
+            coord = (index // stride) % extent
+            moved = (coord + length if direction & 1 else coord - length) % extent
+            return index + (moved - coord) * stride
+
+    def is_jump_point(index, previous, direction):
+        if index == goal:
+            return True
+        for turn in successors(index, previous, direction):
+            if turn >> 1 < direction >> 1:
+                if enterable(step(index, turn)):
+                    return True  # Forced turn to an earlier axis
+            elif turn >> 1 > direction >> 1 and jump(index, turn) is not None:
+                return True
+        return False
+
+    def scan(index, direction):
+        # First jump point reached by moving from index in direction, or
+        # None. Every cell passed on the way has the same answer, so all
+        # of them are memoized.
+        nonlocal scanned
+        key = index * 2 * dims + direction
+        if key in jumps:
+            return jumps[key]
+        passed = []
+        current = index
+        while True:
+            following = step(current, direction)
+            scanned += 1
+            if following == index:
+                # Wrapped around: index itself ends the run for the others
+                found = index if is_jump_point(index, current, direction) else None
+                break
+            if not enterable(following):
+                found = None
+                break
+            if is_jump_point(following, current, direction):
+                found = following
+                break
+            following_key = following * 2 * dims + direction
+            if following_key in jumps:
+                found = jumps[following_key]
+                passed.append(following)
+                break
+            passed.append(following)
+            current = following
+        for cell in passed:
+            jumps[cell * 2 * dims + direction] = found
+        jumps[key] = None if found == index else found
+        return jumps[key]
+
+    jump = scan if tables is None else table_jump
+
+    # start == goal gives [] like astar_torus, which never records a parent
+    expanded = 0
+    distance_map, parent_map, closed = _search_state(size, state)
+    origins = {}
+    if start != goal:
+        distance_map[start] = 0
+        open_heap = [(heuristic_fn(start), start, 0)]
+    else:
+        open_heap = []
+
+    while open_heap:
+        _, current, dist = heapq.heappop(open_heap)
+        if dist != distance_map[current] or current in closed:
+            continue  # Stale entry, node was improved or already expanded
+        if current == goal:
+            break
 
-def find_neighbors_nd(node, M, dims):
+        closed.add(current)
+        expanded += 1
+        if current == start:
+            directions = [d for d in range(2 * dims) if d >> 1 in axes]
+        else:
+            direction = parent_map[current]
+            directions = successors(current, step(current, direction ^ 1), direction)
+
+        for direction in directions:
+            point = jump(current, direction)
+            if point is None:
+                continue
+            new_dist = dist + run_length(current, point, direction)
+            if new_dist < distance_map[point]:
+                distance_map[point] = new_dist
+                parent_map[point] = direction
+                origins[point] = current
+                closed.discard(point)
+                heapq.heappush(open_heap, (new_dist + heuristic_fn(point), point, new_dist))
+
+    if stats is not None:
+        stats["expanded"] = expanded
+        stats["scanned"] = scanned
+
+    if parent_map[goal] == _NO_PARENT:
+        return []
+    path = [goal]
+    while path[-1] != start:
+        node, origin = path[-1], origins[path[-1]]
+        direction = parent_map[node]
+        while node != origin:
+            node = step(node, direction ^ 1)
+            path.append(node)
+    path.reverse()
+    return [tuple(int(i) for i in np.unravel_index(n, shape)) for n in path]
+
+
+class _SparseMap(dict):
+    # Dict that reads missing keys as a default without storing them
+    def __init__(self, default):
+        super().__init__()
+        self.default = default
+
+    def __missing__(self, key):
+        return self.default
+
+
+class _Bitmap:
+    # Set of flat indices stored as one bit per cell
+    def __init__(self, size):
+        self.bits = bytearray((size + 7) // 8)
+
+    def __contains__(self, index):
+        return (self.bits[index >> 3] >> (index & 7)) & 1
+
+    def add(self, index):
+        self.bits[index >> 3] |= 1 << (index & 7)
+
+    def discard(self, index):
+        self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+
+def _search_state(size, state):
+    # (g-costs, parent direction codes, closed set) for a grid of size cells
+    if state == "auto":
+        state = "dense" if size <= DENSE_STATE_LIMIT else "sparse"
+    if state == "dense":
+        # array/bytearray rather than NumPy: same int32/uint8 layout, but
+        # much cheaper element access from Python
+        return (
+            array("i", [_UNREACHED]) * size,
+            bytearray([_NO_PARENT]) * size,
+            _Bitmap(size),
+        )
+    if state == "sparse":
+        return _SparseMap(_UNREACHED), _SparseMap(_NO_PARENT), set()
+    raise ValueError(f"Unknown search state {state!r}, expected auto, dense or sparse.")
+
+
+def _occupancy_lookup(grid):
+    # Flat-index occupancy test for dense arrays and grid objects
+    if hasattr(grid, "is_occupied"):
+        return grid.is_occupied
+    return (np.asarray(grid).reshape(-1) != 0).__getitem__
+
+
+def _flat_strides(shape):
+    # C-order strides of the grid in elements
+    strides = [1] * len(shape)
+    for i in range(len(shape) - 2, -1, -1):
+        strides[i] = strides[i + 1] * shape[i + 1]
+    return strides
+
+
+def _flat_neighbors(index, shape, strides):
+    # Same neighbor order as find_neighbors_nd, on flat indices
+    neighbors = []
+    for size, stride in zip(shape, strides):
+        coord = (index // stride) % size
+        neighbors.append(index - stride if coord > 0 else index + (size - 1) * stride)
+        neighbors.append(
+            index + stride if coord < size - 1 else index - (size - 1) * stride
+        )
+    return neighbors
+
+
+def find_neighbors_nd(node, M, dims, parent=None, is_occupied=None):
+    """
+    Wrap-around neighbors of node, two per axis (-1, then +1).
+
+    If parent (the adjacent node the search came from) is given, only the
+    successors Jump Point Search keeps are returned: straight on, turns to
+    later axes, and turns to earlier axes that are forced because the cell
+    beside the parent in that direction is occupied (is_occupied(node) is
+    true; without is_occupied nothing is occupied).
+    """
     neighbors = []
     for i in range(dims):
         for delta in [-1, 1]:
             neighbor = list(node)
             neighbor[i] = (neighbor[i] + delta) % M
             neighbors.append(tuple(neighbor))
-    return neighbors
+    if parent is None:
+        return neighbors
+
+    axis = next(i for i in range(dims) if node[i] != parent[i])
+    direction = 2 * axis + ((node[axis] - parent[axis]) % M == 1)
+
+    def blocked_beside(turn):
+        if is_occupied is None:
+            return False
+        beside = list(parent)
+        beside[turn >> 1] = (beside[turn >> 1] + (1 if turn & 1 else -1)) % M
+        return bool(is_occupied(tuple(beside)))
+
+    return [neighbors[turn] for turn in _pruned_directions(direction, dims, blocked_beside)]
+
+
+def _jump_tables(enterable, goal, axes):
+    """
+    Jumps of jps_torus for every cell of a dense grid, computed with numpy.
+
+    enterable is the boolean grid of cells a move may enter (free cells and
+    the goal), axes the axes longer than one cell. Directions are handled
+    from the last axis to the first: a cell is a jump point for a direction
+    if it is the goal, if it has a forced turn to an earlier axis, or if a
+    jump along a later axis (already in the tables) finds a jump point. A
+    jump then ends at the first cell along the direction that is blocked
+    (no jump) or a jump point, found for all lines of the grid at once.
+
+    Returns:
+        List indexed by direction code, flat arrays with the number of
+        cells to the jump point (0 = no jump point), None for other axes
+    """
+    shape = enterable.shape
+    is_goal = np.zeros(shape, dtype=bool)
+    is_goal.flat[goal] = True
+    tables = [None] * (2 * len(shape))
+    found = [None] * (2 * len(shape))
+    for axis in reversed(axes):
+        for direction in (2 * axis, 2 * axis + 1):
+            sign = 1 if direction & 1 else -1
+            jump_point = is_goal.copy()
+            for earlier in (a for a in axes if a < axis):
+                for turn in (2 * earlier, 2 * earlier + 1):
+                    # Turn enterable here but blocked beside the previous cell
+                    beside = np.roll(enterable, -1 if turn & 1 else 1, axis=earlier)
+                    jump_point |= beside & ~np.roll(beside, sign, axis=axis)
+            for later in (a for a in axes if a > axis):
+                jump_point |= found[2 * later] | found[2 * later + 1]
+            lengths = _run_lengths(~enterable | jump_point, enterable, axis, sign)
+            found[direction] = lengths > 0
+            tables[direction] = lengths.reshape(-1)
+    return tables
+
+
+def _run_lengths(stops, enterable, axis, sign):
+    # Cells from every cell to the first stop along axis in direction sign,
+    # wrapping around; 0 where that stop is blocked, the cell itself or
+    # missing. A stop at position p is coded 2 * p + blocked, so one
+    # running minimum over the line (twice, for the wrap-around) finds both
+    # the nearest stop and whether it is blocked.
+    size = stops.shape[axis]
+    stops = np.moveaxis(stops, axis, -1)
+    blocked = np.moveaxis(~enterable, axis, -1)
+    if sign < 0:
+        stops, blocked = stops[..., ::-1], blocked[..., ::-1]
+    positions = 2 * np.arange(2 * size, dtype=np.int32)
+    codes = np.where(
+        np.concatenate([stops, stops], axis=-1),
+        positions + np.concatenate([blocked, blocked], axis=-1),
+        np.int32(4 * size),
+    )
+    following = np.minimum.accumulate(codes[..., ::-1], axis=-1)[..., ::-1][..., 1:size + 1]
+    lengths = (following >> 1) - positions[:size] // 2
+    lengths = np.where((lengths < size) & (following & 1 == 0), lengths, 0)
+    if sign < 0:
+        lengths = lengths[..., ::-1]
+    lengths = lengths.astype(np.min_scalar_type(size))
+    return np.ascontiguousarray(np.moveaxis(lengths, -1, axis))
+
+
+def _pruned_directions(direction, dims, blocked_beside):
+    # Direction codes (2 * axis, +1 for the positive side) that JPS keeps
+    # after a move with code direction: straight on, both sides of every
+    # later axis, and sides of earlier axes where blocked_beside(code)
+    # says the cell next to the previous node is blocked. In free space
+    # this leaves one shortest path per pair of cells, moving through the
+    # axes in increasing order.
+    axis = direction >> 1
+    turns = []
+    for code in range(2 * dims):
+        if code >> 1 == axis:
+            keep = code == direction
+        elif code >> 1 > axis:
+            keep = True
+        else:
+            keep = blocked_beside(code)
+        if keep:
+            turns.append(code)
+    return turns
+
 
+HEURISTICS = ("manhattan", "weighted", "zero")
 
-def calc_heuristic_map(grid, goal_node):
-    dims = len(grid.shape)
+
+def _axis_distances(shape, goal_node):
+    # Wrap-around distance to the goal coordinate along each axis
+    dims = len(shape)
     if len(goal_node) != dims:
         msg = f"Goal node has {len(goal_node)} dimensions but grid has {dims}."
         raise ValueError(msg)
 
-    heuristic_map = np.zeros_like(grid, dtype=float)
-    it = np.nditer(grid, flags=["multi_index"])
-    while not it.finished:
-        heuristic_map[it.multi_index] = sum(
-            min(
-                abs(it.multi_index[i] - goal_node[i]),
-                grid.shape[i] - abs(it.multi_index[i] - goal_node[i]),
-            )
-            for i in range(dims)
+    distances = []
+    for size, goal in zip(shape, goal_node):
+        delta = np.abs(np.arange(size) - goal)
+        distances.append(np.minimum(delta, size - delta))
+    return distances
+
+
+def _heuristic_scale(heuristic, weight):
+    if heuristic not in HEURISTICS:
+        raise ValueError(f"Unknown heuristic {heuristic!r}, expected one of {HEURISTICS}.")
+    if heuristic == "zero":
+        return 0.0
+    if heuristic == "weighted":
+        return float(weight)
+    return 1.0
+
+
+def heuristic_function(shape, goal_node, heuristic="manhattan", weight=1.0):
+    """
+    Return h(flat_index) for the grid shape without building a full map.
+
+    heuristic may also be a callable h(flat_index), which is returned as is.
+    """
+    if callable(heuristic):
+        return heuristic
+    axis_distances = _axis_distances(shape, goal_node)
+    scale = _heuristic_scale(heuristic, weight)
+    if scale == 0:
+        return lambda index: 0.0
+
+    axes = [
+        (stride, size, distances.tolist())
+        for stride, size, distances in zip(_flat_strides(shape), shape, axis_distances)
+    ]
+
+    def h(index):
+        return scale * sum(
+            distances[(index // stride) % size] for stride, size, distances in axes
         )
-        it.iternext()
-    return heuristic_map
+
+    return h
+
+
+def calc_heuristic_map(grid, goal_node, heuristic="manhattan", weight=1.0):
+    """
+    Heuristic value of every cell for a given goal.
+
+    heuristic:
+        "manhattan": toroidal Manhattan distance to the goal
+        "weighted": toroidal Manhattan distance multiplied by weight
+        "zero": 0 everywhere (A* becomes Dijkstra)
+    """
+    axis_distances = _axis_distances(grid.shape, goal_node)
+    scale = _heuristic_scale(heuristic, weight)
+
+    # Sum of per-axis distance vectors, broadcast over the grid
+    heuristic_map = np.zeros(grid.shape, dtype=float)
+    for i, distances in enumerate(axis_distances):
+        axis_shape = [1] * len(grid.shape)
+        axis_shape[i] = grid.shape[i]
+        heuristic_map += distances.reshape(axis_shape)
+    return scale * heuristic_map
@@ -0,0 +1,110 @@
+# planner/broad_phase.py
+
+import numpy as np
+
+# Relative slack added to every culling bound, so that rounding in the
+# forward kinematics can never drop an obstacle that the exact test hits
+_MARGIN = 1e-9
+
+
+class ObstacleGrid:
+    """
+    Uniform grid over obstacle centers for segment candidate queries.
+
+    With cell_size >= half the segment length + the largest radius, any
+    obstacle a segment can touch has its center in the 3x3 block of cells
+    around the segment midpoint.
+    """
+
+    def __init__(self, obstacles, cell_size):
+        self.obstacles = obstacles
+        self.cell_size = cell_size
+
+        # One empty border cell on each side keeps 3x3 lookups in range
+        centers = obstacles[:, :2]
+        self.origin = centers.min(axis=0) - cell_size
+        cells = np.floor((centers - self.origin) / cell_size).astype(int)
+        self.n_cells = cells.max(axis=0) + 2
+
+        # table[x, y] lists the obstacles in cell (x, y), padded with the
+        # index of an extra zero-radius obstacle that never collides
+        cell_ids = cells[:, 0] * self.n_cells[1] + cells[:, 1]
+        order = np.argsort(cell_ids, kind="stable")
+        counts = np.bincount(cell_ids, minlength=int(np.prod(self.n_cells)))
+        self.per_cell = int(counts.max())
+        slots = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+        table = np.full((int(np.prod(self.n_cells)), self.per_cell), len(obstacles))
+        table[cell_ids[order], slots] = order
+        self.table = table.reshape(self.n_cells[0], self.n_cells[1], self.per_cell)
+        self.padded = np.vstack([obstacles, [[0.0, 0.0, 0.0]]])
+
+    @property
+    def candidates_per_query(self):
+        return 9 * self.per_cell
+
+    def candidates(self, points):
+        """
+        Candidate obstacles around points (K, 2), as a (K, 9 * per_cell, 3)
+        array padded with zero-radius circles.
+        """
+        cells = np.floor((points - self.origin) / self.cell_size).astype(int)
+        cells = np.clip(cells, 1, self.n_cells - 2)
+        blocks = [
+            self.table[cells[:, 0] + dx, cells[:, 1] + dy]
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+        ]
+        return self.padded[np.concatenate(blocks, axis=1)]
+
+
+class BroadPhase:
+    """
+    Per-link obstacle culling for an arm with its base at the origin.
+
+    Link k never leaves the disk of radius sum(link_lengths[:k + 1]), so
+    obstacles outside it (and circles with non-positive radius) are dropped
+    for that link. When a link still has many candidates, they are put in
+    an ObstacleGrid and every segment is only tested against the obstacles
+    near its midpoint.
+    """
+
+    def __init__(self, link_lengths, obstacles, index_threshold=16):
+        link_lengths = np.asarray(link_lengths, dtype=float)
+        obstacles = np.asarray(obstacles, dtype=float).reshape(-1, 3)
+        obstacles = obstacles[obstacles[:, 2] > 0]
+        distance = np.hypot(obstacles[:, 0], obstacles[:, 1])
+
+        self.link_obstacles = []
+        self.link_index = []
+        for length, reach in zip(link_lengths, np.cumsum(link_lengths)):
+            keep = distance < (reach + obstacles[:, 2]) * (1 + _MARGIN) + _MARGIN
+            near = obstacles[keep]
+            index = None
+            if len(near) > index_threshold:
+                cell_size = (length / 2 + near[:, 2].max()) * (1 + _MARGIN) + _MARGIN
+                # Larger cells stay correct; keep the table near one cell per obstacle
+                extent = np.ptp(near[:, :2], axis=0).max()
+                cell_size = max(cell_size, extent / np.sqrt(len(near)))
+                index = ObstacleGrid(near, cell_size)
+                if index.candidates_per_query >= len(near):
+                    index = None  # Clustered obstacles, the index would not help
+            self.link_obstacles.append(near)
+            self.link_index.append(index)
+
+    @property
+    def empty(self):
+        return not any(len(near) for near in self.link_obstacles)
+
+    def link_candidates(self, k, a, b):
+        """
+        Obstacles to test against segments a -> b of link k (arrays of shape
+        (K, 2)): an (O, 3) array shared by all segments, a (K, C, 3) array
+        of per-segment candidates, or None if link k cannot collide.
+        """
+        near = self.link_obstacles[k]
+        if len(near) == 0:
+            return None
+        index = self.link_index[k]
+        if index is None:
+            return near
+        return index.candidates((a + b) / 2)
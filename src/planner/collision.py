@@ -1,7 +1,14 @@
 # planner/collision.py
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 
+from planner.broad_phase import _MARGIN, BroadPhase
+from planner.cspace_grid import CSpaceGrid
+from planner.nlink_arm import forward_kinematics
+
 
 def detect_collision(line_seg, circle):
     """
@@ -14,58 +21,502 @@ def detect_collision(line_seg, circle):
     Returns:
         True: collision detected; False: no collision
     """
-    a = np.array(line_seg[0])  # Start point
-    b = np.array(line_seg[1])  # End point
-    c = np.array(circle[:2])  # Circle center
-    r = circle[2]  # Radius
+    return bool(detect_collisions([line_seg], [circle])[0, 0])
 
-    if r <= 0:  # Handle zero or negative radius
-        return False
 
-    ab = b - a  # Line segment vector
-    ab_norm = np.linalg.norm(ab)  # Line segment length
+def detect_collisions(segments, obstacles):
+    """
+    Detect collisions between many line segments and many circular obstacles.
 
-    if ab_norm == 0:
-        # If start and end points are the same, check if point is inside circle
-        return np.linalg.norm(a - c) < r  # Use strict inequality
+    Same rules as detect_collision: the circle must strictly contain a point
+    of the segment (tangent segments do not collide), a segment whose
+    endpoints coincide is treated as a point, and circles with zero or
+    negative radius never collide.
 
-    # Calculate closest point using projection
-    t = np.dot(c - a, ab) / (ab_norm * ab_norm)
-    t = np.clip(t, 0, 1)  # Restrict to [0, 1] range (within line segment)
-    closest = a + t * ab
+    Parameters:
+        segments: Segment endpoints, array of shape (S, 2, 2)
+        obstacles: Circles [cx, cy, r], array of shape (O, 3)
 
-    # Check if closest point is inside circle
-    dist = np.linalg.norm(closest - c)
-    return dist < r  # Use strict inequality, ignore tangent points
+    Returns:
+        Boolean array of shape (S, O)
+    """
+    segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+    obstacles = np.asarray(obstacles, dtype=float).reshape(-1, 3)
+    return _segment_circle_hits(segments[:, 0], segments[:, 1], obstacles)
 
 
-def get_occupancy_grid(arm, obstacles, M=100):
-    dims = arm.n_links  # N dimensions
+def segments_collide(segments, obstacles):
+    """
+    Boolean array of shape (S,), True where a segment hits any obstacle.
+    """
+    return detect_collisions(segments, obstacles).any(axis=1)
+
+
+# Number of joint configurations evaluated per batch by get_occupancy_grid.
+# Bounds the size of the temporary (chunk, links, obstacles) arrays.
+DEFAULT_CHUNK_SIZE = 65536
+
+
+def _segment_circle_hits(a, b, obstacles):
+    """
+    Collision kernel behind detect_collisions.
+
+    Parameters:
+        a: Segment start points, array of shape (..., 2)
+        b: Segment end points, array of shape (..., 2)
+        obstacles: Circles, array of shape (O, 3), or (..., O, 3) to give
+            every segment its own candidate obstacles
+
+    Returns:
+        Boolean array of shape (..., O), True where the segment hits the circle
+    """
+    a = a[..., None, :]
+    b = b[..., None, :]
+    c = obstacles[..., :2]
+    r = obstacles[..., 2]
+
+    ab = b - a
+    ab_norm = np.sqrt(ab[..., 0] * ab[..., 0] + ab[..., 1] * ab[..., 1])
+    ac = c - a
+
+    # Project the circle center onto the segment; degenerate segments fall
+    # back to the distance between the point and the circle center
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (ac[..., 0] * ab[..., 0] + ac[..., 1] * ab[..., 1]) / (ab_norm * ab_norm)
+    t = np.where(ab_norm == 0, 0.0, np.clip(t, 0, 1))
+
+    closest = a + t[..., None] * ab
+    diff = closest - c
+    dist = np.sqrt(diff[..., 0] * diff[..., 0] + diff[..., 1] * diff[..., 1])
+    return (dist < r) & (r > 0)
+
+
+def limit_axis_masks(joint_limits, M, dims):
+    """
+    Per-axis joint-limit masks over the M grid angles of each joint.
+
+    The cells within limits are the outer AND of the masks. Returns None
+    for limit objects without axis_masks, which are then checked per cell.
+    """
+    if not hasattr(joint_limits, "axis_masks"):
+        return None
+    axis_angles = 2 * np.pi * np.arange(M) / M - np.pi
+    return joint_limits.axis_masks([axis_angles] * dims)
+
+
+def cell_occupancy(flat_indices, link_lengths, joint_limits, obstacles, M):
+    """
+    Occupancy of arbitrary grid cells.
+
+    Parameters:
+        flat_indices: Flat (C-order) indices into the (M,) * n_links grid
+        link_lengths, joint_limits: Arm description as in NLinkArm
+        obstacles: Circular obstacles [[cx, cy, r], ...], or a BroadPhase
+            built from them to reuse across calls
+
+    Returns:
+        Boolean array, True where the cell is occupied
+    """
+    dims = len(link_lengths)
     grid_shape = tuple([M] * dims)
-    grid = np.zeros(grid_shape, dtype=int)
-
-    # Iterate through all joint combinations
-    for idx in np.ndindex(grid.shape):
-        # Convert to corresponding joint angles
-        angles = [2 * np.pi * idx[i] / M - np.pi for i in range(dims)]
-
-        # Check angle limits
-        if arm.joint_limits and not arm.joint_limits.is_within_limits(angles):
-            grid[idx] = 1
-            continue
-
-        # Update arm pose
-        arm.update_joints(angles)
-
-        # Collision check
-        collision = False
-        points = arm.points
-        for k in range(len(points) - 1):
-            seg = [points[k], points[k + 1]]
-            if any(detect_collision(seg, obs) for obs in obstacles):
-                collision = True
+    link_lengths = np.asarray(link_lengths, dtype=float)
+    broad_phase = obstacles
+    if not isinstance(broad_phase, BroadPhase):
+        broad_phase = BroadPhase(link_lengths, obstacles)
+    idx = np.stack(np.unravel_index(flat_indices, grid_shape), axis=1)
+
+    # Convert to corresponding joint angles
+    angles = 2 * np.pi * idx / M - np.pi
+
+    # Check angle limits
+    occupied = np.zeros(len(idx), dtype=bool)
+    if joint_limits:
+        masks = limit_axis_masks(joint_limits, M, dims)
+        if masks is None:
+            occupied = np.array(
+                [not joint_limits.is_within_limits(list(a)) for a in angles],
+                dtype=bool,
+            )
+        else:
+            for i, mask in enumerate(masks):
+                occupied |= ~mask[idx[:, i]]
+
+    _mark_collisions(occupied, angles, link_lengths, broad_phase)
+    return occupied
+
+
+def angle_occupancy(joint_angles, link_lengths, joint_limits, obstacles):
+    """
+    Occupancy of arbitrary joint configurations, as in get_occupancy_grid.
+
+    Parameters:
+        joint_angles: Relative joint angles (radians), array of shape (K, n)
+        link_lengths, joint_limits: Arm description as in NLinkArm
+        obstacles: Circular obstacles [[cx, cy, r], ...], or a BroadPhase
+            built from them to reuse across calls
+
+    Returns:
+        Boolean array of shape (K,), True where the configuration violates
+        the joint limits or touches an obstacle
+    """
+    link_lengths = np.asarray(link_lengths, dtype=float)
+    angles = np.asarray(joint_angles, dtype=float).reshape(-1, len(link_lengths))
+    broad_phase = obstacles
+    if not isinstance(broad_phase, BroadPhase):
+        broad_phase = BroadPhase(link_lengths, obstacles)
+
+    occupied = np.zeros(len(angles), dtype=bool)
+    if joint_limits:
+        if hasattr(joint_limits, "axis_masks"):
+            for mask in joint_limits.axis_masks(list(angles.T)):
+                occupied |= ~mask
+        else:
+            occupied = np.array(
+                [not joint_limits.is_within_limits(list(a)) for a in angles], dtype=bool
+            )
+    _mark_collisions(occupied, angles, link_lengths, broad_phase)
+    return occupied
+
+
+def _mark_collisions(occupied, angles, link_lengths, broad_phase):
+    # Collision check link by link, each against its broad-phase candidates;
+    # configurations are dropped as soon as one link collides
+    free = np.flatnonzero(~occupied)
+    if len(free) and not broad_phase.empty:
+        points = forward_kinematics(link_lengths, angles[free])
+        for k in range(len(link_lengths)):
+            a, b = points[:, k], points[:, k + 1]
+            candidates = broad_phase.link_candidates(k, a, b)
+            if candidates is None:
+                continue
+            hit = _segment_circle_hits(a, b, candidates).any(axis=-1)
+            occupied[free[hit]] = True
+            free, points = free[~hit], points[~hit]
+            if not len(free):
+                break
+
+
+def _iter_occupancy_chunks(
+    link_lengths, joint_limits, obstacles, M, chunk_size, start=0, stop=None
+):
+    """
+    Yield (start, stop, occupancy) for consecutive ranges of flat (C-order)
+    grid indices in [start, stop), with occupancy as a boolean array of
+    length stop - start.
+    """
+    total = M ** len(link_lengths) if stop is None else stop
+    broad_phase = BroadPhase(link_lengths, obstacles)
+
+    for chunk_start in range(start, total, chunk_size):
+        chunk_stop = min(chunk_start + chunk_size, total)
+        flat = np.arange(chunk_start, chunk_stop)
+        occupied = cell_occupancy(flat, link_lengths, joint_limits, broad_phase, M)
+        yield chunk_start, chunk_stop, occupied
+
+
+def product_occupancy(axis_indices, link_lengths, joint_limits, obstacles, M):
+    """
+    Occupancy of the cells in a Cartesian product of per-axis grid indices.
+
+    Same cell semantics as get_occupancy_grid, but link k is evaluated once
+    per prefix of joint indices 0..k instead of once per cell: a prefix
+    whose link collides, or whose joint is outside its limits, marks every
+    cell below it occupied and is not expanded further, and a link is only
+    tested for prefixes with an obstacle within its length of the joint.
+
+    Parameters:
+        axis_indices: One 1-D array of grid indices (0..M-1) per joint
+        link_lengths, joint_limits: Arm description as in NLinkArm; limits
+            must provide axis_masks
+        obstacles: Circular obstacles [[cx, cy, r], ...], or a BroadPhase
+            built from them to reuse across calls
+
+    Returns:
+        Boolean array of shape tuple(len(a) for a in axis_indices), True
+        where the cell is occupied
+    """
+    link_lengths = np.asarray(link_lengths, dtype=float)
+    dims = len(link_lengths)
+    broad_phase = obstacles
+    if not isinstance(broad_phase, BroadPhase):
+        broad_phase = BroadPhase(link_lengths, obstacles)
+    masks = limit_axis_masks(joint_limits, M, dims) if joint_limits else None
+    if joint_limits and masks is None:
+        raise ValueError("product_occupancy needs joint limits with axis_masks.")
+    axis_indices = [np.asarray(values, dtype=np.int64).reshape(-1) for values in axis_indices]
+    sizes = [len(values) for values in axis_indices]
+    occupied = np.zeros(int(np.prod(sizes)), dtype=bool)
+
+    # Live prefixes as flat indices into the product of the axes so far,
+    # with the position of their last joint and the heading of their last link
+    alive = np.zeros(1, dtype=np.int64)
+    joints = np.zeros((1, 2))
+    headings = np.zeros(1)
+    for k, length in enumerate(link_lengths):
+        values = axis_indices[k]
+        count = len(values)
+        idx = np.tile(values, len(alive))
+        children = (alive[:, None] * count + np.arange(count)).reshape(-1)
+        parents = np.repeat(np.arange(len(alive)), count)
+
+        # Link k of a prefix can only hit obstacles within its length of joint k
+        obs = broad_phase.link_obstacles[k]
+        offsets = joints[:, None, :] - obs[:, :2]
+        reach = (length + obs[:, 2]) * (1 + _MARGIN) + _MARGIN
+        near = (np.hypot(offsets[..., 0], offsets[..., 1]) < reach).any(axis=1)
+
+        blocked = np.zeros(len(children), dtype=bool)
+        if masks is not None:
+            blocked = ~masks[k][idx]
+        test = np.flatnonzero(~blocked & near[parents])
+        # The last link only needs the end points it tests
+        need = test if k == dims - 1 else np.arange(len(children))
+        angles = 2 * np.pi * idx[need] / M - np.pi
+        headings = headings[parents[need]] + angles
+        starts = joints[parents[need]]
+        joints = starts + length * np.stack([np.cos(headings), np.sin(headings)], -1)
+
+        a, b = (starts, joints) if k == dims - 1 else (starts[test], joints[test])
+        candidates = broad_phase.link_candidates(k, a, b)
+        if candidates is not None and len(test):
+            blocked[test] = _segment_circle_hits(a, b, candidates).any(axis=-1)
+        occupied.reshape(-1, int(np.prod(sizes[k + 1:])))[children[blocked]] = True
+
+        if k < dims - 1:
+            alive, joints, headings = children[~blocked], joints[~blocked], headings[~blocked]
+            if not len(alive):
                 break
+    return occupied.reshape(sizes)
+
+
+def _iter_prefix_chunks(
+    link_lengths, joint_limits, obstacles, M, chunk_size, start=0, stop=None
+):
+    """
+    Same as _iter_occupancy_chunks, with the prefix sharing of
+    product_occupancy. Chunks are runs of whole subtrees below a fixed
+    prefix depth, so start and stop must be multiples of M ** (n_links - 1).
+    """
+    dims = len(link_lengths)
+    total = M**dims if stop is None else stop
+    broad_phase = BroadPhase(link_lengths, obstacles)
+    steps = np.arange(M)
+
+    # Chunks are products: one index for the joints above depth - 1, a
+    # range of joint depth - 1, every index of the joints below, with at
+    # most chunk_size cells
+    depth = 1
+    while depth < dims and M ** (dims - depth) > chunk_size:
+        depth += 1
+    subtree = M ** (dims - depth)
+    batch = max(1, chunk_size // subtree)
 
-        grid[idx] = int(collision)
+    first, end = start // subtree, total // subtree
+    while first < end:
+        last = min(first + batch, end, (first // M + 1) * M)
+        digits = np.unravel_index(first, tuple([M] * depth))
+        axis_indices = [[d] for d in digits[:-1]]
+        axis_indices.append(np.arange(digits[-1], digits[-1] + last - first))
+        axis_indices += [steps] * (dims - depth)
+        occupied = product_occupancy(axis_indices, link_lengths, joint_limits, broad_phase, M)
+        yield first * subtree, last * subtree, occupied.reshape(-1)
+        first = last
+
+
+def _occupancy_chunks(method, *args):
+    # Chunk iterator of a grid building method
+    if method == "prefix":
+        joint_limits = args[1]
+        if not joint_limits or hasattr(joint_limits, "axis_masks"):
+            return _iter_prefix_chunks(*args)
+        # Limits that are not separable per joint need the per-cell check
+    elif method != "flat":
+        raise ValueError(f"Unknown grid method {method!r}, expected prefix or flat.")
+    return _iter_occupancy_chunks(*args)
+
+
+def _occupancy_slab(
+    link_lengths, joint_limits, obstacles, M, chunk_size, start, stop, method="prefix"
+):
+    # Worker task: occupancy of flat indices [start, stop) as packed bits,
+    # which keeps the result sent back to the parent at 1 bit per cell
+    occupied = np.empty(stop - start, dtype=bool)
+    for s, e, chunk in _occupancy_chunks(
+        method, link_lengths, joint_limits, obstacles, M, chunk_size, start, stop
+    ):
+        occupied[s - start:e - start] = chunk
+    return np.packbits(occupied)
+
+
+def _parallel_fill(write, arm, obstacles, M, chunk_size, workers, method="prefix"):
+    # Split the grid into slabs along the first axis, a few per worker so
+    # that cheap slabs (e.g. outside the joint limits) balance out
+    slab = M ** (arm.n_links - 1)
+    n_tasks = min(M, 4 * workers)
+    bounds = np.linspace(0, M, n_tasks + 1).astype(int)
+    ranges = [(lo * slab, hi * slab) for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+    args = (list(arm.link_lengths), arm.joint_limits, obstacles, M, chunk_size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_occupancy_slab, *args, lo, hi, method) for lo, hi in ranges]
+        for (lo, hi), future in zip(ranges, futures):
+            write(lo, np.unpackbits(future.result(), count=hi - lo))
+
+
+def get_occupancy_grid(
+    arm, obstacles, M=100, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, packed=False,
+    method="prefix",
+):
+    """
+    Build the configuration-space occupancy grid of an arm.
+
+    Cell idx corresponds to joint angles 2 * pi * idx / M - pi. A cell is 1 if
+    the configuration violates the joint limits or any link touches an
+    obstacle, 0 otherwise. Configurations are evaluated in batches of
+    chunk_size to keep memory bounded.
+
+    workers > 1 computes slabs of the grid in that many processes; None uses
+    every CPU. If a process pool cannot be started the grid is built in the
+    current process.
+
+    packed=True returns a bit-packed CSpaceGrid instead of an int array and
+    never allocates the dense grid.
+
+    method="prefix" (default) shares work between cells: link k depends
+    only on joints 0..k, so it is tested once per prefix of those joint
+    angles, and a prefix that collides marks its whole sub-block occupied
+    without testing the links after it. method="flat" tests every cell on
+    its own. Both give the same grid; "flat" is also used for joint limits
+    without per-joint axis masks.
+    """
+    dims = arm.n_links  # N dimensions
+    grid_shape = tuple([M] * dims)
+    if packed:
+        grid = CSpaceGrid(grid_shape)
+        write = grid.set_range
+    else:
+        grid = np.zeros(grid_shape, dtype=int)
+        flat = grid.reshape(-1)
+
+        def write(start, occupied):
+            flat[start:start + len(occupied)] = occupied
+
+    obstacles = [list(obs) for obs in obstacles]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and dims > 1:
+        try:
+            _parallel_fill(write, arm, obstacles, M, chunk_size, workers, method)
+            return grid
+        except (OSError, NotImplementedError):
+            pass  # No multiprocessing support here, fall back to one core
+
+    for start, stop, occupied in _occupancy_chunks(
+        method, arm.link_lengths, arm.joint_limits, obstacles, M, chunk_size
+    ):
+        write(start, occupied)
 
     return grid
+
+
+def iter_occupancy_grid(arm, obstacles, M=100, chunk_size=DEFAULT_CHUNK_SIZE, method="prefix"):
+    """
+    Incremental version of get_occupancy_grid (single process, dense grid).
+
+    Yields (grid, cells_done) after every chunk. The same grid array is
+    filled in place and is complete once cells_done == grid.size.
+    """
+    grid = np.zeros(tuple([M] * arm.n_links), dtype=int)
+    flat = grid.reshape(-1)
+    for start, stop, occupied in _occupancy_chunks(
+        method, arm.link_lengths, arm.joint_limits, obstacles, M, chunk_size
+    ):
+        flat[start:stop] = occupied
+        yield grid, stop
+
+
+def affected_cells(link_lengths, disks, M):
+    """
+    Flat indices of the grid cells where some link touches one of the disks.
+
+    Finds the cells whose occupancy can change when these disks are added
+    to or removed from the scene. Link k only depends on joints 0..k, so it
+    is tested once per prefix configuration of those joints, and only for
+    prefixes whose joint k is within reach of a disk; a hit marks every
+    cell sharing the prefix. Disks are slightly inflated, so a few extra
+    cells may be returned but none that can change is missed.
+    """
+    link_lengths = np.asarray(link_lengths, dtype=float)
+    dims = len(link_lengths)
+    disks = np.asarray(disks, dtype=float).reshape(-1, 3)
+    disks = disks[disks[:, 2] > 0]
+    affected = np.zeros(M**dims, dtype=bool)
+    if not len(disks):
+        return np.flatnonzero(affected)
+    inflated = disks.copy()
+    inflated[:, 2] = disks[:, 2] * (1 + _MARGIN) + _MARGIN
+
+    # Position of joint k and heading of link k - 1 for every prefix
+    # configuration of joints 0..k-1, in C order
+    angles = 2 * np.pi * np.arange(M) / M - np.pi
+    joints = np.zeros((1, 2))
+    headings = np.zeros(1)
+    for k, length in enumerate(link_lengths):
+        offsets = joints[:, None, :] - inflated[:, :2]
+        near = (np.hypot(offsets[..., 0], offsets[..., 1]) < length + inflated[:, 2]).any(axis=1)
+        near = np.flatnonzero(near)
+
+        heading = headings[:, None] + angles
+        if k < dims - 1:
+            ends = joints[:, None, :] + length * np.stack([np.cos(heading), np.sin(heading)], -1)
+            near_ends = ends[near]
+        else:
+            near_heading = heading[near]
+            near_ends = joints[near, None, :] + length * np.stack(
+                [np.cos(near_heading), np.sin(near_heading)], -1
+            )
+
+        if len(near):
+            starts = np.broadcast_to(joints[near, None, :], near_ends.shape)
+            hit = _segment_circle_hits(starts, near_ends, inflated).any(axis=-1)
+            prefixes = (near[:, None] * M + np.arange(M))[hit]
+            affected.reshape(M ** (k + 1), -1)[prefixes] = True
+
+        if k < dims - 1:
+            joints = ends.reshape(-1, 2)
+            headings = heading.reshape(-1)
+
+    return np.flatnonzero(affected)
+
+
+def update_occupancy_grid(grid, arm, obstacles, changed, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Update an occupancy grid in place after some obstacles changed.
+
+    grid was built by get_occupancy_grid (dense or packed) for a scene that
+    differs from obstacles only in the disks listed in changed: both the old
+    and the new disk of a moved obstacle, and any added or removed ones.
+    Only the cells returned by affected_cells are recomputed.
+
+    Returns:
+        Flat indices of the cells whose occupancy changed
+    """
+    M = grid.shape[0]
+    cells = affected_cells(arm.link_lengths, changed, M)
+    broad_phase = BroadPhase(arm.link_lengths, [list(obs) for obs in obstacles])
+    if isinstance(grid, CSpaceGrid):
+        read, write = grid.cells, grid.set_cells
+    else:
+        flat = grid.reshape(-1)
+        read = flat.__getitem__
+        write = flat.__setitem__
+
+    flipped = []
+    for start in range(0, len(cells), chunk_size):
+        chunk = cells[start:start + chunk_size]
+        occupied = cell_occupancy(chunk, arm.link_lengths, arm.joint_limits, broad_phase, M)
+        differs = occupied != (read(chunk) != 0)
+        write(chunk[differs], occupied[differs])
+        flipped.append(chunk[differs])
+    return np.concatenate(flipped) if flipped else cells
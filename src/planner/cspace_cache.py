@@ -0,0 +1,149 @@
+# planner/cspace_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from planner.collision import get_occupancy_grid
+from planner.cspace_grid import CSpaceGrid
+
+# Bump when the grid layout or get_occupancy_grid semantics change so that
+# stale files on disk are not reused
+CACHE_VERSION = 1
+
+
+def default_cache_dir():
+    """
+    Cache directory from $ARM_PLANNER_CACHE_DIR, or ~/.cache/arm_planner/cspace
+    """
+    env = os.environ.get("ARM_PLANNER_CACHE_DIR")
+    if env:
+        return Path(env)
+    return Path.home() / ".cache" / "arm_planner" / "cspace"
+
+
+def scene_key(link_lengths, joint_limits, obstacles, M):
+    """
+    Stable hash of everything the occupancy grid depends on.
+
+    Numbers are normalized to float so that e.g. [1, 1] and [1.0, 1.0] give
+    the same key. joint_limits is a JointLimits object or None.
+    """
+    limits = None
+    if joint_limits is not None:
+        limits = [[float(a) for a in pair] for pair in joint_limits.angle_ranges]
+
+    payload = {
+        "version": CACHE_VERSION,
+        "link_lengths": [float(x) for x in link_lengths],
+        "joint_limits": limits,
+        "obstacles": [[float(v) for v in obs] for obs in obstacles],
+        "M": int(M),
+    }
+    text = json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CSpaceCache:
+    """
+    Two-level cache of occupancy grids.
+
+    Grids are kept in an in-memory LRU of max_entries grids and, if cache_dir
+    is given, stored on disk as uint8 .npy files named by scene key. Packed
+    CSpaceGrids are stored in their own packed .npz form (CSpaceGrid.save)
+    and come back as CSpaceGrids. With mmap=True dense grids read from disk
+    are memory-mapped read-only instead of being loaded into RAM.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=8, mmap=False):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_entries = max_entries
+        self.mmap = mmap
+        self._memory = OrderedDict()
+
+    def _path(self, key, packed=False):
+        return self.cache_dir / f"{key}.{'npz' if packed else 'npy'}"
+
+    def get(self, key):
+        """
+        Return the cached grid for key, or None on a miss.
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        if self.cache_dir is None:
+            return None
+
+        path, packed_path = self._path(key), self._path(key, packed=True)
+        try:
+            if packed_path.exists():
+                grid = CSpaceGrid.load(packed_path)
+            elif not path.exists():
+                return None
+            elif self.mmap:
+                grid = np.load(path, mmap_mode="r")
+            else:
+                grid = np.load(path).astype(int)
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # Truncated or foreign file, rebuild it
+            return None
+
+        self._remember(key, grid)
+        return grid
+
+    def put(self, key, grid):
+        self._remember(key, grid)
+        if self.cache_dir is None:
+            return
+
+        # Write to a temporary file and rename, so concurrent processes never
+        # read a partially written grid
+        packed = isinstance(grid, CSpaceGrid)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if packed:
+                    grid.save(f)
+                else:
+                    np.save(f, np.asarray(grid, dtype=np.uint8))
+            os.replace(tmp, self._path(key, packed))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        # Only one form per scene, the one stored last
+        self._path(key, not packed).unlink(missing_ok=True)
+
+    def _remember(self, key, grid):
+        self._memory[key] = grid
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_or_build(self, arm, obstacles, M=100, builder=get_occupancy_grid):
+        """
+        Cached equivalent of builder(arm, obstacles, M).
+        """
+        key = scene_key(arm.link_lengths, arm.joint_limits, obstacles, M)
+        grid = self.get(key)
+        if grid is None:
+            grid = builder(arm, obstacles, M)
+            self.put(key, grid)
+        return grid
+
+    def clear(self):
+        """
+        Drop the in-memory entries and delete the grids on disk.
+        """
+        self._memory.clear()
+        if self.cache_dir is not None and self.cache_dir.exists():
+            for pattern in ("*.npy", "*.npz"):
+                for path in self.cache_dir.glob(pattern):
+                    path.unlink()
@@ -0,0 +1,100 @@
+# planner/cspace_grid.py
+
+import numpy as np
+
+
+class CSpaceGrid:
+    """
+    Configuration-space occupancy grid stored as packed bits.
+
+    Cells are laid out in C order, one bit per cell (1 = occupied), which is
+    64 times smaller than an int grid. Indexing with a node tuple returns 0
+    or 1 like the dense grid, so astar_torus accepts either.
+    """
+
+    def __init__(self, shape, bits=None):
+        self.shape = tuple(int(n) for n in shape)
+        self.ndim = len(self.shape)
+        self.size = int(np.prod(self.shape))
+        n_bytes = (self.size + 7) // 8
+        if bits is None:
+            bits = np.zeros(n_bytes, dtype=np.uint8)
+        elif len(bits) != n_bytes:
+            msg = f"Expected {n_bytes} bytes for shape {self.shape}, got {len(bits)}."
+            raise ValueError(msg)
+        self.bits = bits
+
+    @classmethod
+    def from_array(cls, grid):
+        grid = np.asarray(grid)
+        return cls(grid.shape, np.packbits(grid.reshape(-1) != 0))
+
+    def to_array(self, dtype=int):
+        return np.unpackbits(self.bits, count=self.size).reshape(self.shape).astype(dtype)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def is_occupied(self, index):
+        """
+        Occupancy of the cell with flat (C-order) index.
+        """
+        return bool((self.bits[index >> 3] >> (7 - (index & 7))) & 1)
+
+    def cells(self, indices):
+        """
+        Occupancy (0 or 1) of an array of flat indices.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        return (self.bits[indices >> 3] >> (7 - (indices & 7))) & 1
+
+    def set_cells(self, indices, values):
+        """
+        Set the occupancy of an array of flat indices.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        values = np.asarray(values, dtype=bool)
+        masks = (1 << (7 - (indices & 7))).astype(np.uint8)
+        np.bitwise_or.at(self.bits, indices[values] >> 3, masks[values])
+        np.bitwise_and.at(self.bits, indices[~values] >> 3, ~masks[~values])
+
+    def __getitem__(self, node):
+        return int(self.is_occupied(int(np.ravel_multi_index(node, self.shape))))
+
+    def neighbors(self, node):
+        """
+        Wrap-around neighbors of node, in find_neighbors_nd order.
+        """
+        neighbors = []
+        for i, size in enumerate(self.shape):
+            for delta in [-1, 1]:
+                neighbor = list(node)
+                neighbor[i] = (neighbor[i] + delta) % size
+                neighbors.append(tuple(neighbor))
+        return neighbors
+
+    def free_neighbors(self, node):
+        return [n for n in self.neighbors(node) if not self[n]]
+
+    def set_range(self, start, values):
+        """
+        Set the occupancy of flat indices [start, start + len(values)).
+        """
+        values = np.asarray(values, dtype=bool)
+        stop = start + len(values)
+        lo, hi = start // 8, (stop + 7) // 8
+        cells = np.unpackbits(self.bits[lo:hi])
+        cells[start - 8 * lo:stop - 8 * lo] = values
+        self.bits[lo:hi] = np.packbits(cells)
+
+    def save(self, path):
+        """
+        Save in packed form to an .npz file.
+        """
+        np.savez_compressed(path, shape=np.array(self.shape), bits=self.bits)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["shape"], data["bits"])
@@ -0,0 +1,221 @@
+# planner/dstar_lite.py
+
+import heapq
+from array import array
+
+import numpy as np
+
+from planner.astar_planner import (
+    DENSE_STATE_LIMIT,
+    _flat_neighbors,
+    _flat_strides,
+    _SparseMap,
+    heuristic_function,
+)
+from planner.collision import get_occupancy_grid, update_occupancy_grid
+
+
+class DStarLite:
+    """
+    D* Lite on the same toroidal grid model as astar_torus.
+
+    The search runs backwards from the goal and keeps its state between
+    calls to plan(). After cells of the grid change (update_cells) or the
+    start moves (move_start), plan() only repairs the part of the search
+    the change affects instead of starting over. Routes have the same
+    (optimal) length as astar_torus on the current grid.
+
+    A move u -> v costs 1 if v is free or the goal, and is not possible
+    otherwise, so an occupancy change of v changes the cost of the moves
+    into v from its neighbors.
+
+    grid is a dense array or a grid object with shape and is_occupied.
+    Update it in place and pass the changed cells to update_cells.
+    """
+
+    def __init__(self, grid, start_node, goal_node, state="auto"):
+        self.grid = grid
+        self.shape = grid.shape
+        if hasattr(grid, "is_occupied"):
+            self._flat_grid = None
+            self._is_occupied = grid.is_occupied
+        else:
+            # Byte copy for fast lookups, refreshed by update_cells
+            self._flat_grid = np.asarray(grid).reshape(-1)
+            self._occupancy = bytearray((self._flat_grid != 0).astype(np.uint8))
+            self._is_occupied = self._occupancy.__getitem__
+        self._strides = _flat_strides(self.shape)
+        size = int(np.prod(self.shape))
+        if state == "auto":
+            state = "dense" if size <= DENSE_STATE_LIMIT else "sparse"
+        if state == "dense":
+            self._g = array("d", [np.inf]) * size
+            self._rhs = array("d", [np.inf]) * size
+        elif state == "sparse":
+            self._g = _SparseMap(np.inf)
+            self._rhs = _SparseMap(np.inf)
+        else:
+            raise ValueError(f"Unknown search state {state!r}, expected auto, dense or sparse.")
+
+        self.goal = int(np.ravel_multi_index(goal_node, self.shape))
+        self.start = int(np.ravel_multi_index(start_node, self.shape))
+        self._h = heuristic_function(self.shape, start_node)
+        self._km = 0
+        self._open = []
+        self._keys = {}  # Current key of every node in the open set
+        self.expanded = 0
+
+        self._rhs[self.goal] = 0
+        self._push(self.goal)
+
+    def _node(self, index):
+        return tuple(int(i) for i in np.unravel_index(index, self.shape))
+
+    def _neighbors(self, index):
+        return _flat_neighbors(index, self.shape, self._strides)
+
+    def _enterable(self, index):
+        return index == self.goal or not self._is_occupied(index)
+
+    def _key(self, index):
+        best = min(self._g[index], self._rhs[index])
+        return (best + self._h(index) + self._km, best)
+
+    def _push(self, index):
+        key = self._key(index)
+        self._keys[index] = key
+        heapq.heappush(self._open, (key, index))
+
+    def _update_vertex(self, index):
+        if index != self.goal:
+            best = np.inf
+            for neighbor in self._neighbors(index):
+                if self._enterable(neighbor):
+                    best = min(best, 1 + self._g[neighbor])
+            self._rhs[index] = best
+        self._keys.pop(index, None)  # Old heap entries become stale
+        if self._g[index] != self._rhs[index]:
+            self._push(index)
+
+    def _top(self):
+        # Smallest current key in the open set, dropping stale entries
+        while self._open:
+            key, index = self._open[0]
+            if self._keys.get(index) == key:
+                return key, index
+            heapq.heappop(self._open)
+        return (np.inf, np.inf), None
+
+    def _compute_shortest_path(self):
+        start = self.start
+        while True:
+            top_key, current = self._top()
+            if current is None:
+                return
+            if top_key >= self._key(start) and self._rhs[start] == self._g[start]:
+                return
+
+            new_key = self._key(current)
+            if top_key < new_key:
+                # The start moved since this key was computed
+                self._push(current)
+                continue
+            heapq.heappop(self._open)
+            del self._keys[current]
+            self.expanded += 1
+
+            # Only the neighbors of an enterable node can move into it
+            enterable = self._enterable(current)
+            if self._g[current] > self._rhs[current]:
+                self._g[current] = self._rhs[current]
+                if enterable:
+                    for neighbor in self._neighbors(current):
+                        self._update_vertex(neighbor)
+            else:
+                self._g[current] = np.inf
+                if enterable:
+                    for neighbor in self._neighbors(current):
+                        self._update_vertex(neighbor)
+                self._update_vertex(current)
+
+    def plan(self):
+        """
+        Repair the search and return the route from the start to the goal
+        as a list of node tuples ([] if the goal is unreachable).
+        """
+        if self.start == self.goal:
+            return []  # Same as astar_torus
+        self._compute_shortest_path()
+        if self._rhs[self.start] == np.inf:
+            return []
+
+        # Follow the best move from every node; g and rhs agree along the
+        # route once the search is consistent at the start
+        path = [self.start]
+        while path[-1] != self.goal:
+            best, best_cost = None, np.inf
+            for neighbor in self._neighbors(path[-1]):
+                if self._enterable(neighbor) and 1 + self._g[neighbor] < best_cost:
+                    best, best_cost = neighbor, 1 + self._g[neighbor]
+            path.append(best)
+        return [self._node(index) for index in path]
+
+    def update_cells(self, indices):
+        """
+        Tell the search that the occupancy of these flat cell indices
+        changed in the grid.
+        """
+        for index in indices:
+            index = int(index)
+            if self._flat_grid is not None:
+                self._occupancy[index] = int(self._flat_grid[index] != 0)
+            for neighbor in self._neighbors(index):
+                self._update_vertex(neighbor)
+
+    def move_start(self, start_node):
+        """
+        Continue from a new start, e.g. a node on the previous route.
+        """
+        start = int(np.ravel_multi_index(start_node, self.shape))
+        self._km += self._h(start)  # Distance from the old start to the new one
+        self.start = start
+        self._h = heuristic_function(self.shape, start_node)
+
+
+class IncrementalPlanner:
+    """
+    Occupancy grid and D* Lite search that are kept up to date while
+    obstacles move.
+
+    move_obstacle only recomputes the grid cells the old and the new disk
+    can affect (update_occupancy_grid) and passes the cells that changed to
+    the search, which then repairs its previous result.
+    """
+
+    def __init__(self, arm, obstacles, start_node, goal_node, M=100, grid=None):
+        self.arm = arm
+        self.obstacles = [list(obs) for obs in obstacles]
+        self.M = M
+        self.grid = get_occupancy_grid(arm, self.obstacles, M) if grid is None else grid
+        self.search = DStarLite(self.grid, tuple(start_node), tuple(goal_node))
+
+    def plan(self):
+        return self.search.plan()
+
+    def move_obstacle(self, index, obstacle):
+        """
+        Move obstacle number index to obstacle ([cx, cy, r]) and return the
+        repaired route.
+        """
+        old = self.obstacles[index]
+        self.obstacles[index] = list(obstacle)
+        changed = update_occupancy_grid(self.grid, self.arm, self.obstacles, [old, obstacle])
+        self.search.update_cells(changed)
+        return self.search.plan()
+
+    def move_start(self, start_node):
+        """
+        Continue from a new start node and return the repaired route.
+        """
+        self.search.move_start(tuple(start_node))
+        return self.search.plan()
@@ -0,0 +1,157 @@
+# planner/edge_validation.py
+
+import numpy as np
+
+from planner.astar_planner import DENSE_STATE_LIMIT, _SparseMap
+from planner.broad_phase import _MARGIN
+from planner.collision import _segment_circle_hits
+from planner.nlink_arm import forward_kinematics
+
+# Edge states in the cache
+UNKNOWN = 0
+VALID = 1
+INVALID = 2
+
+# Sub-steps per edge tried in turn before an edge is given up as invalid
+DEFAULT_REFINEMENT = (1, 8, 64)
+
+
+class EdgeValidator:
+    """
+    Continuous collision check of the moves between neighboring grid cells.
+
+    A move along axis a turns joint a by delta = 2 * pi / M with the other
+    joints fixed, so links a and after rotate rigidly about joint a. The
+    move is split into s equal steps; for every step the arm is placed at
+    the middle of the step, where a point at distance d from joint a is at
+    most 2 * d * sin(delta / (4 * s)) away from anywhere it goes during the
+    step. Link k is checked against the obstacles grown by that bound with
+    d the larger distance of its end points from joint a. An edge passes if
+    every step passes for s = 1, and failing edges are retried with the
+    finer steps in refinement; an edge that fails them all is invalid.
+
+    The check is conservative: an edge that is reported valid never
+    collides, while an edge that passes close to an obstacle may be
+    rejected. It does not look at the cells themselves, which the search
+    checks as before.
+
+    Results are cached per edge, one byte per (cell, axis) with the edge
+    leading to the + neighbor (the - edge of a cell is the + edge of its -
+    neighbor). Grids above DENSE_STATE_LIMIT edges use a dict instead.
+    Edges are computed on demand: a miss checks the edges of the whole tile
+    of tile**n_links cells around the cell in one batch, as in
+    LazyOccupancyGrid.
+    """
+
+    def __init__(self, link_lengths, obstacles, M, refinement=DEFAULT_REFINEMENT, tile=4):
+        self.link_lengths = np.asarray(link_lengths, dtype=float)
+        self.dims = len(self.link_lengths)
+        self.M = M
+        self.tile = tile
+        self.shape = tuple([M] * self.dims)
+        self.refinement = tuple(refinement)
+        obstacles = np.asarray(obstacles, dtype=float).reshape(-1, 3)
+        self.obstacles = obstacles[obstacles[:, 2] > 0]
+
+        edges = M**self.dims * self.dims
+        if edges <= DENSE_STATE_LIMIT:
+            self._states = bytearray(edges)
+        else:
+            self._states = _SparseMap(UNKNOWN)
+        self.evaluated = 0
+
+    def is_valid(self, index, neighbor, direction):
+        """
+        Whether the move from flat cell index to its neighbor in the given
+        direction code (2 * axis + 1 for +, 2 * axis for -) is free.
+        """
+        key = (index if direction & 1 else neighbor) * self.dims + (direction >> 1)
+        state = self._states[key]
+        if state == UNKNOWN:
+            self._evaluate_tile(key // self.dims)
+            state = self._states[key]
+        return state == VALID
+
+    def edge_states(self, cells):
+        """
+        States (VALID or INVALID) of the + edges of flat cells, array of
+        shape (len(cells), n_links). Unknown edges are computed in one batch.
+        """
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1)
+        keys = (cells[:, None] * self.dims + np.arange(self.dims)).reshape(-1)
+        self._evaluate(keys)
+        states = [self._states[key] for key in keys.tolist()]
+        return np.array(states, dtype=np.uint8).reshape(len(cells), self.dims)
+
+    def _evaluate_tile(self, cell):
+        # All + edges of the tile**n_links cells around cell, as the search
+        # asks for the edges of neighboring cells next
+        node = np.unravel_index(cell, self.shape)
+        ranges = [
+            np.arange(c - c % self.tile, min(c - c % self.tile + self.tile, self.M))
+            for c in node
+        ]
+        flat = np.ravel_multi_index(np.meshgrid(*ranges, indexing="ij"), self.shape)
+        self._evaluate((flat.reshape(-1, 1) * self.dims + np.arange(self.dims)).reshape(-1))
+
+    def _evaluate(self, keys):
+        # Compute and cache the unknown edges among keys (cell * n_links + axis)
+        keys = [key for key in keys.tolist() if self._states[key] == UNKNOWN]
+        if not keys:
+            return
+        keys = np.array(keys, dtype=np.int64)
+        valid = self.check_edges(keys // self.dims, keys % self.dims)
+        for key, ok in zip(keys.tolist(), valid.tolist()):
+            self._states[key] = VALID if ok else INVALID
+        self.evaluated += len(keys)
+
+    def check_edges(self, cells, axes):
+        """
+        Conservative check of the + edges of flat cells along axes, without
+        the cache. Returns a boolean array, True where the motion is free.
+        """
+        cells = np.asarray(cells, dtype=np.int64)
+        axes = np.asarray(axes, dtype=np.int64)
+        valid = np.zeros(len(cells), dtype=bool)
+        if not len(self.obstacles):
+            valid[:] = True
+            return valid
+        idx = np.stack(np.unravel_index(cells, self.shape), axis=1)
+        base = 2 * np.pi * idx / self.M - np.pi
+        delta = 2 * np.pi / self.M
+
+        todo = np.arange(len(cells))
+        for steps in self.refinement:
+            # Every (edge, step) pair in one batch
+            offsets = delta * (np.arange(steps) + 0.5) / steps
+            edges = np.repeat(todo, steps)
+            angles = base[edges]
+            angles[np.arange(len(edges)), axes[edges]] += np.tile(offsets, len(todo))
+            free = self._steps_free(angles, axes[edges], 2 * np.sin(delta / (4 * steps)))
+            passed = free.reshape(len(todo), steps).all(axis=1)
+            valid[todo[passed]] = True
+            todo = todo[~passed]
+            if not len(todo):
+                break
+        return valid
+
+    def _steps_free(self, angles, axes, bound):
+        # Whether the arm at angles, with every point of links axes.. grown
+        # by bound * (distance from joint axes), misses the obstacles
+        points = forward_kinematics(self.link_lengths, angles)
+        rows = np.arange(len(angles))
+        pivot = points[rows, axes]
+        free = np.ones(len(angles), dtype=bool)
+        obstacles = self.obstacles
+        for k in range(self.dims):
+            moving = np.flatnonzero((axes <= k) & free)
+            if not len(moving):
+                continue
+            a, b = points[moving, k], points[moving, k + 1]
+            reach = np.maximum(
+                np.hypot(*(a - pivot[moving]).T), np.hypot(*(b - pivot[moving]).T)
+            )
+            grown = np.broadcast_to(obstacles, (len(moving),) + obstacles.shape).copy()
+            grown[..., 2] = (obstacles[:, 2] + bound * reach[:, None]) * (1 + _MARGIN) + _MARGIN
+            free[moving] = ~_segment_circle_hits(a, b, grown).any(axis=-1)
+        return free
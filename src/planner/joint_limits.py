@@ -23,3 +23,24 @@ class JointLimits:
                 joint_angles_deg, self.angle_ranges
             )
         )
+
+    def axis_masks(self, axis_angles):
+        """
+        Per-joint masks over sampled angles.
+
+        axis_angles holds one 1-D array of angles (radians) per joint. Returns
+        one boolean array per joint, True where the angle is within that
+        joint's range. Limits are separable, so a configuration is within
+        limits iff every joint's mask is True. If the number of joints does
+        not match, every mask is False, as in is_within_limits.
+        """
+        matched = len(axis_angles) == len(self.angle_ranges)
+        masks = []
+        for i, angles in enumerate(axis_angles):
+            angles_deg = np.degrees(np.asarray(angles, dtype=float))
+            if not matched:
+                masks.append(np.zeros(angles_deg.shape, dtype=bool))
+                continue
+            min_angle, max_angle = self.angle_ranges[i]
+            masks.append((min_angle <= angles_deg) & (angles_deg <= max_angle))
+        return masks
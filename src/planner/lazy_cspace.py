@@ -0,0 +1,77 @@
+# planner/lazy_cspace.py
+
+import numpy as np
+
+from planner.astar_planner import astar_torus
+from planner.broad_phase import BroadPhase
+from planner.collision import cell_occupancy
+
+
+class LazyOccupancyGrid:
+    """
+    Occupancy grid whose cells are computed on first access.
+
+    It has the same cell semantics as get_occupancy_grid and implements the
+    grid interface of astar_torus (shape and is_occupied), so a search only
+    pays for the part of the C-space it touches. A miss evaluates the whole
+    tile of tile**n_links cells around the cell in one batched collision
+    check, since A* queries neighboring cells next. Results are memoized in
+    a dict keyed by flat index.
+    """
+
+    def __init__(self, arm, obstacles, M=100, tile=4):
+        self.link_lengths = list(arm.link_lengths)
+        self.joint_limits = arm.joint_limits
+        self.broad_phase = BroadPhase(self.link_lengths, obstacles)
+        self.M = M
+        self.tile = tile
+        self.shape = tuple([M] * arm.n_links)
+        self.ndim = len(self.shape)
+        self.size = M**self.ndim
+        self._cells = {}
+
+    @property
+    def evaluated(self):
+        """
+        Number of cells computed so far.
+        """
+        return len(self._cells)
+
+    def is_occupied(self, index):
+        occupied = self._cells.get(index)
+        if occupied is None:
+            self._evaluate_tile(index)
+            occupied = self._cells[index]
+        return occupied
+
+    def __getitem__(self, node):
+        return int(self.is_occupied(int(np.ravel_multi_index(node, self.shape))))
+
+    def _evaluate_tile(self, index):
+        node = np.unravel_index(index, self.shape)
+        ranges = [
+            np.arange(c - c % self.tile, min(c - c % self.tile + self.tile, self.M))
+            for c in node
+        ]
+        flat = np.ravel_multi_index(np.meshgrid(*ranges, indexing="ij"), self.shape)
+        flat = flat.reshape(-1)
+        occupied = cell_occupancy(
+            flat, self.link_lengths, self.joint_limits, self.broad_phase, self.M
+        )
+        self._cells.update(zip(flat.tolist(), occupied.tolist()))
+
+
+def plan_lazy(arm, obstacles, start_node, goal_node, M=100, tile=4, **search_options):
+    """
+    astar_torus on a LazyOccupancyGrid, without building the full grid.
+
+    search_options are forwarded to astar_torus; the search state defaults
+    to "sparse" so that memory also scales with the explored region.
+
+    Returns:
+        (route, grid), grid tells how many cells were evaluated
+    """
+    grid = LazyOccupancyGrid(arm, obstacles, M, tile)
+    search_options.setdefault("state", "sparse")
+    route = astar_torus(grid, tuple(start_node), tuple(goal_node), **search_options)
+    return route, grid
@@ -0,0 +1,181 @@
+# planner/multires.py
+
+import itertools
+
+import numpy as np
+
+from planner.astar_planner import astar_torus
+from planner.broad_phase import _MARGIN
+from planner.collision import (
+    _segment_circle_hits,
+    cell_occupancy,
+    limit_axis_masks,
+)
+from planner.nlink_arm import forward_kinematics
+
+
+# Block states returned by block_states
+FREE = 0  # Every cell of the block is free
+MIXED = 1  # Not decided, the block may contain free cells
+BLOCKED = 2  # Every cell of the block is occupied
+
+
+def block_states(block_indices, link_lengths, joint_limits, obstacles, M, factor):
+    """
+    Classify blocks of factor**n_links grid cells as FREE, MIXED or BLOCKED.
+
+    Block b covers the cells factor * b ... factor * b + factor - 1 along
+    every axis of the (M,) * n_links grid, i.e. the block grid has shape
+    (M // factor,) * n_links. FREE and BLOCKED are certain (every cell is
+    free, or occupied, in get_occupancy_grid); MIXED blocks may be either.
+
+    Joint limits are checked on every cell of the block. For collisions,
+    the arm is placed at the block center: if every joint angle moves by at
+    most delta, a point on link k moves by at most
+    growth_k = delta * sum((i + 1) * link_lengths[i] for i <= k). A block is
+    free if the centered links miss every obstacle grown by growth_k, and
+    blocked if one of them hits an obstacle shrunk by growth_k.
+    """
+    dims = len(link_lengths)
+    link_lengths = np.asarray(link_lengths, dtype=float)
+    blocks = np.stack(
+        np.unravel_index(block_indices, tuple([M // factor] * dims)), axis=1
+    )
+    states = np.full(len(blocks), FREE, dtype=np.uint8)
+
+    if joint_limits:
+        masks = limit_axis_masks(joint_limits, M, dims)
+        if masks is None:
+            # Without axis masks, check the block corners (box limits)
+            for corner in itertools.product([0, factor - 1], repeat=dims):
+                idx = blocks * factor + np.array(corner)
+                angles = 2 * np.pi * idx / M - np.pi
+                outside = [not joint_limits.is_within_limits(list(a)) for a in angles]
+                states[np.array(outside, dtype=bool)] = MIXED
+        else:
+            for i, mask in enumerate(masks):
+                blocks_mask = mask.reshape(-1, factor)
+                states[~blocks_mask.all(axis=1)[blocks[:, i]]] = MIXED
+                states[~blocks_mask.any(axis=1)[blocks[:, i]]] = BLOCKED
+
+    obstacles = np.asarray(obstacles, dtype=float).reshape(-1, 3)
+    obstacles = obstacles[obstacles[:, 2] > 0]
+    todo = np.flatnonzero(states != BLOCKED)
+    if not len(todo) or not len(obstacles):
+        return states
+
+    delta = np.pi * (factor - 1) / M
+    growth = delta * np.cumsum((np.arange(dims) + 1) * link_lengths)
+    angles = 2 * np.pi * (blocks[todo] * factor + (factor - 1) / 2) / M - np.pi
+    points = forward_kinematics(link_lengths, angles)
+    maybe_hit = np.zeros(len(todo), dtype=bool)
+    surely_hit = np.zeros(len(todo), dtype=bool)
+    for k in range(dims):
+        a, b = points[:, k], points[:, k + 1]
+        grown = obstacles.copy()
+        grown[:, 2] = (obstacles[:, 2] + growth[k]) * (1 + _MARGIN) + _MARGIN
+        maybe_hit |= _segment_circle_hits(a, b, grown).any(axis=-1)
+        shrunk = obstacles.copy()
+        shrunk[:, 2] = (obstacles[:, 2] - growth[k]) * (1 - _MARGIN) - _MARGIN
+        surely_hit |= _segment_circle_hits(a, b, shrunk).any(axis=-1)
+
+    states[todo[maybe_hit]] = np.maximum(states[todo[maybe_hit]], MIXED)
+    states[todo[surely_hit]] = BLOCKED
+    return states
+
+
+class _CorridorGrid:
+    # Grid interface for astar_torus where only the given cells can be
+    # entered (the goal is always enterable, as in astar_torus)
+    def __init__(self, shape, cells, enterable):
+        self.shape = shape
+        self._free = set(cells[enterable].tolist())
+
+    def is_occupied(self, index):
+        return index not in self._free
+
+
+def _corridor(path, size, dims, margin):
+    # Flat indices of the 2 ** dims children of every block within margin
+    # of the path (wrap-around), at the next finer level
+    offsets = np.array(list(itertools.product(range(-margin, margin + 1), repeat=dims)))
+    blocks = (np.array(path)[:, None, :] + offsets).reshape(-1, dims) % size
+    blocks = np.unique(blocks, axis=0)
+    children = np.array(list(itertools.product([0, 1], repeat=dims)))
+    cells = (2 * blocks[:, None, :] + children).reshape(-1, dims)
+    return np.ravel_multi_index(tuple(cells.T), tuple([2 * size] * dims))
+
+
+def plan_multires(arm, obstacles, start_node, goal_node, M=720, levels=3, margin=2, stats=None):
+    """
+    Coarse-to-fine search on a 2**k pyramid of grids.
+
+    Only the coarsest level, with M // 2**levels cells per axis, is built
+    in full (block_states). Every finer level classifies the children of
+    the blocks within margin blocks of the previous route and searches that
+    corridor; the last level uses the exact occupancy of single cells.
+    Each search first allows FREE blocks only, whose routes are sure to
+    refine, and then also MIXED ones. start_node and goal_node are cells
+    of the (M,) * n_links grid, with the same cell meaning as
+    get_occupancy_grid.
+
+    The route is valid at full resolution but not necessarily the
+    shortest. If a level finds no route in its corridor, even with two or
+    four times the margin, that level is classified and searched in full. A full
+    level without a route means there is none at any resolution, since
+    MIXED blocks are allowed.
+
+    If a dict is passed as stats, it receives "cells" (cells classified
+    per level, coarsest first) and "full_levels" (levels searched in full).
+
+    Returns:
+        List of node tuples from start to goal, [] if the goal is unreachable
+    """
+    dims = arm.n_links
+    if M % 2**levels:
+        raise ValueError(f"M={M} is not divisible by 2**levels={2**levels}.")
+    start_node, goal_node = tuple(start_node), tuple(goal_node)
+    link_lengths, joint_limits = list(arm.link_lengths), arm.joint_limits
+    obstacles = [list(obs) for obs in obstacles]
+    if stats is None:
+        stats = {}
+    stats.update(cells=[], full_levels=[])
+    if start_node == goal_node:
+        return []  # Same as astar_torus
+
+    path = None
+    for level in range(levels, -1, -1):
+        factor = 2**level
+        size = M // factor
+        start = tuple(c // factor for c in start_node)
+        goal = tuple(c // factor for c in goal_node)
+        if start == goal:
+            path = [start]  # No search needed, refine around the block
+            continue
+
+        corridors = [] if path is None else [margin, 2 * margin, 4 * margin]
+        for corridor_margin in corridors + [None]:
+            if corridor_margin is None:
+                cells = np.arange(size**dims)
+                stats["full_levels"].append(level)
+            else:
+                cells = _corridor(path, size // 2, dims, corridor_margin)
+            if level == 0:
+                occupied = cell_occupancy(cells, link_lengths, joint_limits, obstacles, M)
+                states = np.where(occupied, BLOCKED, FREE)
+            else:
+                states = block_states(cells, link_lengths, joint_limits, obstacles, M, factor)
+            stats["cells"].append(len(cells))
+
+            found = []
+            for allowed in (FREE, MIXED):
+                grid = _CorridorGrid(tuple([size] * dims), cells, states <= allowed)
+                found = astar_torus(grid, start, goal)
+                if found:
+                    break
+            if found:
+                break
+        if not found:
+            return []
+        path = found
+    return path
@@ -1,8 +1,28 @@
 # planner/nlink_arm.py
 
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle, RegularPolygon
+
+
+def forward_kinematics(link_lengths, joint_angles):
+    """
+    Joint positions of a planar arm with its base at the origin.
+
+    Parameters:
+        link_lengths: Link lengths, shape (n,)
+        joint_angles: Relative joint angles, shape (n,) or (K, n)
+
+    Returns:
+        Array of shape (n + 1, 2), or (K, n + 1, 2) for a batch
+    """
+    link_lengths = np.asarray(link_lengths, dtype=float)
+    joint_angles = np.asarray(joint_angles, dtype=float)
+
+    # Absolute link directions, then joint positions by cumulative sums
+    angle_sums = np.cumsum(joint_angles, axis=-1)
+    points = np.zeros(joint_angles.shape[:-1] + (joint_angles.shape[-1] + 1, 2))
+    points[..., 1:, 0] = np.cumsum(link_lengths * np.cos(angle_sums), axis=-1)
+    points[..., 1:, 1] = np.cumsum(link_lengths * np.sin(angle_sums), axis=-1)
+    return points
 
 
 class NLinkArm:
@@ -13,7 +33,7 @@ class NLinkArm:
 
         self.link_lengths = np.array(link_lengths)
         self.joint_angles = np.array(joint_angles)
-        self.points = [[0, 0] for _ in range(self.n_links + 1)]
+        self.points = np.zeros((self.n_links + 1, 2))
         self.lim = sum(link_lengths)
 
         self.joint_limits = joint_limits
@@ -30,18 +50,21 @@ class NLinkArm:
         self.update_points()
 
     def update_points(self):
-        for i in range(1, self.n_links + 1):
-            angle_sum = np.sum(self.joint_angles[:i])
-            self.points[i][0] = self.points[i - 1][0] + self.link_lengths[
-                i - 1
-            ] * np.cos(angle_sum)
-            self.points[i][1] = self.points[i - 1][1] + self.link_lengths[
-                i - 1
-            ] * np.sin(angle_sum)
+        self.points = forward_kinematics(self.link_lengths, self.joint_angles)
+        self.end_effector = self.points[self.n_links]
 
-        self.end_effector = np.array(self.points[self.n_links]).T
+    def batch_points(self, configurations):
+        """
+        Joint positions for a (K, n_links) array of joint angles, returned as
+        a (K, n_links + 1, 2) array. The arm's own pose is not changed.
+        """
+        return forward_kinematics(self.link_lengths, configurations)
 
     def draw(self, ax, obstacles=[], ee_x=None, ee_y=None, goal_angles=None):
+        # Imported here so that planning code can use NLinkArm without matplotlib
+        import matplotlib.pyplot as plt
+        from matplotlib.patches import Rectangle, RegularPolygon
+
         ax.clear()
 
         for obstacle in obstacles:
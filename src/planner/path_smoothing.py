@@ -0,0 +1,173 @@
+# planner/path_smoothing.py
+
+import numpy as np
+
+from planner.sampling_planner import MotionChecker, shortcut_path
+
+
+def route_to_path(route, M):
+    """
+    Joint angles (K, n) of the cells of a grid route.
+
+    Steps that cross the wrap-around of the grid become small steps, so the
+    angles are continuous along the route and may leave [-pi, pi).
+    """
+    cells = np.asarray(route, dtype=float).reshape(len(route), -1)
+    steps = (np.diff(cells, axis=0) + M / 2) % M - M / 2
+    cells = np.vstack([cells[:1], cells[:1] + np.cumsum(steps, axis=0)])
+    return 2 * np.pi * cells / M - np.pi
+
+
+def merge_collinear(path, tol=1e-9):
+    """
+    Path without repeated waypoints and without waypoints in the middle of
+    a straight motion (where the motion keeps its direction). The motion
+    along the path does not change.
+    """
+    path = np.asarray(path, dtype=float)
+    if len(path) < 2:
+        return path
+    steps = np.diff(path, axis=0)
+    moving = np.linalg.norm(steps, axis=1) > 0
+    path = path[np.concatenate([[True], moving])]
+    if len(path) < 3:
+        return path
+    steps = np.diff(path, axis=0)
+    lengths = np.linalg.norm(steps, axis=1)
+    cosine = (steps[:-1] * steps[1:]).sum(axis=1) / (lengths[:-1] * lengths[1:])
+    return path[np.concatenate([[True], cosine < 1 - tol, [True]])]
+
+
+def split_motions(path, max_angle=np.pi / 2):
+    """
+    Path with extra waypoints on its straight motions, so that no joint
+    moves by more than max_angle between consecutive waypoints. Motions of
+    pi or more would otherwise be taken the short way round (the other
+    direction) by MotionChecker.difference on joints that wrap around.
+    """
+    path = np.asarray(path, dtype=float)
+    if len(path) < 2:
+        return path
+    steps = np.diff(path, axis=0)
+    pieces = np.floor(np.abs(steps).max(axis=1) / max_angle).astype(int) + 1
+    fractions = np.concatenate([np.arange(count) / count for count in pieces])
+    motion = np.repeat(np.arange(len(steps)), pieces)
+    return np.vstack([path[motion] + fractions[:, None] * steps[motion], path[-1:]])
+
+
+class Trajectory:
+    """
+    Time-parameterized motion through joint-space waypoints.
+
+    The arm moves straight from one waypoint to the next and stops at every
+    waypoint, so it follows exactly the motions that were checked. On each
+    motion all joints follow the same trapezoidal velocity profile (or a
+    triangular one for short motions), as fast as max_velocity (rad/s) and
+    max_acceleration (rad/s^2) allow for every joint. Both may be scalars or
+    per-joint arrays.
+    """
+
+    def __init__(self, waypoints, max_velocity=1.0, max_acceleration=2.0):
+        self.waypoints = np.asarray(waypoints, dtype=float)
+        self.dims = self.waypoints.shape[1]
+        max_velocity = np.broadcast_to(np.asarray(max_velocity, dtype=float), (self.dims,))
+        max_acceleration = np.broadcast_to(np.asarray(max_acceleration, dtype=float), (self.dims,))
+        if (max_velocity <= 0).any() or (max_acceleration <= 0).any():
+            raise ValueError("Velocity and acceleration limits must be positive.")
+
+        # Profiles of the path parameter s in [0, 1] of every motion
+        distance = np.abs(np.diff(self.waypoints, axis=0))
+        with np.errstate(divide="ignore"):
+            velocity = (max_velocity / distance).min(axis=1, initial=np.inf)
+            acceleration = (max_acceleration / distance).min(axis=1, initial=np.inf)
+        velocity = np.minimum(velocity, np.sqrt(acceleration))  # Triangular profile
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._ramp = np.nan_to_num(velocity / acceleration)
+            self._durations = np.nan_to_num(1 / velocity + self._ramp)
+        self._velocity, self._acceleration = velocity, acceleration
+        self.times = np.concatenate([[0.0], np.cumsum(self._durations)])
+
+    def __len__(self):
+        return len(self.waypoints)
+
+    @property
+    def duration(self):
+        return float(self.times[-1])
+
+    def positions(self, times):
+        """
+        Joint angles (K, n) at an array of times (clipped to the trajectory).
+        """
+        times = np.clip(np.asarray(times, dtype=float).reshape(-1), 0, self.duration)
+        if len(self.waypoints) < 2:
+            return np.repeat(self.waypoints, len(times), axis=0)
+        motion = np.clip(np.searchsorted(self.times, times, side="right") - 1, 0, len(self) - 2)
+        t = times - self.times[motion]
+        ramp, duration = self._ramp[motion], self._durations[motion]
+        velocity, acceleration = self._velocity[motion], self._acceleration[motion]
+        s = np.where(
+            t < ramp,
+            0.5 * acceleration * t**2,
+            np.where(
+                t > duration - ramp,
+                1 - 0.5 * acceleration * (duration - t) ** 2,
+                velocity * (t - 0.5 * ramp),
+            ),
+        )
+        s = np.clip(np.nan_to_num(s), 0, 1)[:, None]
+        return (1 - s) * self.waypoints[motion] + s * self.waypoints[motion + 1]
+
+    def sample(self, dt):
+        """
+        Times and joint angles every dt seconds, ending at the last waypoint.
+        """
+        times = np.append(np.arange(0, self.duration, dt), self.duration)
+        return times, self.positions(times)
+
+
+def smooth_route(
+    arm,
+    obstacles,
+    route,
+    M=100,
+    step=0.02,
+    max_velocity=1.0,
+    max_acceleration=2.0,
+    stats=None,
+):
+    """
+    Trajectory along a grid route with far fewer waypoints.
+
+    route is what astar_torus returns: unit steps that move one joint at a
+    time. Steps in the same direction are merged, then the remaining
+    corners are shortcut with shortcut_path, which checks every candidate
+    motion from a waypoint in one batched query (MotionChecker with the
+    given step, obstacles grown for the motion between checks). The moves
+    of the route itself are always kept, so the result is never worse than
+    the grid route, which only checks the arm at the cells; merged moves
+    are split with split_motions first, so each one keeps the direction of
+    the route. Straight motions that end up collinear are merged again, and
+    the waypoints are timed with Trajectory.
+
+    If a dict is passed as stats, it receives "waypoints" (route length and
+    number of trajectory waypoints) and "checked" (configurations checked).
+
+    Returns:
+        Trajectory, None for an empty route
+    """
+    if stats is None:
+        stats = {}
+    stats.update(waypoints=(len(route), 0), checked=0)
+    if not route:
+        return None
+
+    checker = MotionChecker(arm.link_lengths, arm.joint_limits, obstacles, step=step)
+    path = split_motions(merge_collinear(route_to_path(route, M)))
+    if len(path) > 2:
+        path = shortcut_path(checker, path)
+        # Shortcuts follow MotionChecker.difference, keep the angles continuous
+        steps = checker.difference(path[:-1], path[1:])
+        path = merge_collinear(np.vstack([path[:1], path[:1] + np.cumsum(steps, axis=0)]))
+
+    stats.update(waypoints=(len(route), len(path)), checked=checker.checked)
+    return Trajectory(path, max_velocity, max_acceleration)
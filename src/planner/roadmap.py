@@ -0,0 +1,287 @@
+# planner/roadmap.py
+
+from array import array
+from collections import Counter, OrderedDict
+
+import numpy as np
+from scipy import ndimage
+
+from planner.astar_planner import (
+    _flat_neighbors,
+    _flat_strides,
+    astar_torus,
+    heuristic_function,
+)
+
+
+class CSpaceRoadmap:
+    """
+    Precomputed connectivity of one occupancy grid for many queries.
+
+    Uses the same grid model as astar_torus (toroidal, moves of +-1 along
+    one axis, the goal can always be entered, an occupied start can be
+    left). Building the roadmap labels the connected components of free
+    cells, wrap-around included, so a query whose start and goal cannot be
+    connected is answered without searching.
+
+    Reachable queries are searched with A* using, if landmarks > 0, the
+    ALT heuristic: BFS distances from landmark cells spread out over the
+    free space bound the distance to the goal from below via the triangle
+    inequality. A goal can also get a full BFS distance field
+    (distance_field), after which any route to it is read off by
+    descending the field.
+    """
+
+    def __init__(self, grid, landmarks=0, max_fields=8):
+        if hasattr(grid, "to_array"):
+            grid = grid.to_array()
+        occupied = np.asarray(grid) != 0
+        self.shape = occupied.shape
+        self.ndim = occupied.ndim
+        self.size = occupied.size
+        self.max_fields = max_fields
+        self._strides = _flat_strides(self.shape)
+        self._occupied = bytes(occupied.reshape(-1).astype(np.uint8))
+        self._free = ~occupied.reshape(-1)
+        self._fields = OrderedDict()
+
+        self.labels = _label_torus(~occupied)
+        self.n_components = int(self.labels.max())
+        self._flat_labels = array("i", self.labels.reshape(-1).astype(np.int32).tobytes())
+
+        self.landmarks = []
+        self._landmark_fields = []
+        self._select_landmarks(landmarks)
+
+    def is_occupied(self, index):
+        return self._occupied[index]
+
+    def __getitem__(self, node):
+        return self._occupied[self._flat(node)]
+
+    def _flat(self, node):
+        return int(np.ravel_multi_index(tuple(node), self.shape))
+
+    def _neighbors(self, indices):
+        # Wrap-around neighbors of an array of flat indices, (2 * ndim, K)
+        neighbors = []
+        for size, stride in zip(self.shape, self._strides):
+            coord = (indices // stride) % size
+            neighbors.append(np.where(coord > 0, indices - stride, indices + (size - 1) * stride))
+            neighbors.append(
+                np.where(coord < size - 1, indices + stride, indices - (size - 1) * stride)
+            )
+        return np.array(neighbors).reshape(2 * self.ndim, -1)
+
+    def _bfs(self, source, free_only):
+        # Flat BFS distances from source (-1 = not reached). With free_only
+        # only free cells are reached; otherwise occupied cells are reached
+        # too but never left, which gives the number of moves astar_torus
+        # needs from each cell to the goal source.
+        distances = np.full(self.size, -1, dtype=np.int32)
+        distances[source] = 0
+        frontier = np.array([source])
+        distance = 0
+        while frontier.size:
+            if distance > 0:
+                frontier = frontier[self._free[frontier]]
+            neighbors = self._neighbors(frontier).reshape(-1)
+            neighbors = neighbors[distances[neighbors] < 0]
+            if free_only:
+                neighbors = neighbors[self._free[neighbors]]
+            frontier = np.unique(neighbors)
+            distance += 1
+            distances[frontier] = distance
+        return distances
+
+    def _select_landmarks(self, count):
+        # Farthest-point selection: each landmark is the free cell farthest
+        # from all previous ones (cells no landmark reaches count as
+        # farthest, so other components get landmarks too)
+        free = np.flatnonzero(self._free)
+        if count <= 0 or free.size == 0:
+            return
+        nearest = self._bfs(int(free[0]), free_only=True).astype(float)
+        for _ in range(count):
+            nearest[~self._free] = -1
+            nearest[self._free & (nearest < 0)] = np.inf
+            landmark = int(np.argmax(nearest))
+            if nearest[landmark] <= 0 and self.landmarks:
+                break  # Every free cell is already a landmark
+            field = self._bfs(landmark, free_only=True)
+            self.landmarks.append(tuple(int(i) for i in np.unravel_index(landmark, self.shape)))
+            self._landmark_fields.append(array("i", field.tobytes()))
+            if len(self.landmarks) == 1:
+                nearest = field.astype(float)
+            else:
+                reached = field >= 0
+                nearest[reached] = np.minimum(nearest[reached], field[reached])
+
+    def component(self, node):
+        """
+        Component label of a free node, 0 for an occupied node.
+        """
+        return self._flat_labels[self._flat(node)]
+
+    def _cell_neighbors(self, index):
+        return _flat_neighbors(index, self.shape, self._strides)
+
+    def _side_components(self, index):
+        # Components a route can use right next to one of its end cells
+        if not self._occupied[index]:
+            return {self._flat_labels[index]}
+        return {self._flat_labels[n] for n in self._cell_neighbors(index)} - {0}
+
+    def is_reachable(self, start_node, goal_node):
+        """
+        Whether astar_torus finds a route from start_node to goal_node.
+        """
+        start, goal = self._flat(start_node), self._flat(goal_node)
+        if start == goal:
+            return False  # astar_torus returns [] for start == goal
+        if goal in self._cell_neighbors(start):
+            return True
+        return bool(self._side_components(start) & self._side_components(goal))
+
+    def distance_field(self, goal_node):
+        """
+        Number of moves from every cell to goal_node (-1 = unreachable).
+
+        Fields are kept in an LRU of max_fields goals and used by query.
+        """
+        goal_node = tuple(int(i) for i in goal_node)
+        if goal_node in self._fields:
+            self._fields.move_to_end(goal_node)
+        else:
+            field = self._bfs(self._flat(goal_node), free_only=False)
+            self._fields[goal_node] = array("i", field.tobytes())
+            while len(self._fields) > self.max_fields:
+                self._fields.popitem(last=False)
+        return np.frombuffer(self._fields[goal_node], dtype=np.int32).reshape(self.shape)
+
+    def clear_fields(self):
+        """
+        Drop all cached distance fields.
+        """
+        self._fields.clear()
+
+    def landmark_heuristic(self, goal_node):
+        """
+        ALT heuristic h(flat_index) for goal_node, for astar_torus.
+
+        For a free goal, |d(L, v) - d(L, goal)| bounds the distance from v
+        for every landmark L in the same component. An occupied goal is
+        entered from one of its free neighbors, so the bound is 1 plus the
+        distance of d(L, v) to the range of d(L, w) over those neighbors.
+        The maximum with the toroidal Manhattan distance is returned.
+        """
+        goal = self._flat(goal_node)
+        if not self._occupied[goal]:
+            ends, offset = [goal], 0
+        else:
+            ends = [n for n in self._cell_neighbors(goal) if not self._occupied[n]]
+            offset = 1
+
+        terms = []
+        for field in self._landmark_fields:
+            values = [field[n] for n in ends if field[n] >= 0]
+            if values:
+                terms.append((field, min(values), max(values)))
+        manhattan = heuristic_function(self.shape, goal_node)
+        if not terms:
+            return manhattan
+
+        def h(index):
+            best = manhattan(index)
+            for field, low, high in terms:
+                distance = field[index]
+                if distance < 0:
+                    continue
+                if distance < low:
+                    bound = offset + low - distance
+                elif distance > high:
+                    bound = offset + distance - high
+                else:
+                    bound = offset
+                if bound > best:
+                    best = bound
+            return best
+
+        return h
+
+    def _descend(self, field, start, goal):
+        # Route from start by stepping to a neighbor one move closer that
+        # can be entered (BFS reached it from such a neighbor)
+        if field[start] <= 0:
+            return []
+        path = [start]
+        while path[-1] != goal:
+            closer = field[path[-1]] - 1
+            for neighbor in self._cell_neighbors(path[-1]):
+                if field[neighbor] == closer and (neighbor == goal or not self._occupied[neighbor]):
+                    path.append(neighbor)
+                    break
+        return [tuple(int(i) for i in np.unravel_index(n, self.shape)) for n in path]
+
+    def query(self, start_node, goal_node, state="auto"):
+        """
+        Route from start_node to goal_node, of the same length as the one
+        astar_torus returns on the grid ([] if there is none).
+        """
+        start_node, goal_node = tuple(start_node), tuple(goal_node)
+        if not self.is_reachable(start_node, goal_node):
+            return []
+        if goal_node in self._fields:
+            self._fields.move_to_end(goal_node)
+            field = self._fields[goal_node]
+            return self._descend(field, self._flat(start_node), self._flat(goal_node))
+
+        heuristic = self.landmark_heuristic(goal_node) if self.landmarks else "manhattan"
+        return astar_torus(self, start_node, goal_node, heuristic=heuristic, state=state)
+
+    def query_many(self, pairs, share_goals=True):
+        """
+        Routes for a sequence of (start_node, goal_node) pairs.
+
+        With share_goals, goals that appear in more than one pair get a
+        distance field first, so their queries need no search.
+        """
+        pairs = [(tuple(start), tuple(goal)) for start, goal in pairs]
+        if share_goals:
+            counts = Counter(goal for _, goal in pairs)
+            for goal, count in counts.most_common(self.max_fields):
+                if count > 1:
+                    self.distance_field(goal)
+        return [self.query(start, goal) for start, goal in pairs]
+
+
+def _label_torus(free):
+    """
+    Label 4-connected (2 * ndim-connected) components of free cells on a
+    grid whose axes wrap around. 0 marks occupied cells, components are
+    numbered from 1.
+    """
+    structure = ndimage.generate_binary_structure(free.ndim, 1)
+    labels, count = ndimage.label(free, structure=structure)
+
+    # Merge components that touch across the wrap-around faces
+    parent = list(range(count + 1))
+
+    def find(label):
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    for axis in range(free.ndim):
+        first, last = labels.take(0, axis=axis), labels.take(-1, axis=axis)
+        touching = (first > 0) & (last > 0)
+        pairs = np.unique(np.stack([first[touching], last[touching]], axis=1), axis=0)
+        for a, b in pairs.tolist():
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    roots = np.array([find(label) for label in range(count + 1)])
+    _, relabel = np.unique(roots, return_inverse=True)
+    return relabel.reshape(-1)[labels].astype(np.int32)
@@ -0,0 +1,481 @@
+# planner/sampling_planner.py
+
+import heapq
+import itertools
+
+import numpy as np
+
+from planner.astar_planner import astar_torus
+from planner.broad_phase import _MARGIN, BroadPhase
+from planner.collision import _segment_circle_hits, angle_occupancy, cell_occupancy
+from planner.nlink_arm import forward_kinematics
+
+# Joint configurations checked per batch, bounds the temporary arrays
+DEFAULT_BATCH_SIZE = 65536
+
+
+def wrap_angles(angles):
+    """
+    Angles mapped to [-pi, pi).
+    """
+    return (np.asarray(angles, dtype=float) + np.pi) % (2 * np.pi) - np.pi
+
+
+class MotionChecker:
+    """
+    Batched validity checks of joint configurations and of straight
+    joint-space motions between them.
+
+    Configurations use the cell semantics of get_occupancy_grid (joint
+    limits and circle obstacles). A joint whose limits cover the whole
+    circle, or that has none, wraps around: the motion between two angles
+    takes the shorter way round. A limited joint moves directly, which keeps
+    it between two angles that are within its limits.
+
+    Motions are checked conservatively. A motion is cut into sub-steps in
+    which no joint turns by more than step radians, and the arm is checked
+    at the middle of each sub-step. Over half a sub-step a point of link k
+    moves by at most step / 2 * sum((i + 1) * link_lengths[i] for i <= k),
+    so link k is checked against the obstacles grown by that distance (the
+    same bound as block_states). A motion that passes never touches an
+    obstacle, provided its end configurations are valid.
+    """
+
+    def __init__(self, link_lengths, joint_limits, obstacles, step=0.02):
+        self.link_lengths = np.asarray(link_lengths, dtype=float)
+        self.dims = len(self.link_lengths)
+        self.joint_limits = joint_limits
+        self.step = step
+        obstacles = np.asarray(obstacles, dtype=float).reshape(-1, 3)
+        self.obstacles = obstacles[obstacles[:, 2] > 0]
+        self.broad_phase = BroadPhase(self.link_lengths, self.obstacles)
+        self.checked = 0  # Configurations checked so far, sub-steps included
+
+        # Joint ranges in radians; joints covering the circle wrap around
+        low = np.full(self.dims, -np.pi)
+        high = np.full(self.dims, np.pi)
+        ranges = getattr(joint_limits, "angle_ranges", None)
+        if ranges is not None and len(ranges) == self.dims:
+            low, high = np.radians(np.asarray(ranges, dtype=float)).T
+        self.low, self.high = low, high
+        self.wraps = (low <= -np.pi) & (high >= np.pi)
+
+        # Obstacles grown by the sub-step bound, per link, without the ones
+        # the link cannot reach
+        growth = step / 2 * np.cumsum((np.arange(self.dims) + 1) * self.link_lengths)
+        reach = np.cumsum(self.link_lengths)
+        distance = np.hypot(self.obstacles[:, 0], self.obstacles[:, 1])
+        self.grown = []
+        for k in range(self.dims):
+            grown = self.obstacles.copy()
+            grown[:, 2] = (self.obstacles[:, 2] + growth[k]) * (1 + _MARGIN) + _MARGIN
+            self.grown.append(grown[distance < reach[k] + grown[:, 2]])
+
+    def difference(self, q_from, q_to):
+        """
+        Joint motion from q_from to q_to, the short way round on joints that
+        wrap around.
+        """
+        delta = np.asarray(q_to, dtype=float) - np.asarray(q_from, dtype=float)
+        return np.where(self.wraps, wrap_angles(delta), delta)
+
+    def distance(self, q_from, q_to):
+        """
+        Euclidean length of the joint motion (broadcasts over leading axes).
+        """
+        return np.linalg.norm(self.difference(q_from, q_to), axis=-1)
+
+    def normalize(self, q):
+        return np.where(self.wraps, wrap_angles(q), q)
+
+    def sample(self, rng, count):
+        """
+        count uniform random configurations within the joint ranges.
+        """
+        return rng.uniform(self.low, self.high, size=(count, self.dims))
+
+    def configs_free(self, q):
+        """
+        Boolean array, True where a configuration of q (K, n) is valid.
+        """
+        q = np.asarray(q, dtype=float).reshape(-1, self.dims)
+        self.checked += len(q)
+        return ~angle_occupancy(q, self.link_lengths, self.joint_limits, self.broad_phase)
+
+    def motions_free(self, q_from, q_to):
+        """
+        Boolean array, True where the straight motion from q_from[i] to
+        q_to[i] is free. All sub-steps of all motions are checked in batches.
+        """
+        q_from = np.asarray(q_from, dtype=float).reshape(-1, self.dims)
+        q_to = np.asarray(q_to, dtype=float).reshape(-1, self.dims)
+        free = np.ones(len(q_from), dtype=bool)
+        if not len(q_from) or not len(self.obstacles):
+            return free
+        delta = self.difference(q_from, q_to)
+        counts = np.maximum(1, np.ceil(np.abs(delta).max(axis=1) / self.step)).astype(np.int64)
+
+        # Motions are split into groups of about DEFAULT_BATCH_SIZE sub-steps
+        ends = np.cumsum(counts)
+        first = 0
+        while first < len(q_from):
+            budget = (ends[first - 1] if first else 0) + DEFAULT_BATCH_SIZE
+            last = max(first + 1, int(np.searchsorted(ends, budget, side="right")))
+            motions = np.arange(first, last)
+            motion = np.repeat(motions, counts[motions])
+            starts = np.cumsum(counts[motions]) - counts[motions]
+            sub = np.arange(len(motion)) - np.repeat(starts, counts[motions])
+            t = (sub + 0.5) / counts[motion]
+            hits = self._grown_hits(q_from[motion] + delta[motion] * t[:, None])
+            free[motions] = ~np.logical_or.reduceat(hits, starts)
+            first = last
+        return free
+
+    def _grown_hits(self, q):
+        # True where the arm at q touches an obstacle grown for its link
+        self.checked += len(q)
+        points = forward_kinematics(self.link_lengths, q)
+        hit = np.zeros(len(q), dtype=bool)
+        for k, grown in enumerate(self.grown):
+            if not len(grown):
+                continue
+            live = np.flatnonzero(~hit)
+            if not len(live):
+                break
+            a, b = points[live, k], points[live, k + 1]
+            hit[live] = _segment_circle_hits(a, b, grown).any(axis=-1)
+        return hit
+
+    def path_free(self, path):
+        """
+        Whether every configuration and motion of a path (K, n) is valid.
+        """
+        path = np.asarray(path, dtype=float)
+        return bool(self.configs_free(path).all() and self.motions_free(path[:-1], path[1:]).all())
+
+
+class _Tree:
+    # Configurations with parent links, stored in a growing array
+    def __init__(self, root):
+        self.nodes = np.empty((64, len(root)))
+        self.nodes[0] = root
+        self.parents = [-1]
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add(self, q, parent):
+        if len(self) == len(self.nodes):
+            self.nodes = np.vstack([self.nodes, np.empty_like(self.nodes)])
+        self.nodes[len(self)] = q
+        self.parents.append(parent)
+        return len(self) - 1
+
+    def branch(self, index):
+        # Configurations from the root to node index
+        path = []
+        while index >= 0:
+            path.append(self.nodes[index])
+            index = self.parents[index]
+        return path[::-1]
+
+
+def _steer(checker, tree, target, step_size, max_steps=None):
+    """
+    Grow tree from its node nearest to target towards it, by at most
+    max_steps steps of step_size (None: all the way). All new
+    configurations and motions are checked in one batch, and the valid
+    prefix is added.
+
+    Returns:
+        (last node index, number of nodes added, whether target was reached)
+    """
+    nodes = tree.nodes[: len(tree)]
+    near = int(np.argmin(checker.distance(nodes, target)))
+    delta = checker.difference(nodes[near], target)
+    steps = int(np.ceil(np.linalg.norm(delta) / step_size))
+    if steps == 0:
+        return near, 0, True
+    count = steps if max_steps is None else min(steps, max_steps)
+    waypoints = checker.normalize(nodes[near] + delta * (np.arange(1, count + 1) / steps)[:, None])
+    previous = np.vstack([nodes[near], waypoints[:-1]])
+    valid = checker.configs_free(waypoints) & checker.motions_free(previous, waypoints)
+    added = count if valid.all() else int(np.argmin(valid))
+
+    index = near
+    for q in waypoints[:added]:
+        index = tree.add(q, index)
+    return index, added, added == steps
+
+
+def rrt_connect(checker, q_start, q_goal, step_size=0.3, max_iterations=5000, seed=None):
+    """
+    RRT-Connect between two valid configurations.
+
+    One tree grows from each end. Every iteration extends one tree by a
+    step towards a random configuration, then grows the other tree
+    towards the new node as far as it gets, and the two swap roles.
+
+    Returns:
+        Path as an array of configurations (K, n) from q_start to q_goal,
+        or None if no path was found within max_iterations
+    """
+    rng = np.random.default_rng(seed)
+    q_start, q_goal = np.asarray(q_start, dtype=float), np.asarray(q_goal, dtype=float)
+    if not checker.configs_free([q_start, q_goal]).all():
+        return None
+    if checker.motions_free([q_start], [q_goal])[0]:
+        return np.array([q_start, q_goal])
+
+    start_tree = _Tree(q_start)
+    grow, other = start_tree, _Tree(q_goal)
+    for _ in range(max_iterations):
+        new, added, _ = _steer(checker, grow, checker.sample(rng, 1)[0], step_size, max_steps=1)
+        if added:
+            meet, _, reached = _steer(checker, other, grow.nodes[new], step_size)
+            if reached:
+                path = grow.branch(new) + other.branch(meet)[::-1][1:]
+                return np.array(path if grow is start_tree else path[::-1])
+        grow, other = other, grow
+    return None
+
+
+class PRM:
+    """
+    Probabilistic roadmap for many queries in one scene.
+
+    Building samples n_samples valid configurations and connects every one
+    to its neighbors nearest ones (wrap-around distance) with the checked
+    straight motions, all in batches. query() connects the start and the
+    goal to their nearest roadmap nodes and runs Dijkstra on the roadmap.
+    """
+
+    def __init__(self, checker, n_samples=500, neighbors=10, seed=None):
+        self.checker = checker
+        self.neighbors = neighbors
+        rng = np.random.default_rng(seed)
+
+        nodes = []
+        found, attempts = 0, 0
+        while found < n_samples and attempts < 50:
+            batch = checker.sample(rng, 2 * (n_samples - found) + 16)
+            batch = batch[checker.configs_free(batch)][: n_samples - found]
+            nodes.append(batch)
+            found += len(batch)
+            attempts += 1
+        self.nodes = np.vstack(nodes) if nodes else np.empty((0, checker.dims))
+
+        # Candidate edges to the nearest neighbors, each pair once
+        pairs = set()
+        for first in range(0, len(self.nodes), 256):
+            rows = np.arange(first, min(first + 256, len(self.nodes)))
+            nearest = self._nearest(self.nodes[rows], neighbors + 1)
+            for row, columns in zip(rows.tolist(), nearest.tolist()):
+                pairs.update((min(row, c), max(row, c)) for c in columns if c != row)
+        pairs = np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+        valid = checker.motions_free(self.nodes[pairs[:, 0]], self.nodes[pairs[:, 1]])
+        pairs = pairs[valid]
+        lengths = checker.distance(self.nodes[pairs[:, 0]], self.nodes[pairs[:, 1]])
+
+        self.edges = [[] for _ in range(len(self.nodes))]
+        for (i, j), length in zip(pairs.tolist(), lengths.tolist()):
+            self.edges[i].append((j, length))
+            self.edges[j].append((i, length))
+
+    def _nearest(self, q, count):
+        # Indices of the count nearest roadmap nodes of every row of q
+        distances = self.checker.distance(q[:, None, :], self.nodes[None, :, :])
+        count = min(count, len(self.nodes))
+        return np.argpartition(distances, count - 1, axis=1)[:, :count]
+
+    def _connections(self, q):
+        # Roadmap nodes that q connects to, with their distances
+        if not len(self.nodes):
+            return []
+        nearest = self._nearest(q[None], self.neighbors)[0]
+        starts = np.repeat(q[None], len(nearest), axis=0)
+        valid = self.checker.motions_free(starts, self.nodes[nearest])
+        nearest = nearest[valid]
+        return list(zip(nearest.tolist(), self.checker.distance(self.nodes[nearest], q).tolist()))
+
+    def query(self, q_start, q_goal):
+        """
+        Path (K, n) from q_start to q_goal through the roadmap, None if the
+        ends are invalid or the roadmap does not connect them.
+        """
+        checker = self.checker
+        q_start, q_goal = np.asarray(q_start, dtype=float), np.asarray(q_goal, dtype=float)
+        if not checker.configs_free([q_start, q_goal]).all():
+            return None
+        if checker.motions_free([q_start], [q_goal])[0]:
+            return np.array([q_start, q_goal])
+
+        # Dijkstra with the start as node -1 and the goal as node -2
+        goal_edges = {node: length for node, length in self._connections(q_goal)}
+        distances = {-1: 0.0}
+        parents = {}
+        heap = [(0.0, -1)]
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if node == -2:
+                break
+            if distance > distances[node]:
+                continue
+            edges = self._connections(q_start) if node == -1 else self.edges[node]
+            if node in goal_edges:
+                edges = edges + [(-2, goal_edges[node])]
+            for neighbor, length in edges:
+                if distance + length < distances.get(neighbor, np.inf):
+                    distances[neighbor] = distance + length
+                    parents[neighbor] = node
+                    heapq.heappush(heap, (distance + length, neighbor))
+        if -2 not in parents:
+            return None
+
+        path = [q_goal]
+        node = parents[-2]
+        while node != -1:
+            path.append(self.nodes[node])
+            node = parents[node]
+        path.append(q_start)
+        return np.array(path[::-1])
+
+
+def shortcut_path(checker, path):
+    """
+    Greedy shortcutting: from every kept waypoint, jump to the farthest
+    later waypoint that a straight motion reaches, testing all candidates
+    in one batch.
+    """
+    path = np.asarray(path, dtype=float)
+    kept = [0]
+    while kept[-1] < len(path) - 1:
+        current = kept[-1]
+        later = np.arange(current + 1, len(path))
+        free = checker.motions_free(np.repeat(path[current][None], len(later), axis=0), path[later])
+        free[0] = True  # The original motion
+        kept.append(int(later[np.flatnonzero(free)[-1]]))
+    return path[kept]
+
+
+class _Corridor:
+    # Grid for astar_torus in which only the given free cells can be entered
+    def __init__(self, shape, free):
+        self.shape = shape
+        self._free = free
+
+    def is_occupied(self, index):
+        return index not in self._free
+
+
+def path_to_route(checker, path, M, widen=1):
+    """
+    Grid route (list of node tuples, as astar_torus returns) along a path.
+
+    Every motion is sampled so that no joint moves by more than one cell
+    between consecutive samples. The cells around the samples (the floor
+    and ceiling cell of every joint) form a corridor around the path; its
+    cells are checked with cell_occupancy in one batch and astar_torus
+    finds a route of unit steps through the free ones. If they do not
+    connect the ends, the corridor is widened by the axis neighbors of its
+    free cells, at most widen times. Only the start and goal cells may be
+    occupied, as in the grid search.
+
+    Returns:
+        List of node tuples, [] if the corridor holds no route (the grid may
+        close gaps that the continuous path passes through)
+    """
+    path = np.asarray(path, dtype=float)
+    samples = [path[:1]]
+    for q_from, q_to in zip(path[:-1], path[1:]):
+        delta = checker.difference(q_from, q_to)
+        count = max(1, int(np.ceil(np.abs(delta).max() * M / (2 * np.pi))))
+        samples.append(q_from + delta * (np.arange(1, count + 1) / count)[:, None])
+    cells = (wrap_angles(np.vstack(samples)) + np.pi) * M / (2 * np.pi)
+    start, goal = (tuple(int(c) for c in np.rint(cell).astype(int) % M) for cell in cells[[0, -1]])
+
+    shape = (M,) * checker.dims
+    corners = np.array(list(itertools.product((0, 1), repeat=checker.dims)))
+    corridor = (np.floor(cells).astype(np.int64)[:, None, :] + corners[None]) % M
+    new = np.unique(np.ravel_multi_index(tuple(corridor.reshape(-1, checker.dims).T), shape))
+    seen, free = set(), set()
+    steps = np.vstack([np.eye(checker.dims, dtype=np.int64), -np.eye(checker.dims, dtype=np.int64)])
+    for _ in range(widen + 1):
+        seen.update(new.tolist())
+        occupied = cell_occupancy(
+            new, checker.link_lengths, checker.joint_limits, checker.broad_phase, M
+        )
+        free.update(new[~occupied].tolist())
+        route = astar_torus(_Corridor(shape, free), start, goal, state="sparse")
+        if route:
+            return route
+
+        # Axis neighbors of the free cells that were not checked yet
+        coords = np.stack(np.unravel_index(np.fromiter(free, np.int64, len(free)), shape), axis=1)
+        neighbors = (coords[:, None, :] + steps[None]) % M
+        new = np.unique(np.ravel_multi_index(tuple(neighbors.reshape(-1, checker.dims).T), shape))
+        new = new[~np.isin(new, np.fromiter(seen, np.int64, len(seen)))]
+        if not len(new):
+            break
+    return []
+
+
+SAMPLING_METHODS = ("rrt_connect", "prm")
+
+
+def plan_sampling(
+    arm,
+    obstacles,
+    start_node,
+    goal_node,
+    M=100,
+    method="rrt_connect",
+    step=0.02,
+    shortcut=True,
+    seed=None,
+    stats=None,
+    **options,
+):
+    """
+    Sampling-based planning between two grid cells, for arms with too many
+    joints for a full occupancy grid.
+
+    start_node and goal_node are cells of the (M,) * n_links grid with the
+    meaning of get_occupancy_grid, and the result is a route of cells like
+    astar_torus returns, so the GUI can animate it. Unlike the grid
+    search, the start and goal configurations must be collision-free, and
+    the route is built with path_to_route, so it can be [] where the path
+    passes a gap that the grid closes. The
+    planner itself works on continuous joint angles (MotionChecker with
+    the given step). method is "rrt_connect" (options for rrt_connect) or
+    "prm" (options for PRM). With shortcut, the path is shortened with
+    shortcut_path before it is turned into a route.
+
+    If a dict is passed as stats, it receives "path" (the joint-angle
+    waypoints, or None) and "checked" (configurations checked).
+
+    Returns:
+        List of node tuples from start to goal, [] if no path was found
+    """
+    if stats is None:
+        stats = {}
+    stats.update(path=None, checked=0)
+    if tuple(start_node) == tuple(goal_node):
+        return []  # Same as astar_torus
+
+    checker = MotionChecker(arm.link_lengths, arm.joint_limits, obstacles, step=step)
+    q_start = 2 * np.pi * np.asarray(start_node) / M - np.pi
+    q_goal = 2 * np.pi * np.asarray(goal_node) / M - np.pi
+    if method == "rrt_connect":
+        path = rrt_connect(checker, q_start, q_goal, seed=seed, **options)
+    elif method == "prm":
+        path = PRM(checker, seed=seed, **options).query(q_start, q_goal)
+    else:
+        raise ValueError(f"Unknown sampling method {method!r}, expected one of {SAMPLING_METHODS}.")
+
+    if path is not None and shortcut:
+        path = shortcut_path(checker, path)
+    stats.update(path=path, checked=checker.checked)
+    if path is None:
+        return []
+    return path_to_route(checker, path, M)
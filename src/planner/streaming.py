@@ -0,0 +1,45 @@
+# planner/streaming.py
+
+from collections import namedtuple
+
+from planner.astar_planner import iter_astar_torus
+from planner.collision import DEFAULT_CHUNK_SIZE, iter_occupancy_grid
+
+# kind:  "grid"   C-space progress, done/total are cells
+#        "search" A* progress, done is nodes expanded, route is the best
+#                 partial route so far
+#        "route"  final result, route is what astar_torus returns
+# grid is the occupancy grid (partially filled during "grid" events)
+PlanningEvent = namedtuple("PlanningEvent", ["kind", "done", "total", "route", "grid"])
+
+
+def plan_stream(
+    arm,
+    obstacles,
+    start_node,
+    goal_node,
+    M=100,
+    grid=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    report_every=1000,
+    **search_options,
+):
+    """
+    Plan a route and yield PlanningEvents while doing it.
+
+    The occupancy grid is built chunk by chunk unless a precomputed grid is
+    passed. search_options are forwarded to iter_astar_torus (heuristic,
+    weight, state). The last event always has kind "route". Stop iterating
+    (or call close()) to cancel.
+    """
+    if grid is None:
+        total = M**arm.n_links
+        for grid, done in iter_occupancy_grid(arm, obstacles, M, chunk_size):
+            yield PlanningEvent("grid", done, total, None, grid)
+
+    size = grid.size
+    for expanded, route, finished in iter_astar_torus(
+        grid, tuple(start_node), tuple(goal_node), report_every=report_every, **search_options
+    ):
+        kind = "route" if finished else "search"
+        yield PlanningEvent(kind, expanded, size, route, grid)
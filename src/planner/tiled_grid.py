@@ -0,0 +1,186 @@
+# planner/tiled_grid.py
+
+import itertools
+import json
+from pathlib import Path
+
+import numpy as np
+
+from planner.broad_phase import BroadPhase
+from planner.collision import DEFAULT_CHUNK_SIZE, cell_occupancy, product_occupancy
+
+# Default tiles are the largest that still fit in one page of packed bits
+PAGE_BYTES = 4096
+
+
+def default_tile(shape, page_bytes=PAGE_BYTES):
+    """
+    Largest tile edge whose tile**ndim cells fit in page_bytes of packed
+    bits and whose file is at most 1% larger than the smallest possible.
+    Edges that divide every axis store exactly one bit per cell; when M has
+    no such divisor (e.g. a prime M), the last tiles along each axis are
+    padded instead of falling back to one cell (one byte) per tile.
+    """
+    def file_bytes(t):
+        tiles = np.prod([-(-n // t) for n in shape], dtype=float)
+        return tiles * ((t ** len(shape) + 7) // 8)
+
+    edges = [t for t in range(1, max(1, min(shape)) + 1) if t ** len(shape) <= 8 * page_bytes]
+    sizes = [file_bytes(t) for t in edges]
+    return max(t for t, size in zip(edges, sizes) if size <= 1.01 * min(sizes))
+
+
+class TiledGrid:
+    """
+    Occupancy grid stored as packed bits in a memory-mapped file.
+
+    The grid is cut into tiles of tile**ndim cells. If tile does not divide
+    an axis, the last tiles along it are padded with cells that are never
+    read. Tiles are stored one after the other in C order of their tile
+    coordinates, cells within a tile in C order, one bit per cell (1 =
+    occupied). Neighboring cells along any axis are then usually in the
+    same tile, so a search touches a few pages of the file at a time and
+    the OS page cache, not the process, holds the grid.
+
+    It implements the grid interface of astar_torus (shape and is_occupied
+    with C-order flat indices). The shape and tile size are stored next to
+    the data file in a .json file, so open() restores the grid.
+    """
+
+    def __init__(self, path, shape, tile, mode="r"):
+        self.path = Path(path)
+        self.shape = tuple(int(n) for n in shape)
+        self.ndim = len(self.shape)
+        self.size = int(np.prod(self.shape))
+        self.tile = int(tile)
+        if self.tile < 1:
+            raise ValueError(f"Tile size must be positive, got {self.tile}.")
+        self.tiles = tuple(-(-n // self.tile) for n in self.shape)
+        self.tile_cells = self.tile**self.ndim
+        self.tile_bytes = (self.tile_cells + 7) // 8
+        n_bytes = int(np.prod(self.tiles)) * self.tile_bytes
+        self.bits = np.memmap(self.path, dtype=np.uint8, mode=mode, shape=(n_bytes,))
+
+        # Per-axis C-order strides of cells, of tiles and of cells in a tile
+        self._strides = [int(np.prod(self.shape[i + 1:])) for i in range(self.ndim)]
+        self._tile_strides = [int(np.prod(self.tiles[i + 1:])) for i in range(self.ndim)]
+        self._inner_strides = [self.tile ** (self.ndim - 1 - i) for i in range(self.ndim)]
+
+    @staticmethod
+    def _meta_path(path):
+        return Path(str(path) + ".json")
+
+    @classmethod
+    def create(cls, path, shape, tile=None):
+        """
+        New all-free grid in the file at path (overwritten if it exists).
+        """
+        tile = default_tile(shape) if tile is None else tile
+        grid = cls(path, shape, tile, mode="w+")
+        meta = {"shape": list(grid.shape), "tile": grid.tile}
+        cls._meta_path(path).write_text(json.dumps(meta))
+        return grid
+
+    @classmethod
+    def open(cls, path, mode="r"):
+        """
+        Grid written earlier by create, read-only by default.
+        """
+        meta = json.loads(cls._meta_path(path).read_text())
+        return cls(path, meta["shape"], meta["tile"], mode=mode)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def _bit(self, index):
+        # Position in the file of the cell with flat C-order index
+        tile_index = offset = 0
+        for size, stride, tile_stride, inner_stride in zip(
+            self.shape, self._strides, self._tile_strides, self._inner_strides
+        ):
+            tile_coord, inner = divmod((index // stride) % size, self.tile)
+            tile_index += tile_coord * tile_stride
+            offset += inner * inner_stride
+        return tile_index * self.tile_bytes * 8 + offset
+
+    def is_occupied(self, index):
+        """
+        Occupancy of the cell with flat (C-order) index.
+        """
+        bit = self._bit(index)
+        return bool((int(self.bits[bit >> 3]) >> (7 - (bit & 7))) & 1)
+
+    def __getitem__(self, node):
+        return int(self.is_occupied(int(np.ravel_multi_index(node, self.shape))))
+
+    def cells(self, indices):
+        """
+        Occupancy (0 or 1) of an array of flat (C-order) indices.
+        """
+        coords = np.unravel_index(np.asarray(indices, dtype=np.int64), self.shape)
+        tile_index = np.ravel_multi_index(tuple(c // self.tile for c in coords), self.tiles)
+        inner = tuple(c % self.tile for c in coords)
+        offset = np.ravel_multi_index(inner, (self.tile,) * self.ndim)
+        bits = tile_index.astype(np.int64) * self.tile_bytes * 8 + offset
+        return (self.bits[bits >> 3] >> (7 - (bits & 7))) & 1
+
+    def write_tiles(self, first, occupancy):
+        """
+        Store consecutive tiles first, first + 1, ... from a boolean array
+        of shape (count,) + (tile,) * ndim.
+        """
+        occupancy = np.asarray(occupancy, dtype=bool).reshape(-1, self.tile_cells)
+        packed = np.packbits(occupancy, axis=1)
+        start = first * self.tile_bytes
+        self.bits[start:start + packed.size] = packed.reshape(-1)
+
+    def to_array(self, dtype=int):
+        """
+        Dense C-order grid (only for grids that fit in memory).
+        """
+        return self.cells(np.arange(self.size)).reshape(self.shape).astype(dtype)
+
+    def flush(self):
+        self.bits.flush()
+
+
+def get_tiled_occupancy_grid(arm, obstacles, M, path, tile=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Build the occupancy grid of get_occupancy_grid into a TiledGrid file.
+
+    The grid is computed and written a group of tiles at a time (at most
+    chunk_size cells, and at least one tile), so memory use does not depend
+    on the grid size. Each group is evaluated with the prefix sharing of
+    product_occupancy, or cell by cell for joint limits without axis masks.
+    """
+    dims = arm.n_links
+    link_lengths = list(arm.link_lengths)
+    joint_limits = arm.joint_limits
+    grid = TiledGrid.create(path, tuple([M] * dims), tile)
+    t = grid.tile
+    broad_phase = BroadPhase(link_lengths, [list(obs) for obs in obstacles])
+    separable = not joint_limits or hasattr(joint_limits, "axis_masks")
+
+    # Groups are runs of tiles along the last tile axis
+    row_tiles = grid.tiles[-1]
+    group = max(1, min(row_tiles, chunk_size // grid.tile_cells))
+    for row, lead in enumerate(itertools.product(*(range(n) for n in grid.tiles[:-1]))):
+        for first in range(0, row_tiles, group):
+            count = min(group, row_tiles - first)
+            # Padding cells past the end of an axis repeat wrapped cells
+            axis_indices = [np.arange(c * t, (c + 1) * t) % M for c in lead]
+            axis_indices.append(np.arange(first * t, (first + count) * t) % M)
+            if separable:
+                occupied = product_occupancy(
+                    axis_indices, link_lengths, joint_limits, broad_phase, M
+                )
+            else:
+                mesh = np.meshgrid(*axis_indices, indexing="ij")
+                flat = np.ravel_multi_index(tuple(mesh), grid.shape).reshape(-1)
+                occupied = cell_occupancy(flat, link_lengths, joint_limits, broad_phase, M)
+            # (t, ..., t, count * t) -> (count, t, ..., t), one tile per row
+            occupied = occupied.reshape((t,) * (dims - 1) + (count, t))
+            grid.write_tiles(row * row_tiles + first, np.moveaxis(occupied, -2, 0))
+    grid.flush()
+    return grid
@@ -1,6 +1,16 @@
 import pytest
 import numpy as np
-from planner.astar_planner import astar_torus, find_neighbors_nd, calc_heuristic_map
+from planner.astar_planner import (
+    astar_torus,
+    bidirectional_astar_torus,
+    find_neighbors_nd,
+    calc_heuristic_map,
+    heuristic_function,
+    jps_torus,
+)
+from planner.collision import get_occupancy_grid
+from planner.cspace_grid import CSpaceGrid
+from planner.nlink_arm import NLinkArm
 
 
 def test_find_neighbors_nd():
@@ -42,6 +52,34 @@ def test_calc_heuristic_map():
     assert "Goal node has 3 dimensions but grid has 2" in str(exc_info.value)
 
 
+def test_calc_heuristic_map_variants():
+    grid = np.zeros((6, 4, 5))
+    goal_node = (1, 3, 0)
+
+    manhattan = calc_heuristic_map(grid, goal_node)
+    for idx in np.ndindex(grid.shape):
+        expected = sum(
+            min(abs(idx[i] - goal_node[i]), grid.shape[i] - abs(idx[i] - goal_node[i]))
+            for i in range(3)
+        )
+        assert manhattan[idx] == expected
+
+    weighted = calc_heuristic_map(grid, goal_node, heuristic="weighted", weight=1.5)
+    assert np.array_equal(weighted, 1.5 * manhattan)
+    assert not np.any(calc_heuristic_map(grid, goal_node, heuristic="zero"))
+
+    with pytest.raises(ValueError):
+        calc_heuristic_map(grid, goal_node, heuristic="euclidean")
+
+
+def test_heuristic_function_matches_map():
+    grid = np.zeros((7, 5))
+    goal_node = (6, 1)
+    h = heuristic_function(grid.shape, goal_node, "weighted", 2.0)
+    heuristic_map = calc_heuristic_map(grid, goal_node, "weighted", 2.0).reshape(-1)
+    assert [h(i) for i in range(grid.size)] == heuristic_map.tolist()
+
+
 def test_astar_torus_simple():
     # Create a simple grid without obstacles
     grid = np.zeros((5, 5))
@@ -78,3 +116,168 @@ def test_astar_torus_wrap_around():
     assert len(path) > 0
     assert path[0] == start_node
     assert path[-1] == goal_node
+
+
+def test_astar_torus_wrap_around_is_shortest():
+    # (0, 0) -> (4, 4) on a 5x5 torus is two wrapped moves
+    grid = np.zeros((5, 5))
+    path = astar_torus(grid, (0, 0), (4, 4))
+    assert len(path) == 3
+
+
+def test_astar_torus_goal_always_enterable():
+    # The goal can be entered even when its cell is occupied
+    grid = np.zeros((6, 6))
+    grid[3, 3] = 1
+    path = astar_torus(grid, (0, 3), (3, 3))
+    assert path[-1] == (3, 3)
+    assert len(path) == 4
+
+
+def test_astar_torus_3d_detour():
+    grid = np.zeros((6, 6, 6), dtype=int)
+    grid[2, :, :] = 1
+    grid[2, 5, 5] = 0  # Single gap in the wall
+    grid[4, :, :] = 1
+    path = astar_torus(grid, (0, 0, 0), (3, 0, 0))
+    assert path[0] == (0, 0, 0)
+    assert path[-1] == (3, 0, 0)
+    assert (2, 5, 5) in path
+    for node in path[1:-1]:
+        assert grid[node] == 0
+    for a, b in zip(path, path[1:]):
+        assert b in find_neighbors_nd(a, 6, 3)
+
+
+def test_astar_torus_heuristics_same_length():
+    rng = np.random.default_rng(3)
+    grid = (rng.random((15, 15)) < 0.3).astype(int)
+    grid[0, 0] = 0
+    reference = astar_torus(grid, (0, 0), (7, 9))
+    assert reference
+    dijkstra = astar_torus(grid, (0, 0), (7, 9), heuristic="zero")
+    assert len(dijkstra) == len(reference)
+    weighted = astar_torus(grid, (0, 0), (7, 9), heuristic="weighted", weight=2.0)
+    assert len(weighted) >= len(reference)
+
+
+def test_astar_torus_search_states_agree():
+    rng = np.random.default_rng(5)
+    grid = (rng.random((9, 8, 7)) < 0.3).astype(int)
+    start, goal = (0, 0, 0), (5, 4, 3)
+    dense = astar_torus(grid, start, goal, state="dense")
+    sparse = astar_torus(grid, start, goal, state="sparse")
+    assert dense == sparse == astar_torus(grid, start, goal)
+
+    with pytest.raises(ValueError):
+        astar_torus(grid, start, goal, state="compressed")
+
+
+def test_bidirectional_astar_torus_same_length():
+    rng = np.random.default_rng(7)
+    for shape in [(12, 12), (20, 9), (7, 6, 5)]:
+        grid = (rng.random(shape) < 0.3).astype(int)
+        for _ in range(10):
+            start = tuple(int(rng.integers(n)) for n in shape)
+            goal = tuple(int(rng.integers(n)) for n in shape)
+            reference = astar_torus(grid, start, goal)
+            path = bidirectional_astar_torus(grid, start, goal)
+            assert len(path) == len(reference)
+            if path:
+                assert path[0] == start and path[-1] == goal
+                for node in path[1:-1]:
+                    assert grid[node] == 0
+                for a, b in zip(path, path[1:]):
+                    # Exactly one coordinate moves by one step, modulo wrap-around
+                    moved = [(j - i) % n for i, j, n in zip(a, b, shape) if i != j]
+                    sizes = [n for i, j, n in zip(a, b, shape) if i != j]
+                    assert len(moved) == 1 and moved[0] in (1, sizes[0] - 1)
+
+
+def test_bidirectional_astar_torus_goal_and_stats():
+    grid = np.zeros((10, 10), dtype=int)
+    grid[:, [0, 5]] = 1
+    grid[3, 5] = 0
+
+    # Occupied goal is still enterable, like astar_torus
+    grid[3, 8] = 1
+    stats = {}
+    path = bidirectional_astar_torus(grid, (3, 2), (3, 8), stats=stats)
+    assert len(path) == len(astar_torus(grid, (3, 2), (3, 8))) == 7
+    assert stats["expanded"] == stats["expanded_forward"] + stats["expanded_backward"]
+
+    # Walled-in goal: the backward side runs dry almost immediately
+    grid = np.zeros((30, 30), dtype=int)
+    grid[7:10, 7:10] = 1
+    grid[8, 8] = 0
+    forward, both = {}, {}
+    assert astar_torus(grid, (0, 0), (8, 8), stats=forward) == []
+    assert bidirectional_astar_torus(grid, (0, 0), (8, 8), stats=both) == []
+    assert both["expanded"] < forward["expanded"]
+
+    assert bidirectional_astar_torus(grid, (0, 0), (0, 0)) == []
+
+
+def test_bidirectional_astar_torus_expands_fewer_nodes():
+    # C-space of "Example 6": the searches meet in the middle of the passage
+    arm = NLinkArm([0.5, 1.5], [0, 0])
+    grid = get_occupancy_grid(arm, [[1.75, 0.75, 0.6], [0.55, 1.5, 0.5], [0, -1, 0.7]], 100)
+    forward, both = {}, {}
+    reference = astar_torus(grid, (10, 50), (58, 56), stats=forward)
+    path = bidirectional_astar_torus(grid, (10, 50), (58, 56), stats=both)
+    assert len(path) == len(reference) == 143
+    assert 2 * both["expanded"] < forward["expanded"]
+
+
+def test_find_neighbors_nd_pruned():
+    # Moving +1 along axis 0 of a 3D grid: straight on, and both sides of
+    # the later axes 1 and 2
+    neighbors = find_neighbors_nd((5, 5, 5), 10, 3, parent=(4, 5, 5))
+    assert neighbors == [(6, 5, 5), (5, 4, 5), (5, 6, 5), (5, 5, 4), (5, 5, 6)]
+
+    # Moving -1 along axis 1 across the wrap: turns to axis 0 are pruned
+    # unless the cell beside the parent is occupied
+    assert find_neighbors_nd((3, 9), 10, 2, parent=(3, 0)) == [(3, 8)]
+    blocked = {(4, 0)}
+    neighbors = find_neighbors_nd((3, 9), 10, 2, parent=(3, 0), is_occupied=blocked.__contains__)
+    assert neighbors == [(4, 9), (3, 8)]
+
+
+def test_jps_torus_same_length():
+    rng = np.random.default_rng(11)
+    for shape in [(25, 25), (40, 7), (8, 7, 6), (5, 4, 5, 4)]:
+        grid = (rng.random(shape) < 0.3).astype(int)
+        packed = CSpaceGrid.from_array(grid)
+        for _ in range(10):
+            start = tuple(int(rng.integers(n)) for n in shape)
+            goal = tuple(int(rng.integers(n)) for n in shape)
+            reference = astar_torus(grid, start, goal)
+            path = jps_torus(grid, start, goal)
+            assert len(path) == len(reference)
+            # Grid objects are scanned instead of using the numpy jump tables
+            assert len(jps_torus(packed, start, goal)) == len(reference)
+            if path:
+                assert path[0] == start and path[-1] == goal
+                for node in path[1:-1]:
+                    assert grid[node] == 0
+                for a, b in zip(path, path[1:]):
+                    moved = [(j - i) % n for i, j, n in zip(a, b, shape) if i != j]
+                    sizes = [n for i, j, n in zip(a, b, shape) if i != j]
+                    assert len(moved) == 1 and moved[0] in (1, sizes[0] - 1)
+
+
+def test_jps_torus_fewer_expansions():
+    grid = np.zeros((50, 50), dtype=int)
+    grid[10:40, 25] = 1
+    grid[30, 10] = 1  # Occupied goal is still enterable
+    reference, stats = {}, {}
+    path = jps_torus(grid, (20, 5), (30, 10), stats=stats)
+    assert len(path) == len(astar_torus(grid, (20, 5), (30, 10), stats=reference)) == 16
+    assert stats["expanded"] < reference["expanded"]
+
+    # Wrap-around is the only way through
+    grid = np.ones((1, 30), dtype=int)
+    grid[0, [0, 1, 28, 29]] = 0
+    assert jps_torus(grid, (0, 1), (0, 28)) == [(0, 1), (0, 0), (0, 29), (0, 28)]
+    assert jps_torus(grid, (0, 1), (0, 10)) == []
+    assert jps_torus(grid, (0, 1), (0, 1)) == []
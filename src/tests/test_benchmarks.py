@@ -0,0 +1,46 @@
+import sys
+
+from benchmarks.run_benchmarks import _peak_rss_mb, build_cases, compare, measure
+
+
+def test_build_cases_cover_all_groups():
+    cases = build_cases(quick=True)
+    groups = {
+        "grid", "heuristic", "search", "roadmap", "multires", "sampling", "smoothing", "kinematics"
+    }
+    assert {c.group for c in cases} == groups
+    assert len({c.name for c in cases}) == len(cases)
+
+
+def test_measure_search_case():
+    case = next(c for c in build_cases(quick=True) if c.group == "search")
+    result = measure(case, repeat=1)
+    assert result["name"] == case.name
+    assert result["time_s"] > 0
+    if sys.platform != "win32":
+        assert result["peak_rss_mb"] > 0
+    assert result["expanded"] > 0
+
+
+def test_peak_rss_without_resource_module(monkeypatch):
+    # The resource module only exists on Unix
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert _peak_rss_mb() is None
+
+
+def test_compare_flags_regressions():
+    baseline = {
+        "results": [
+            {"name": "a", "time_s": 1.0},
+            {"name": "b", "time_s": 1.0, "expanded": 100},
+            {"name": "c", "time_s": 1.0},
+        ]
+    }
+    results = [
+        {"name": "a", "time_s": 1.1},
+        {"name": "b", "time_s": 0.9, "expanded": 150},
+        {"name": "c", "time_s": 1.5},
+        {"name": "new", "time_s": 9.0},
+    ]
+    flagged = [name for name, *_ in compare(results, baseline, tolerance=0.2)]
+    assert flagged == ["b", "c"]
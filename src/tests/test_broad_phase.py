@@ -0,0 +1,49 @@
+import numpy as np
+from planner.broad_phase import BroadPhase, ObstacleGrid
+from planner.collision import detect_collisions, get_occupancy_grid
+from planner.nlink_arm import NLinkArm, forward_kinematics
+
+
+def test_reach_culling_per_link():
+    obstacles = [
+        [0.5, 0, 0.2],  # Reachable by both links
+        [1.5, 0, 0.2],  # Only reachable by link 2
+        [3.0, 0, 0.5],  # Out of reach
+        [0.5, 0.5, 0],  # Zero radius
+    ]
+    broad_phase = BroadPhase([1, 1], obstacles)
+    assert broad_phase.link_obstacles[0].tolist() == [[0.5, 0, 0.2]]
+    assert broad_phase.link_obstacles[1].tolist() == [[0.5, 0, 0.2], [1.5, 0, 0.2]]
+    assert BroadPhase([1, 1], [[3.0, 0, 0.5]]).empty
+
+
+def test_obstacle_grid_candidates_contain_hits():
+    rng = np.random.default_rng(1)
+    obstacles = np.hstack([rng.uniform(-3, 3, (300, 2)), rng.uniform(0.05, 0.2, (300, 1))])
+    length = 0.5
+    index = ObstacleGrid(obstacles, length / 2 + 0.2)
+    assert index.candidates_per_query < len(obstacles)
+
+    a = rng.uniform(-3, 3, (500, 2))
+    angle = rng.uniform(-np.pi, np.pi, 500)
+    b = a + length * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+    segments = np.stack([a, b], axis=1)
+    hits = detect_collisions(segments, obstacles).any(axis=1)
+
+    candidates = index.candidates((a + b) / 2)
+    for i in range(len(a)):
+        assert detect_collisions(segments[i:i + 1], candidates[i]).any() == hits[i]
+
+
+def test_occupancy_grid_with_many_obstacles():
+    rng = np.random.default_rng(2)
+    obstacles = np.hstack([rng.uniform(-3, 3, (200, 2)), rng.uniform(0.02, 0.15, (200, 1))])
+    link_lengths = [1.0, 0.7]
+    M = 30
+    grid = get_occupancy_grid(NLinkArm(link_lengths, [0, 0]), obstacles, M, chunk_size=200)
+
+    idx = np.stack(np.unravel_index(np.arange(M * M), (M, M)), axis=1)
+    points = forward_kinematics(link_lengths, 2 * np.pi * idx / M - np.pi)
+    segments = np.stack([points[:, :-1], points[:, 1:]], axis=2).reshape(-1, 2, 2)
+    expected = detect_collisions(segments, obstacles).reshape(M * M, -1).any(axis=1)
+    assert np.array_equal(grid.reshape(-1), expected)
@@ -0,0 +1,66 @@
+import csv
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import cli
+
+SRC = Path(cli.__file__).resolve().parent
+
+
+def test_scene_nodes_scale_to_resolution():
+    scene = {"start": (0, 50), "goal": (99, 25)}
+    assert cli.scene_nodes(scene, 100) == ((0, 50), (99, 25))
+    assert cli.scene_nodes(scene, 200) == ((0, 100), (198, 50))
+    assert cli.scene_nodes(scene, 50) == ((0, 25), (0, 12))
+
+
+def test_json_output(tmp_path):
+    output = tmp_path / "routes.json"
+    status = cli.main(["--scene", "Example 1", "--scene", "Example 3", "--output", str(output)])
+    assert status == 0
+    results = json.loads(output.read_text())["results"]
+    assert [r["scene"] for r in results] == ["Example 1", "Example 3"]
+    for result in results:
+        assert result["error"] is None
+        assert result["reachable"]
+        assert result["route_length"] == len(result["route"])
+        assert result["total_s"] >= result["grid_s"] > 0
+
+
+def test_csv_output_in_parallel(tmp_path):
+    output = tmp_path / "routes.csv"
+    argv = ["--scene", "Example 3", "--planner", "bidirectional", "--repeat", "2",
+            "--workers", "2", "--output", str(output)]
+    assert cli.main(argv) == 0
+    with open(output, newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 2
+    assert rows[0]["route"] == rows[1]["route"]
+    assert len(json.loads(rows[0]["route"])) == int(rows[0]["route_length"]) > 0
+
+
+def test_errors_are_reported_per_scene(tmp_path):
+    # A goal with the wrong number of joints fails that scene only
+    scenes = tmp_path / "scenes.yml"
+    scenes.write_text(
+        "Bad:\n  link_lengths: [1, 1]\n  obstacles: []\n  start: [0, 0]\n  goal: [0, 0, 0]\n"
+        "Good:\n  link_lengths: [1, 1]\n  obstacles: []\n  start: [0, 0]\n  goal: [0, 3]\n"
+    )
+    output = tmp_path / "routes.json"
+    assert cli.main([str(scenes), "--output", str(output)]) == 1
+    bad, good = json.loads(output.read_text())["results"]
+    assert bad["error"] and not bad["route"]
+    assert good["error"] is None and good["route_length"] == 4
+
+
+def test_does_not_import_gui_modules(tmp_path):
+    code = (
+        "import sys, cli\n"
+        f"cli.main(['--scene', 'Example 3', '--output', {str(tmp_path / 'r.json')!r}])\n"
+        "print(sorted(m for m in ('PyQt5', 'matplotlib') if m in sys.modules))\n"
+    )
+    done = subprocess.run([sys.executable, "-c", code], cwd=SRC, capture_output=True, text=True)
+    assert done.returncode == 0, done.stderr
+    assert done.stdout.strip().splitlines()[-1] == "[]"
@@ -1,5 +1,13 @@
 import numpy as np
-from planner.collision import detect_collision, get_occupancy_grid
+from planner.joint_limits import JointLimits
+from planner.collision import (
+    affected_cells,
+    detect_collision,
+    detect_collisions,
+    get_occupancy_grid,
+    segments_collide,
+    update_occupancy_grid,
+)
 
 
 class MockArm:
@@ -104,3 +112,128 @@ def test_get_occupancy_grid_with_limits():
     grid = get_occupancy_grid(arm, obstacles, grid_size)
     assert grid is not None
     assert grid.shape == (grid_size, grid_size)
+
+
+def test_get_occupancy_grid_matches_per_cell_check():
+    # The batched builder must agree with a cell-by-cell sweep
+    arm = MockArm([1, 0.5])
+    obstacles = [[1.2, 0.4, 0.3], [-0.5, -0.8, 0.4], [0, 1, 0]]
+    M = 12
+
+    expected = np.zeros((M, M), dtype=int)
+    for idx in np.ndindex(expected.shape):
+        arm.update_joints([2 * np.pi * i / M - np.pi for i in idx])
+        segs = [[arm.points[k], arm.points[k + 1]] for k in range(2)]
+        expected[idx] = any(
+            detect_collision(seg, obs) for seg in segs for obs in obstacles
+        )
+
+    for chunk_size in (1, 7, 1000):
+        grid = get_occupancy_grid(arm, obstacles, M, chunk_size=chunk_size)
+        assert np.array_equal(grid, expected)
+
+
+def test_get_occupancy_grid_no_obstacles():
+    arm = MockArm([1, 1, 1])
+    grid = get_occupancy_grid(arm, [], 4)
+    assert grid.shape == (4, 4, 4)
+    assert not np.any(grid)
+
+
+def test_get_occupancy_grid_parallel_matches_serial():
+    arm = MockArm([1, 0.8, 0.5])
+    obstacles = [[1.0, 0.5, 0.4], [-0.6, -1.0, 0.5]]
+    serial = get_occupancy_grid(arm, obstacles, 9)
+    parallel = get_occupancy_grid(arm, obstacles, 9, chunk_size=50, workers=2)
+    assert np.array_equal(parallel, serial)
+    assert parallel.dtype == serial.dtype
+
+
+def test_prefix_grid_matches_flat_grid():
+    # Prefix sharing must not change a single cell, also across chunk
+    # boundaries, with joint limits and in parallel
+    limits = JointLimits([(-150, 120), (-180, 180), (-90, 170)])
+    obstacles = [[1.0, 0.5, 0.4], [-0.6, -1.0, 0.5], [0.2, 1.5, 0.3], [0.1, 0.2, 0.15]]
+    for joint_limits in (None, limits):
+        arm = MockArm([1, 0.8, 0.5], joint_limits=joint_limits)
+        flat = get_occupancy_grid(arm, obstacles, 11, method="flat")
+        assert flat.any() and not flat.all()
+        for chunk_size in (1, 30, 200, 10000):
+            prefix = get_occupancy_grid(arm, obstacles, 11, chunk_size=chunk_size)
+            assert np.array_equal(prefix, flat)
+        parallel = get_occupancy_grid(arm, obstacles, 11, chunk_size=50, workers=2)
+        assert np.array_equal(parallel, flat)
+
+
+def test_detect_collisions_matrix():
+    segments = [
+        [[0, 0], [1, 0]],
+        [[0, 0], [2, 0]],
+        [[1, 1], [1, 1]],  # Point segment
+    ]
+    obstacles = [
+        [0, 2, 1],  # Far from every segment
+        [1, 0, 0.5],  # On the second segment
+        [0.5, 1, 1],  # Tangent to the first segment
+        [1, 1, 0.5],  # Contains the point segment
+        [0.5, 0, 0],  # Zero radius
+        [0.5, 0, -1],  # Negative radius
+    ]
+    expected = np.array(
+        [
+            [False, True, False, False, False, False],
+            [False, True, False, False, False, False],
+            [False, False, True, True, False, False],
+        ]
+    )
+    hits = detect_collisions(segments, obstacles)
+    assert np.array_equal(hits, expected)
+    assert np.array_equal(segments_collide(segments, obstacles), expected.any(axis=1))
+
+
+def test_detect_collisions_empty():
+    assert detect_collisions([[[0, 0], [1, 0]]], []).shape == (1, 0)
+    assert not segments_collide([[[0, 0], [1, 0]]], []).any()
+
+
+def test_get_occupancy_grid_limit_mask():
+    # Cells outside the joint limits are occupied even without obstacles
+    limits = JointLimits([(0, 90), (-180, 180)])
+    grid = get_occupancy_grid(MockArm([1, 1], joint_limits=limits), [], 8)
+    angles = np.degrees(2 * np.pi * np.arange(8) / 8 - np.pi)
+    expected_rows = (angles >= 0) & (angles <= 90)
+    assert np.array_equal(grid[:, 0] == 0, expected_rows)
+    assert np.all(grid == grid[:, :1])
+
+
+def test_affected_cells_cover_disk_hits():
+    link_lengths = [1, 0.8, 0.5]
+    disks = [[1.2, 0.3, 0.3], [-0.4, 1.1, 0.2]]
+    cells = set(affected_cells(link_lengths, disks, 10).tolist())
+
+    # Every cell colliding with a disk is affected, and not every cell is
+    alone = [get_occupancy_grid(MockArm(link_lengths), [disk], 10) for disk in disks]
+    assert set(np.flatnonzero(alone[0] | alone[1]).tolist()) <= cells
+    assert len(cells) < 1000
+    assert affected_cells(link_lengths, [], 10).size == 0
+
+
+def test_update_occupancy_grid_matches_rebuild():
+    limits = JointLimits([(-150, 150), (-180, 180), (-90, 90)])
+    arm = MockArm([1, 0.8, 0.5], joint_limits=limits)
+    obstacles = [[1.0, 0.5, 0.4], [-0.6, -1.0, 0.5], [0.2, 1.5, 0.3]]
+    grid = get_occupancy_grid(arm, obstacles, 12)
+    packed = get_occupancy_grid(arm, obstacles, 12, packed=True)
+
+    moved = [[1.1, 0.2, 0.4], [-0.6, -1.0, 0.5], [0.2, 1.5, 0.3]]
+    changed = update_occupancy_grid(grid, arm, moved, [obstacles[0], moved[0]])
+    expected = get_occupancy_grid(arm, moved, 12)
+    assert np.array_equal(grid, expected)
+    assert len(changed) > 0
+
+    update_occupancy_grid(packed, arm, moved, [obstacles[0], moved[0]], chunk_size=100)
+    assert np.array_equal(packed.to_array(), expected)
+
+    # Removing an obstacle
+    update_occupancy_grid(grid, arm, moved[1:], [moved[0]])
+    assert np.array_equal(grid, get_occupancy_grid(arm, moved[1:], 12))
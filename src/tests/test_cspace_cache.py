@@ -0,0 +1,124 @@
+from functools import partial
+
+import numpy as np
+from planner.cspace_cache import CSpaceCache, scene_key
+from planner.collision import get_occupancy_grid
+from planner.cspace_grid import CSpaceGrid
+from planner.joint_limits import JointLimits
+from planner.nlink_arm import NLinkArm
+
+
+class CountingBuilder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, arm, obstacles, M):
+        self.calls += 1
+        return get_occupancy_grid(arm, obstacles, M)
+
+
+def test_scene_key_is_stable():
+    limits = JointLimits([(-90, 90), (-180, 180)])
+    key = scene_key([1, 1], limits, [[1, 0, 0.5]], 10)
+
+    # Same scene written with floats and a fresh JointLimits object
+    same = scene_key([1.0, 1.0], JointLimits([(-90, 90), (-180, 180)]), [(1.0, 0, 0.5)], 10)
+    assert key == same
+
+    assert key != scene_key([1, 1], limits, [[1, 0, 0.5]], 11)
+    assert key != scene_key([1, 1.5], limits, [[1, 0, 0.5]], 10)
+    assert key != scene_key([1, 1], None, [[1, 0, 0.5]], 10)
+    assert key != scene_key([1, 1], limits, [[1, 0, 0.6]], 10)
+
+
+def test_memory_cache_hit():
+    arm = NLinkArm([1, 1], [0, 0])
+    cache = CSpaceCache()
+    builder = CountingBuilder()
+
+    grid = cache.get_or_build(arm, [[1, 0, 0.5]], 10, builder=builder)
+    again = cache.get_or_build(arm, [[1, 0, 0.5]], 10, builder=builder)
+    assert builder.calls == 1
+    assert again is grid
+
+    cache.get_or_build(arm, [[1, 0, 0.6]], 10, builder=builder)
+    assert builder.calls == 2
+
+
+def test_memory_cache_lru_eviction():
+    arm = NLinkArm([1, 1], [0, 0])
+    cache = CSpaceCache(max_entries=2)
+    builder = CountingBuilder()
+
+    for M in (4, 5, 6):
+        cache.get_or_build(arm, [], M, builder=builder)
+    cache.get_or_build(arm, [], 6, builder=builder)
+    assert builder.calls == 3
+    cache.get_or_build(arm, [], 4, builder=builder)
+    assert builder.calls == 4
+
+
+def test_disk_cache_across_instances(tmp_path):
+    arm = NLinkArm([1, 1], [0, 0])
+    obstacles = [[1, 1, 0.5]]
+    builder = CountingBuilder()
+
+    grid = CSpaceCache(tmp_path).get_or_build(arm, obstacles, 12, builder=builder)
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+    # A new cache (e.g. another process) reads the grid from disk
+    loaded = CSpaceCache(tmp_path).get_or_build(arm, obstacles, 12, builder=builder)
+    assert builder.calls == 1
+    assert np.array_equal(loaded, grid)
+
+    mapped = CSpaceCache(tmp_path, mmap=True).get_or_build(arm, obstacles, 12, builder=builder)
+    assert builder.calls == 1
+    assert isinstance(mapped, np.memmap)
+    assert np.array_equal(mapped, grid)
+
+
+def test_disk_cache_packed_grid(tmp_path):
+    arm = NLinkArm([1, 1], [0, 0])
+    obstacles = [[1, 1, 0.5]]
+    builder = partial(get_occupancy_grid, packed=True)
+
+    grid = CSpaceCache(tmp_path).get_or_build(arm, obstacles, 10, builder=builder)
+    assert isinstance(grid, CSpaceGrid)
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+    assert not list(tmp_path.glob("*.npy"))
+
+    loaded = CSpaceCache(tmp_path, mmap=True).get_or_build(arm, obstacles, 10, builder=None)
+    assert isinstance(loaded, CSpaceGrid)
+    assert np.array_equal(loaded.to_array(), get_occupancy_grid(arm, obstacles, 10))
+
+    # Storing the dense grid for the same scene replaces the packed file
+    cache = CSpaceCache(tmp_path)
+    cache.put(scene_key(arm.link_lengths, None, obstacles, 10), grid.to_array())
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+    assert not list(tmp_path.glob("*.npz"))
+    cache.clear()
+    assert not list(tmp_path.iterdir())
+
+
+def test_disk_cache_corrupt_file(tmp_path):
+    arm = NLinkArm([1, 1], [0, 0])
+    key = scene_key(arm.link_lengths, None, [], 5)
+    (tmp_path / f"{key}.npy").write_bytes(b"not a numpy file")
+
+    builder = CountingBuilder()
+    cache = CSpaceCache(tmp_path)
+    grid = cache.get_or_build(arm, [], 5, builder=builder)
+    assert builder.calls == 1
+    assert grid.shape == (5, 5)
+
+    cache.clear()
+    assert not list(tmp_path.glob("*.npy"))
+
+    # A packed grid cut short keeps the zip magic but not the archive
+    builder = partial(get_occupancy_grid, packed=True)
+    CSpaceCache(tmp_path).get_or_build(arm, [], 5, builder=builder)
+    (packed,) = tmp_path.glob("*.npz")
+    packed.write_bytes(packed.read_bytes()[:50])
+    grid = CSpaceCache(tmp_path).get_or_build(arm, [], 5, builder=builder)
+    assert isinstance(grid, CSpaceGrid)
+    assert np.array_equal(grid.to_array(), np.zeros((5, 5)))
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from planner.astar_planner import astar_torus
+from planner.collision import get_occupancy_grid
+from planner.cspace_grid import CSpaceGrid
+from planner.nlink_arm import NLinkArm
+
+
+def test_round_trip_and_indexing():
+    rng = np.random.default_rng(0)
+    dense = (rng.random((7, 5, 3)) < 0.4).astype(int)
+    grid = CSpaceGrid.from_array(dense)
+
+    assert grid.shape == (7, 5, 3)
+    assert grid.nbytes == (dense.size + 7) // 8
+    assert np.array_equal(grid.to_array(), dense)
+    for node in np.ndindex(dense.shape):
+        assert grid[node] == dense[node]
+
+
+def test_neighbors():
+    grid = CSpaceGrid.from_array(np.array([[0, 1, 0], [0, 0, 0], [1, 0, 0]]))
+    assert sorted(grid.neighbors((0, 0))) == [(0, 1), (0, 2), (1, 0), (2, 0)]
+    assert sorted(grid.free_neighbors((0, 0))) == [(0, 2), (1, 0)]
+
+
+def test_set_range_unaligned():
+    grid = CSpaceGrid((4, 5))
+    expected = np.zeros(20, dtype=int)
+    for start, length in [(3, 6), (9, 2), (0, 1), (15, 5)]:
+        grid.set_range(start, np.ones(length))
+        expected[start:start + length] = 1
+    grid.set_range(4, [0, 0])
+    expected[4:6] = 0
+    assert np.array_equal(grid.to_array().reshape(-1), expected)
+
+
+def test_cells_and_set_cells():
+    rng = np.random.default_rng(1)
+    dense = (rng.random((6, 7)) < 0.5).astype(int)
+    grid = CSpaceGrid.from_array(dense)
+    indices = rng.choice(dense.size, 15, replace=False)
+    assert np.array_equal(grid.cells(indices), dense.reshape(-1)[indices])
+
+    values = rng.random(15) < 0.5
+    grid.set_cells(indices, values)
+    dense.reshape(-1)[indices] = values
+    assert np.array_equal(grid.to_array(), dense)
+
+
+def test_save_and_load(tmp_path):
+    dense = np.eye(9, dtype=int)
+    path = tmp_path / "grid.npz"
+    CSpaceGrid.from_array(dense).save(path)
+    loaded = CSpaceGrid.load(path)
+    assert loaded.shape == (9, 9)
+    assert np.array_equal(loaded.to_array(), dense)
+
+    with pytest.raises(ValueError):
+        CSpaceGrid((9, 9), np.zeros(3, dtype=np.uint8))
+
+
+def test_packed_occupancy_grid_and_search():
+    arm = NLinkArm([1, 1], [0, 0])
+    obstacles = [[1.75, 0.75, 0.6], [0.55, 1.5, 0.5], [0, -1, 0.25]]
+    dense = get_occupancy_grid(arm, obstacles, 30)
+    packed = get_occupancy_grid(arm, obstacles, 30, chunk_size=37, packed=True)
+
+    assert isinstance(packed, CSpaceGrid)
+    assert np.array_equal(packed.to_array(), dense)
+    assert astar_torus(packed, (3, 15), (17, 17)) == astar_torus(dense, (3, 15), (17, 17))
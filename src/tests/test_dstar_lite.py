@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from planner.astar_planner import astar_torus
+from planner.collision import get_occupancy_grid
+from planner.cspace_grid import CSpaceGrid
+from planner.dstar_lite import DStarLite, IncrementalPlanner
+from planner.nlink_arm import NLinkArm
+
+
+def test_initial_plan_matches_astar():
+    rng = np.random.default_rng(0)
+    grid = (rng.random((15, 15)) < 0.3).astype(int)
+    for _ in range(10):
+        start = tuple(int(c) for c in rng.integers(0, 15, 2))
+        goal = tuple(int(c) for c in rng.integers(0, 15, 2))
+        path = DStarLite(grid, start, goal).plan()
+        assert len(path) == len(astar_torus(grid, start, goal))
+        if path:
+            assert path[0] == start and path[-1] == goal
+
+    assert DStarLite(grid, (1, 1), (1, 1)).plan() == []
+    with pytest.raises(ValueError):
+        DStarLite(grid, (0, 0), (1, 1), state="compressed")
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_repair_after_cell_changes(packed):
+    rng = np.random.default_rng(3)
+    grid = np.zeros((12, 12), dtype=int)
+    grid[3:9, 6] = 1
+    search_grid = CSpaceGrid.from_array(grid) if packed else grid
+    search = DStarLite(search_grid, (5, 2), (5, 10), state="sparse" if packed else "dense")
+    assert len(search.plan()) == len(astar_torus(grid, (5, 2), (5, 10)))
+
+    start = (5, 2)
+    for _ in range(8):
+        cells = rng.choice(grid.size, 4, replace=False)
+        flat = grid.reshape(-1)
+        flat[cells] ^= 1
+        if packed:
+            search_grid.set_cells(cells, flat[cells])
+        search.update_cells(cells)
+        path = search.plan()
+        assert len(path) == len(astar_torus(grid, start, (5, 10)))
+        for node in path[1:-1]:
+            assert grid[node] == 0
+        if len(path) > 2:
+            start = path[1]
+            search.move_start(start)
+
+
+def test_incremental_planner_moving_obstacle():
+    arm = NLinkArm([1, 1], [0, 0])
+    obstacles = [[1.75, 0.75, 0.6], [0.55, 1.5, 0.5], [0, -1, 0.25]]
+    planner = IncrementalPlanner(arm, obstacles, (3, 15), (17, 17), M=30)
+    assert len(planner.plan()) == len(
+        astar_torus(get_occupancy_grid(arm, obstacles, 30), (3, 15), (17, 17))
+    )
+
+    for dx in (0.1, 0.2, 0.3):
+        moved = [1.75 - dx, 0.75 + dx, 0.6]
+        route = planner.move_obstacle(0, moved)
+        obstacles[0] = moved
+        grid = get_occupancy_grid(arm, obstacles, 30)
+        assert np.array_equal(planner.grid, grid)
+        assert len(route) == len(astar_torus(grid, (3, 15), (17, 17)))
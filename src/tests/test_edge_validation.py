@@ -0,0 +1,70 @@
+import numpy as np
+from planner.astar_planner import astar_torus
+from planner.collision import detect_collisions, get_occupancy_grid
+from planner.edge_validation import INVALID, VALID, EdgeValidator
+from planner.nlink_arm import NLinkArm, forward_kinematics
+
+# Thin obstacles that a coarse grid steps over
+THIN = [[1.2, 0.0, 0.04], [0.0, 1.3, 0.04], [-1.1, -0.6, 0.04]]
+
+
+def motion_collides(link_lengths, obstacles, u, v, M, samples=200):
+    # Dense sampling of the shortest joint motion between cells u and v
+    a = 2 * np.pi * np.array(u) / M - np.pi
+    b = 2 * np.pi * np.array(v) / M - np.pi
+    step = (b - a + np.pi) % (2 * np.pi) - np.pi
+    points = forward_kinematics(link_lengths, a + np.linspace(0, 1, samples)[:, None] * step)
+    segments = np.stack([points[:, :-1], points[:, 1:]], axis=2).reshape(-1, 2, 2)
+    return detect_collisions(segments, obstacles).any()
+
+
+def test_valid_edges_never_collide():
+    rng = np.random.default_rng(0)
+    link_lengths = [0.9, 0.7, 0.5]
+    obstacles = [[1.0, 0.6, 0.2], [-0.4, 1.1, 0.05], [0.3, -1.2, 0.3]]
+    M = 10
+    grid = get_occupancy_grid(NLinkArm(link_lengths, [0] * 3), obstacles, M)
+    validator = EdgeValidator(link_lengths, obstacles, M)
+
+    cells = rng.integers(0, M**3, 150)
+    states = validator.edge_states(cells)
+    assert set(np.unique(states)) <= {VALID, INVALID}
+    checked = 0
+    for cell, row in zip(cells, states):
+        u = np.unravel_index(cell, grid.shape)
+        for axis, state in enumerate(row):
+            v = list(u)
+            v[axis] = (v[axis] + 1) % M
+            if grid[u] or grid[tuple(v)]:
+                continue
+            collides = motion_collides(link_lengths, obstacles, u, v, M)
+            if state == VALID:
+                assert not collides
+            checked += 1
+    assert checked > 50
+
+
+def test_astar_with_edges_avoids_thin_obstacles():
+    link_lengths, M = [1, 1], 16
+    grid = get_occupancy_grid(NLinkArm(link_lengths, [0, 0]), THIN, M)
+    start, goal = (0, 8), (8, 4)
+
+    def route_collides(route):
+        return any(motion_collides(link_lengths, THIN, u, v, M) for u, v in zip(route, route[1:]))
+
+    plain = astar_torus(grid, start, goal)
+    assert route_collides(plain)
+
+    validator = EdgeValidator(link_lengths, THIN, M)
+    route = astar_torus(grid, start, goal, edge_validator=validator)
+    assert route and route[0] == start and route[-1] == goal
+    assert not route_collides(route)
+    assert len(route) >= len(plain)
+    assert 0 < validator.evaluated < grid.size * 2
+
+
+def test_no_obstacles_accepts_every_edge():
+    validator = EdgeValidator([1, 1], [], 8)
+    assert np.all(validator.edge_states(np.arange(64)) == VALID)
+    route = astar_torus(np.zeros((8, 8), dtype=int), (0, 0), (4, 4), edge_validator=validator)
+    assert len(route) == 9
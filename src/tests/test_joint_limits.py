@@ -68,3 +68,25 @@ def test_is_within_limits_array_length():
 
     angles = [np.pi / 4, np.pi / 2, np.pi / 4]  # 三个角度
     assert not limits.is_within_limits(angles)  # 应该返回False而不是抛出异常
+
+
+def test_axis_masks_match_is_within_limits():
+    limits = JointLimits([(-90, 45), (0, 180)])
+    axis_angles = 2 * np.pi * np.arange(8) / 8 - np.pi  # Multiples of 45 degrees
+    masks = limits.axis_masks([axis_angles, axis_angles])
+    assert len(masks) == 2
+
+    for i, a in enumerate(axis_angles):
+        for j, b in enumerate(axis_angles):
+            expected = limits.is_within_limits([a, b])
+            assert (masks[0][i] and masks[1][j]) == expected
+
+    # Boundary angles are within limits
+    assert masks[0].tolist() == [False, False, True, True, True, True, False, False]
+
+
+def test_axis_masks_joint_count_mismatch():
+    limits = JointLimits([(-90, 90), (-90, 90)])
+    masks = limits.axis_masks([np.zeros(4)])
+    assert len(masks) == 1
+    assert not masks[0].any()
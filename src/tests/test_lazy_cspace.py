@@ -0,0 +1,33 @@
+import numpy as np
+from planner.astar_planner import astar_torus
+from planner.collision import get_occupancy_grid
+from planner.joint_limits import JointLimits
+from planner.lazy_cspace import LazyOccupancyGrid, plan_lazy
+from planner.nlink_arm import NLinkArm
+
+OBSTACLES = [[1.75, 0.75, 0.6], [0.55, 1.5, 0.5], [0, -1, 0.25]]
+
+
+def test_lazy_grid_matches_full_grid():
+    arm = NLinkArm([1, 1], [0, 0], JointLimits([(-150, 150), (-180, 180)]))
+    full = get_occupancy_grid(arm, OBSTACLES, 25)
+    lazy = LazyOccupancyGrid(arm, OBSTACLES, 25, tile=3)
+
+    for node in np.ndindex(full.shape):
+        assert lazy[node] == full[node]
+    assert lazy.evaluated == full.size
+
+
+def test_plan_lazy_same_route():
+    arm = NLinkArm([1, 1], [0, 0])
+    full = get_occupancy_grid(arm, OBSTACLES, 100)
+    route, grid = plan_lazy(arm, OBSTACLES, (10, 50), (58, 56), 100)
+    assert route == astar_torus(full, (10, 50), (58, 56))
+    assert grid.evaluated < full.size
+
+
+def test_plan_lazy_easy_query_touches_few_cells():
+    arm = NLinkArm([1, 1, 1], [0, 0, 0])
+    route, grid = plan_lazy(arm, [[3, 3, 0.2]], (50, 50, 50), (55, 50, 48), 100)
+    assert len(route) == 8
+    assert grid.evaluated < 0.001 * grid.size
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from planner.astar_planner import astar_torus
+from planner.collision import get_occupancy_grid
+from planner.joint_limits import JointLimits
+from planner.multires import BLOCKED, FREE, block_states, plan_multires
+from planner.nlink_arm import NLinkArm
+
+OBSTACLES = [[1.75, 0.75, 0.6], [0.55, 1.5, 0.5], [0, -1, 0.25]]
+
+
+def block_extremes(grid, factor):
+    # Per-block max and min of a 2D grid
+    M = grid.shape[0]
+    blocks = grid.reshape(M // factor, factor, M // factor, factor)
+    return blocks.max(axis=(1, 3)), blocks.min(axis=(1, 3))
+
+
+def test_block_states_are_certain():
+    arm = NLinkArm([1, 1], [0, 0])
+    arm.joint_limits = JointLimits([(-120, 150), (-180, 180)])
+    grid = get_occupancy_grid(arm, OBSTACLES, 64)
+    for factor in (2, 4, 8):
+        size = 64 // factor
+        states = block_states(
+            np.arange(size * size), arm.link_lengths, arm.joint_limits, OBSTACLES, 64, factor
+        ).reshape(size, size)
+        any_occupied, all_occupied = block_extremes(grid, factor)
+        assert not np.any((states == FREE) & (any_occupied == 1))
+        assert not np.any((states == BLOCKED) & (all_occupied == 0))
+        assert np.any(states == BLOCKED)
+        if factor < 8:
+            assert np.any(states == FREE)
+
+
+def test_plan_multires_valid_route():
+    arm = NLinkArm([1, 1], [0, 0])
+    grid = get_occupancy_grid(arm, OBSTACLES, 64)
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        start = tuple(int(c) for c in rng.integers(0, 64, 2))
+        goal = tuple(int(c) for c in rng.integers(0, 64, 2))
+        stats = {}
+        route = plan_multires(arm, OBSTACLES, start, goal, M=64, levels=3, stats=stats)
+        assert bool(route) == bool(astar_torus(grid, start, goal))
+        assert stats["full_levels"][0] == 3
+        if route:
+            assert route[0] == start and route[-1] == goal
+            for node in route[1:-1]:
+                assert grid[node] == 0
+            for a, b in zip(route, route[1:]):
+                moved = [(j - i) % 64 for i, j in zip(a, b) if i != j]
+                assert len(moved) == 1 and moved[0] in (1, 63)
+
+
+def test_plan_multires_evaluates_few_cells():
+    arm = NLinkArm([1, 1], [0, 0])
+    grid = get_occupancy_grid(arm, OBSTACLES, 192)
+    stats = {}
+    route = plan_multires(arm, OBSTACLES, (10, 60), (130, 140), M=192, levels=3, stats=stats)
+    assert len(route) == len(astar_torus(grid, (10, 60), (130, 140)))
+    assert stats["full_levels"] == [3]
+    assert sum(stats["cells"]) < 192 * 192 / 4
+
+    assert plan_multires(arm, OBSTACLES, (5, 5), (5, 5), M=192) == []
+    with pytest.raises(ValueError):
+        plan_multires(arm, OBSTACLES, (0, 0), (1, 1), M=100, levels=3)
@@ -1,6 +1,6 @@
 import pytest
 import numpy as np
-from planner.nlink_arm import NLinkArm
+from planner.nlink_arm import NLinkArm, forward_kinematics
 from planner.joint_limits import JointLimits
 
 import matplotlib.pyplot as plt
@@ -96,3 +96,31 @@ def test_end_effector_position():
     expected_x = np.cos(np.pi / 4) + np.cos(0)
     expected_y = np.sin(np.pi / 4) + np.sin(0)
     assert np.allclose(arm.end_effector, [expected_x, expected_y], rtol=1e-7)
+
+
+def test_forward_kinematics_single_and_batch():
+    link_lengths = [1.0, 0.5, 2.0]
+    configs = np.array([[0.0, 0.0, 0.0], [np.pi / 2, -np.pi / 2, np.pi], [0.3, 1.1, -2.0]])
+
+    points = forward_kinematics(link_lengths, configs[0])
+    assert points.shape == (4, 2)
+    assert np.allclose(points, [[0, 0], [1, 0], [1.5, 0], [3.5, 0]])
+
+    batch = forward_kinematics(link_lengths, configs)
+    assert batch.shape == (3, 4, 2)
+    for config, pose in zip(configs, batch):
+        assert np.allclose(pose, forward_kinematics(link_lengths, config))
+    assert np.allclose(batch[1], [[0, 0], [0, 1], [0.5, 1], [-1.5, 1]])
+
+
+def test_batch_points_matches_update_joints():
+    arm = NLinkArm([1.0, 1.0, 0.5, 0.25], [0.0, 0.0, 0.0, 0.0])
+    rng = np.random.default_rng(0)
+    configs = rng.uniform(-np.pi, np.pi, size=(20, 4))
+
+    poses = arm.batch_points(configs)
+    assert poses.shape == (20, 5, 2)
+    for config, pose in zip(configs, poses):
+        arm.update_joints(config)
+        assert np.allclose(arm.points, pose)
+        assert np.allclose(arm.end_effector, pose[-1])
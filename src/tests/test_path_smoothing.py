@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from planner.astar_planner import astar_torus
+from planner.collision import angle_occupancy, get_occupancy_grid
+from planner.nlink_arm import NLinkArm
+from planner.path_smoothing import (
+    Trajectory,
+    merge_collinear,
+    route_to_path,
+    smooth_route,
+    split_motions,
+)
+
+OBSTACLES = [[1.75, 0.75, 0.6], [0.55, 1.5, 0.5], [0, -1, 0.25]]
+
+
+def test_route_to_path_unwraps():
+    path = route_to_path([(98, 0), (99, 0), (0, 0), (1, 0)], 100)
+    assert np.allclose(np.diff(path[:, 0]), 2 * np.pi / 100)
+    assert path[0, 1] == pytest.approx(-np.pi)
+
+
+def test_merge_collinear():
+    path = [[0, 0], [1, 0], [1, 0], [2, 0], [2, 1], [2, 2], [1, 2]]
+    assert np.array_equal(merge_collinear(path), [[0, 0], [2, 0], [2, 2], [1, 2]])
+    # Turning back is a corner
+    assert len(merge_collinear([[0, 0], [1, 0], [0, 0]])) == 3
+
+
+def test_split_motions():
+    path = split_motions([[0.0, 0.0], [4.0, 0.5], [4.0, 0.0]], max_angle=1.0)
+    assert np.allclose(path[:6], [[0, 0], [0.8, 0.1], [1.6, 0.2], [2.4, 0.3], [3.2, 0.4], [4, 0.5]])
+    assert np.allclose(path[-1], [4, 0]) and len(path) == 7
+    assert np.abs(np.diff(path, axis=0)).max() <= 1.0
+
+
+def test_trajectory_respects_limits():
+    waypoints = [[0.0, 0.0], [1.0, 0.5], [1.0, 0.52], [-1.0, 0.0]]
+    trajectory = Trajectory(waypoints, max_velocity=[1.0, 0.5], max_acceleration=2.0)
+    assert np.allclose(trajectory.positions(trajectory.times), waypoints)
+
+    dt = 1e-3
+    times, q = trajectory.sample(dt)
+    assert times[-1] == trajectory.duration
+    velocity = np.diff(q, axis=0) / dt
+    assert np.all(np.abs(velocity) <= np.array([1.0, 0.5]) * (1 + 1e-6) + 2 * dt)
+    acceleration = np.diff(velocity, axis=0) / dt
+    assert np.all(np.abs(acceleration[:-1]) <= 2.0 + 1e-3)
+
+    with pytest.raises(ValueError):
+        Trajectory(waypoints, max_velocity=0)
+
+
+def test_smooth_route_shortens_grid_route():
+    arm = NLinkArm([1, 1], [0, 0])
+    M = 100
+    route = astar_torus(get_occupancy_grid(arm, OBSTACLES, M), (10, 50), (30, 40))
+    stats = {}
+    trajectory = smooth_route(arm, OBSTACLES, route, M, stats=stats)
+    assert stats["waypoints"] == (len(route), len(trajectory))
+    assert len(trajectory) < len(route) // 5
+
+    # Same ends, and collision-free in between (both ends are free here)
+    cells = (2 * np.pi * np.array([route[0], route[-1]]) / M - np.pi) % (2 * np.pi)
+    assert np.allclose(trajectory.waypoints[[0, -1]] % (2 * np.pi), cells)
+    _, q = trajectory.sample(0.005)
+    assert not angle_occupancy(q, arm.link_lengths, None, OBSTACLES).any()
+
+
+def test_smooth_route_keeps_blocked_moves():
+    # Without a free shortcut, the route's own moves are kept
+    arm = NLinkArm([1, 1], [0, 0])
+    route = [(10, 50), (11, 50), (11, 51)]
+    trajectory = smooth_route(arm, [[0, 0, 10]], route, 100)
+    assert np.allclose(trajectory.waypoints, route_to_path(route, 100))
+    assert smooth_route(arm, OBSTACLES, [], 100) is None
+
+
+def test_smooth_route_keeps_long_sweeps():
+    # The route turns the first joint by more than pi, away from the
+    # obstacle; the short way round passes through it
+    arm = NLinkArm([1, 1], [0, 0])
+    obstacles = [[-1.5, 0, 0.3]]
+    route = astar_torus(get_occupancy_grid(arm, obstacles, 100), (20, 50), (80, 52))
+    assert len(route) == 63
+    trajectory = smooth_route(arm, obstacles, route, 100)
+    _, q = trajectory.sample(0.005)
+    assert not angle_occupancy(q, arm.link_lengths, None, obstacles).any()
+    assert trajectory.waypoints[-1, 0] - trajectory.waypoints[0, 0] == pytest.approx(
+        2 * np.pi * 60 / 100
+    )
@@ -0,0 +1,87 @@
+import numpy as np
+from planner.astar_planner import astar_torus
+from planner.cspace_grid import CSpaceGrid
+from planner.roadmap import CSpaceRoadmap
+
+
+def random_queries(rng, shape, count):
+    for _ in range(count):
+        start = tuple(int(rng.integers(n)) for n in shape)
+        goal = tuple(int(rng.integers(n)) for n in shape)
+        yield start, goal
+
+
+def test_components_wrap_around():
+    grid = np.ones((6, 6), dtype=int)
+    grid[2, :] = 0  # Row that only closes into a ring across the wrap
+    grid[:, 0] = 0
+    grid[4, 2:5] = 0  # Isolated strip
+    roadmap = CSpaceRoadmap(grid)
+
+    assert roadmap.n_components == 2
+    assert roadmap.component((2, 5)) == roadmap.component((0, 0)) == roadmap.component((5, 0))
+    assert roadmap.component((4, 3)) not in (0, roadmap.component((2, 5)))
+    assert roadmap.component((3, 3)) == 0
+
+    assert roadmap.is_reachable((2, 3), (5, 0))
+    assert not roadmap.is_reachable((2, 3), (4, 3))
+    # Occupied goal next to the strip, occupied start next to the ring
+    assert roadmap.is_reachable((3, 2), (5, 3))
+    assert not roadmap.is_reachable((2, 2), (2, 2))
+
+
+def test_queries_match_astar_length():
+    rng = np.random.default_rng(2)
+    for shape in [(20, 20), (9, 8, 7)]:
+        grid = (rng.random(shape) < 0.35).astype(int)
+        roadmap = CSpaceRoadmap(grid, landmarks=4)
+        for start, goal in random_queries(rng, shape, 30):
+            reference = astar_torus(grid, start, goal)
+            assert roadmap.is_reachable(start, goal) == bool(reference)
+            path = roadmap.query(start, goal)
+            assert len(path) == len(reference)
+            if path:
+                assert path[0] == start and path[-1] == goal
+                for node in path[1:-1]:
+                    assert grid[node] == 0
+
+
+def test_distance_field_and_query_many():
+    rng = np.random.default_rng(4)
+    grid = (rng.random((15, 15)) < 0.3).astype(int)
+    roadmap = CSpaceRoadmap(CSpaceGrid.from_array(grid), max_fields=2)
+    goal = (7, 7)
+
+    field = roadmap.distance_field(goal)
+    assert field.shape == grid.shape
+    assert field[goal] == 0
+    for start, _ in random_queries(rng, grid.shape, 20):
+        reference = astar_torus(grid, start, goal)
+        if start != goal:
+            assert field[start] == len(reference) - 1
+
+    pairs = [(start, goal) for start, _ in random_queries(rng, grid.shape, 10)]
+    pairs += list(random_queries(rng, grid.shape, 5))
+    routes = roadmap.query_many(pairs)
+    for (start, goal), route in zip(pairs, routes):
+        assert len(route) == len(astar_torus(grid, start, goal))
+
+    for other in [(0, 0), (1, 1), (2, 2)]:
+        roadmap.distance_field(other)
+    assert len(roadmap._fields) == 2
+
+
+def test_landmark_heuristic_is_admissible():
+    rng = np.random.default_rng(6)
+    grid = (rng.random((12, 12)) < 0.3).astype(int)
+    roadmap = CSpaceRoadmap(grid, landmarks=3)
+    assert len(roadmap.landmarks) == 3
+    for landmark in roadmap.landmarks:
+        assert grid[landmark] == 0
+
+    for goal in [(3, 4), tuple(np.argwhere(grid)[0])]:
+        h = roadmap.landmark_heuristic(goal)
+        field = roadmap.distance_field(goal).reshape(-1)
+        for index in np.flatnonzero(grid.reshape(-1) == 0):
+            if field[index] >= 0:
+                assert h(int(index)) <= field[index]
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from planner.astar_planner import astar_torus
+from planner.collision import angle_occupancy, cell_occupancy, get_occupancy_grid
+from planner.joint_limits import JointLimits
+from planner.nlink_arm import NLinkArm
+from planner.sampling_planner import (
+    PRM,
+    MotionChecker,
+    path_to_route,
+    plan_sampling,
+    rrt_connect,
+    shortcut_path,
+)
+
+OBSTACLES = [[1.2, 0.6, 0.3], [-0.9, 1.1, 0.35], [0.4, -1.3, 0.3], [-1.4, -0.5, 0.25]]
+
+
+def densely_free(checker, path, samples=100):
+    # Exact configuration checks along every motion of a path
+    for q_from, q_to in zip(path[:-1], path[1:]):
+        t = np.linspace(0, 1, samples)[:, None]
+        q = q_from + t * checker.difference(q_from, q_to)
+        if angle_occupancy(q, checker.link_lengths, None, checker.obstacles).any():
+            return False
+    return True
+
+
+def free_pair(checker, seed=0):
+    rng = np.random.default_rng(seed)
+    while True:
+        q = checker.sample(rng, 2)
+        if checker.configs_free(q).all() and not checker.motions_free(q[:1], q[1:])[0]:
+            return q
+
+
+def test_angle_occupancy_matches_grid():
+    limits = JointLimits([(-150, 150), (-180, 180)])
+    grid = get_occupancy_grid(NLinkArm([1, 1], [0, 0], limits), OBSTACLES, 20)
+    idx = np.stack(np.unravel_index(np.arange(400), (20, 20)), axis=1)
+    occupied = angle_occupancy(2 * np.pi * idx / 20 - np.pi, [1, 1], limits, OBSTACLES)
+    assert np.array_equal(occupied, grid.reshape(-1) != 0)
+
+
+def test_motions_wrap_around():
+    checker = MotionChecker([1, 1], None, [])
+    delta = checker.difference([3.0, 0.0], [-3.0, 0.0])
+    assert delta[0] == pytest.approx(2 * np.pi - 6)
+
+    # A limited joint moves inside its range instead
+    limited = MotionChecker([1, 1], JointLimits([(-175, 175), (-180, 180)]), [])
+    assert limited.difference([3.0, 0.0], [-3.0, 0.0])[0] == pytest.approx(-6)
+
+
+def test_motion_check_is_conservative():
+    checker = MotionChecker([1, 0.8, 0.5], None, OBSTACLES)
+    rng = np.random.default_rng(1)
+    q_from, q_to = checker.sample(rng, 300), checker.sample(rng, 300)
+    ends_free = checker.configs_free(q_from) & checker.configs_free(q_to)
+    free = checker.motions_free(q_from, q_to)
+    assert free[ends_free].any()
+    for i in np.flatnonzero(free & ends_free):
+        assert densely_free(checker, np.array([q_from[i], q_to[i]]))
+
+
+@pytest.mark.parametrize("links", [3, 7])
+def test_rrt_connect_and_prm_find_free_paths(links):
+    checker = MotionChecker([2.0 / links] * links, None, OBSTACLES)
+    q_start, q_goal = free_pair(checker)
+    prm = PRM(checker, n_samples=300, seed=0)
+    for path in (rrt_connect(checker, q_start, q_goal, seed=0), prm.query(q_start, q_goal)):
+        assert path is not None
+        assert np.allclose(path[0], q_start) and np.allclose(path[-1], q_goal)
+        assert checker.path_free(path)
+        assert densely_free(checker, path)
+
+        short = shortcut_path(checker, path)
+        assert len(short) <= len(path)
+        assert checker.path_free(short)
+
+
+def test_plan_sampling_returns_grid_route():
+    arm = NLinkArm([2.0 / 6] * 6, [0] * 6)
+    checker = MotionChecker(arm.link_lengths, None, OBSTACLES)
+    q_start, q_goal = free_pair(checker, seed=3)
+    start = tuple(int(c) for c in np.rint((q_start + np.pi) * 100 / (2 * np.pi)) % 100)
+    goal = tuple(int(c) for c in np.rint((q_goal + np.pi) * 100 / (2 * np.pi)) % 100)
+
+    stats = {}
+    route = plan_sampling(arm, OBSTACLES, start, goal, M=100, seed=0, stats=stats)
+    assert route[0] == start and route[-1] == goal
+    steps = np.abs(np.diff(np.array(route), axis=0))
+    assert np.all(np.minimum(steps, 100 - steps).sum(axis=1) == 1)
+    flat = np.ravel_multi_index(np.array(route[1:-1]).T, (100,) * 6)
+    assert not cell_occupancy(flat, arm.link_lengths, None, OBSTACLES, 100).any()
+    assert stats["checked"] > 0
+    assert path_to_route(checker, stats["path"], 100) == route
+
+
+@pytest.mark.parametrize("M", [32, 64, 100])
+def test_plan_sampling_routes_use_free_cells(M):
+    # Cells next to the continuous path can be occupied, and the grid can
+    # close a gap the path passes through
+    arm = NLinkArm([1, 1], [0, 0])
+    obstacles = [[1.75, 0.75, 0.6], [0.55, 1.5, 0.5], [0, -1, 0.25], [-1.2, -0.4, 0.3]]
+    grid = get_occupancy_grid(arm, obstacles, M)
+    free = np.argwhere(grid == 0)
+    rng = np.random.default_rng(M)
+    for _ in range(10):
+        start, goal = (tuple(int(c) for c in free[i]) for i in rng.choice(len(free), 2))
+        route = plan_sampling(arm, obstacles, start, goal, M, seed=0, max_iterations=300)
+        if route:
+            assert route[0] == start and route[-1] == goal
+            assert all(grid[node] == 0 for node in route)
+            steps = np.abs(np.diff(np.array(route), axis=0))
+            assert np.all(np.minimum(steps, M - steps).sum(axis=1) == 1)
+        elif start != goal:
+            assert astar_torus(grid, start, goal) == []
+
+
+def test_plan_sampling_rejects_invalid_ends():
+    arm = NLinkArm([1, 1], [0, 0])
+    # The stretched arm at (50, 50) passes through the first obstacle
+    assert angle_occupancy([[0.46, 0.0]], [1, 1], None, OBSTACLES)[0]
+    assert plan_sampling(arm, OBSTACLES, (57, 50), (20, 20), method="prm") == []
+    assert plan_sampling(arm, OBSTACLES, (20, 20), (20, 20)) == []
@@ -0,0 +1,60 @@
+import numpy as np
+from planner.astar_planner import astar_torus, iter_astar_torus
+from planner.collision import get_occupancy_grid, iter_occupancy_grid
+from planner.nlink_arm import NLinkArm
+from planner.streaming import plan_stream
+
+OBSTACLES = [[1.75, 0.75, 0.6], [0.55, 1.5, 0.5], [0, -1, 0.25]]
+
+
+def test_iter_occupancy_grid_progress():
+    arm = NLinkArm([1, 1], [0, 0])
+    done = [d for _, d in iter_occupancy_grid(arm, OBSTACLES, 20, chunk_size=64)]
+    assert done == sorted(done)
+    assert done[-1] == 400
+
+    for grid, _ in iter_occupancy_grid(arm, OBSTACLES, 20, chunk_size=64):
+        pass
+    assert np.array_equal(grid, get_occupancy_grid(arm, OBSTACLES, 20))
+
+
+def test_iter_astar_torus_partial_routes():
+    grid = np.zeros((40, 40), dtype=int)
+    grid[10, 1:39] = 1
+    results = list(iter_astar_torus(grid, (0, 20), (20, 20), report_every=10))
+
+    *progress, (expanded, route, finished) = results
+    assert finished
+    assert route == astar_torus(grid, (0, 20), (20, 20))
+    assert progress
+    for count, partial, done in progress:
+        assert not done
+        assert count % 10 == 0
+        assert partial[0] == (0, 20)
+
+
+def test_plan_stream_events():
+    arm = NLinkArm([1, 1], [0, 0])
+    events = list(plan_stream(arm, OBSTACLES, (10, 50), (58, 56), 60, chunk_size=500))
+
+    kinds = [e.kind for e in events]
+    assert kinds[0] == "grid"
+    assert kinds[-1] == "route"
+    assert "grid" not in kinds[kinds.index("route"):]
+
+    grid = get_occupancy_grid(arm, OBSTACLES, 60)
+    assert events[-1].route == astar_torus(grid, (10, 50), (58, 56))
+    assert np.array_equal(events[-1].grid, grid)
+
+    # A precomputed grid skips the grid stage
+    events = list(plan_stream(arm, OBSTACLES, (10, 50), (58, 56), 60, grid=grid))
+    assert all(e.kind != "grid" for e in events)
+
+
+def test_plan_stream_cancel():
+    arm = NLinkArm([1, 1], [0, 0])
+    stream = plan_stream(arm, OBSTACLES, (10, 50), (58, 56), 60, chunk_size=100)
+    first = next(stream)
+    assert first.kind == "grid"
+    assert first.done < first.total
+    stream.close()
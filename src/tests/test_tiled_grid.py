@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from planner.astar_planner import astar_torus
+from planner.collision import get_occupancy_grid, product_occupancy
+from planner.joint_limits import JointLimits
+from planner.nlink_arm import NLinkArm
+from planner.tiled_grid import TiledGrid, default_tile, get_tiled_occupancy_grid
+
+OBSTACLES = [[1.0, 0.5, 0.4], [-0.6, -1.0, 0.5], [0.2, 1.5, 0.3]]
+
+
+def test_default_tile_divides_shape_and_fits_a_page():
+    assert default_tile((64,) * 5) == 8
+    assert default_tile((100, 100)) == 100
+    assert default_tile((30,) * 4) == 10
+    assert default_tile((7, 7, 7)) == 7
+    # Without a divisor the tiles are padded rather than one cell each
+    assert default_tile((31,) * 4) == 8
+    assert default_tile((101,) * 5) > 1
+
+
+def test_product_occupancy_matches_grid():
+    limits = JointLimits([(-150, 150), (-180, 180), (-90, 170)])
+    arm = NLinkArm([1, 0.8, 0.5], [0, 0, 0])
+    arm.joint_limits = limits
+    grid = get_occupancy_grid(arm, OBSTACLES, 10)
+    axes = [np.array([1, 4, 9]), np.arange(10), np.array([0, 5])]
+    occupied = product_occupancy(axes, arm.link_lengths, limits, OBSTACLES, 10)
+    assert np.array_equal(occupied, grid[np.ix_(*axes)] != 0)
+
+
+@pytest.mark.parametrize("tile, chunk_size", [(None, 1000), (2, 1), (4, 100)])
+def test_tiled_grid_matches_dense_grid(tmp_path, tile, chunk_size):
+    arm = NLinkArm([1, 0.8, 0.5], [0, 0, 0])
+    arm.joint_limits = JointLimits([(-150, 150), (-180, 180), (-90, 90)])
+    path = tmp_path / "grid.bin"
+    tiled = get_tiled_occupancy_grid(arm, OBSTACLES, 8, path, tile=tile, chunk_size=chunk_size)
+    dense = get_occupancy_grid(arm, OBSTACLES, 8)
+    assert np.array_equal(tiled.to_array(), dense)
+    assert tiled.nbytes == dense.size // 8
+
+    reopened = TiledGrid.open(path)
+    assert reopened.tile == tiled.tile
+    for node in [(0, 0, 0), (3, 5, 7), (7, 7, 7)]:
+        assert reopened[node] == dense[node]
+    assert astar_torus(reopened, (0, 4, 4), (4, 2, 6)) == astar_torus(dense, (0, 4, 4), (4, 2, 6))
+
+
+def test_tiled_grid_for_five_links(tmp_path):
+    arm = NLinkArm([0.5] * 5, [0] * 5)
+    tiled = get_tiled_occupancy_grid(arm, OBSTACLES, 6, tmp_path / "grid.bin", tile=3)
+    dense = get_occupancy_grid(arm, OBSTACLES, 6)
+    assert np.array_equal(tiled.to_array(), dense)
+
+
+def test_tiled_grid_pads_partial_tiles(tmp_path):
+    arm = NLinkArm([1, 0.8, 0.5], [0, 0, 0])
+    tiled = get_tiled_occupancy_grid(arm, OBSTACLES, 7, tmp_path / "grid.bin", tile=3)
+    assert tiled.tiles == (3, 3, 3)
+    assert np.array_equal(tiled.to_array(), get_occupancy_grid(arm, OBSTACLES, 7))
+
+    # A prime M keeps close to one bit per cell
+    grid = TiledGrid.create(tmp_path / "prime.bin", (31,) * 4)
+    assert grid.nbytes < 1.2 * 31**4 / 8
+
+    with pytest.raises(ValueError):
+        TiledGrid.create(tmp_path / "grid.bin", (10, 10), tile=0)